@@ -26,7 +26,56 @@ class Settings(BaseSettings):
     
     # Encryption
     ENCRYPTION_KEY: str = os.getenv("ENCRYPTION_KEY", SECRET_KEY[:32].ljust(32, "x"))
-    
+
+    # Connecteurs bancaires (sessions navigateur exécutées hors de la boucle d'événements)
+    BANK_SYNC_MAX_SESSIONS: int = int(os.getenv("BANK_SYNC_MAX_SESSIONS", "2"))
+    BANK_SYNC_SESSION_TIMEOUT: int = int(os.getenv("BANK_SYNC_SESSION_TIMEOUT", "300"))  # secondes
+    # Fenêtre de recouvrement avant le filigrane de chaque compte (opérations publiées en retard)
+    BANK_SYNC_OVERLAP_DAYS: int = int(os.getenv("BANK_SYNC_OVERLAP_DAYS", "3"))
+    # Synchronisation de toutes les connexions (par utilisateur / planificateur global)
+    BANK_SYNC_USER_CONCURRENCY: int = int(os.getenv("BANK_SYNC_USER_CONCURRENCY", "3"))
+    BANK_SYNC_GLOBAL_CONCURRENCY: int = int(os.getenv("BANK_SYNC_GLOBAL_CONCURRENCY", "4"))
+    BANK_SYNC_SCHEDULE_ENABLED: bool = os.getenv("BANK_SYNC_SCHEDULE_ENABLED", "False").lower() == "true"
+    BANK_SYNC_SCHEDULE_HOUR: int = int(os.getenv("BANK_SYNC_SCHEDULE_HOUR", "3"))  # heure creuse (0-23)
+
+    # Cache analytique en mémoire (instantanés NumPy des transactions par utilisateur)
+    ANALYTICS_CACHE_MAX_MB: int = int(os.getenv("ANALYTICS_CACHE_MAX_MB", "64"))
+    # Règles de catégorisation compilées par utilisateur
+    RULES_CACHE_MAX_MB: int = int(os.getenv("RULES_CACHE_MAX_MB", "8"))
+    # Import en masse (POST /api/transactions/bulk) : transactions par lot d'écriture
+    BULK_IMPORT_BATCH_SIZE: int = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "1000"))
+    # Suggestions d'autocomplétion (marchands et descriptions par utilisateur)
+    SUGGESTIONS_CACHE_MAX_MB: int = int(os.getenv("SUGGESTIONS_CACHE_MAX_MB", "16"))
+    # Alertes budgétaires : seuils de dépense, en % du montant du budget
+    BUDGET_ALERT_THRESHOLDS: List[int] = sorted(
+        int(value) for value in os.getenv("BUDGET_ALERT_THRESHOLDS", "80,100").split(",") if value.strip()
+    )
+
+    # Logs des requêtes HTTP (file bornée écrite par un thread dédié)
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Part des réponses en succès journalisées (0.0 à 1.0), les erreurs le sont toujours
+    LOG_SUCCESS_SAMPLE_RATE: float = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+    LOG_FIELD_MAX_LENGTH: int = int(os.getenv("LOG_FIELD_MAX_LENGTH", "512"))
+
+    # Compression des réponses (gzip, ou zstd/brotli si installés)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # octets
+    # Au-delà, la compression est exécutée dans un thread
+    COMPRESSION_THREAD_THRESHOLD: int = int(os.getenv("COMPRESSION_THREAD_THRESHOLD", "262144"))  # octets
+    COMPRESSION_LEVEL: int = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+    # Synchronisation différentielle des clients (/api/sync/changes)
+    # Rétention des suppressions : au-delà, le client refait une synchronisation complète
+    SYNC_TOMBSTONE_TTL_DAYS: int = int(os.getenv("SYNC_TOMBSTONE_TTL_DAYS", "30"))
+    # Marge sous l'instant courant couvrant les écritures en cours (horloges, latence)
+    SYNC_CLOCK_SKEW_SECONDS: int = int(os.getenv("SYNC_CLOCK_SKEW_SECONDS", "5"))
+
+    # Événements temps réel (/api/events/stream)
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))  # par connexion
+    EVENTS_KEEPALIVE_SECONDS: int = int(os.getenv("EVENTS_KEEPALIVE_SECONDS", "25"))
+    # Diffusion entre workers par change stream (nécessite un replica set MongoDB)
+    EVENTS_CHANGE_STREAM_ENABLED: bool = os.getenv("EVENTS_CHANGE_STREAM_ENABLED", "False").lower() == "true"
+
     # CORS - Ajout du port 19006 pour Expo
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -1,9 +1,22 @@
 import logging
+from datetime import datetime
 from pymongo.errors import PyMongoError
 
+from app.core.config import settings
+from app.services.category_paths import backfill_category_paths, category_path
+from app.services.sync_changes import SYNC_COLLECTIONS, backfill_updated_at
+from app.services.transaction_search import backfill_search_tokens
+
 # Configuration du logger
 logger = logging.getLogger("budget-api")
 
+# Reprises des données antérieures, exécutées une seule fois (collection migrations)
+MIGRATIONS = (
+    ("updated_at", backfill_updated_at),
+    ("search_tokens", backfill_search_tokens),
+    ("category_paths", backfill_category_paths),
+)
+
 # Stubs pour les modèles (pour compatibilité avec les tests)
 # Ces classes acceptent les arguments et simulent le comportement Pydantic
 class UserModel:
@@ -52,11 +65,42 @@ async def create_indexes(mongodb):
         await transactions_collection.create_index("date")
         await transactions_collection.create_index("category_id")
         await transactions_collection.create_index([("description", "text"), ("merchant", "text")])
+        # Recherche par préfixe et tolérante aux fautes (mots normalisés, index multiclé)
+        await transactions_collection.create_index([("user_id", 1), ("search_tokens", 1)])
+        # Listes triées par date : couvre les projections fields= sans id
+        # (date, amount, category_id, is_expense, type) des graphiques
+        await transactions_collection.create_index(
+            [("user_id", 1), ("date", -1), ("amount", 1), ("category_id", 1), ("is_expense", 1), ("type", 1)]
+        )
+        # Déduplication des imports en masse par external_id
+        await transactions_collection.create_index([("user_id", 1), ("external_id", 1)])
+        # Déduplication des transactions bancaires lors des upserts de synchronisation
+        await transactions_collection.create_index(
+            [("user_id", 1), ("bank_connection_id", 1), ("external_id", 1)]
+        )
+        
+        # Dépenses matérialisées des budgets : une période par budget et date de
+        # début, retrouvée par catégorie et date lors des écritures de transactions
+        budget_periods_collection = await mongodb.get_collection("budget_periods")
+        await budget_periods_collection.create_index([("budget_id", 1), ("period_start", 1)], unique=True)
+        await budget_periods_collection.create_index([("user_id", 1), ("category_ids", 1), ("period_start", 1)])
+        # Alertes budgétaires : une par budget, période et seuil ; lues par période en cours
+        budget_alerts_collection = await mongodb.get_collection("budget_alerts")
+        await budget_alerts_collection.create_index(
+            [("budget_id", 1), ("period_start", 1), ("threshold", 1)], unique=True
+        )
+        await budget_alerts_collection.create_index([("user_id", 1), ("period_end", 1)])
+        
+        # Collection bank_accounts (lecture des comptes et filigranes d'une connexion)
+        bank_accounts_collection = await mongodb.get_collection("bank_accounts")
+        await bank_accounts_collection.create_index([("connection_id", 1), ("external_id", 1)])
         
         # Collection categories
         categories_collection = await mongodb.get_collection("categories")
         await categories_collection.create_index("user_id")
         await categories_collection.create_index("name")
+        # Chemins matérialisés : sous-arbre d'une catégorie par l'index multiclé ancestors
+        await categories_collection.create_index([("user_id", 1), ("ancestors", 1)])
         
         # Collection tags
         tags_collection = await mongodb.get_collection("tags")
@@ -67,6 +111,19 @@ async def create_indexes(mongodb):
         users_collection = await mongodb.get_collection("users")
         await users_collection.create_index("email", unique=True)
         
+        # Synchronisation différentielle : pagination par (updated_at, _id) par utilisateur
+        for collection_name in SYNC_COLLECTIONS:
+            collection = await mongodb.get_collection(collection_name)
+            await collection.create_index([("user_id", 1), ("updated_at", 1), ("_id", 1)])
+        
+        # Pierres tombales des suppressions, expirées après la rétention
+        tombstones_collection = await mongodb.get_collection("tombstones")
+        await tombstones_collection.create_index([("user_id", 1), ("deleted_at", 1), ("_id", 1)])
+        await tombstones_collection.create_index(
+            "deleted_at", expireAfterSeconds=settings.SYNC_TOMBSTONE_TTL_DAYS * 24 * 3600
+        )
+        await run_migrations(mongodb)
+        
         logger.info("Index créés avec succès.")
         
         # Créer les collections par défaut si elles n'existent pas
@@ -75,6 +132,26 @@ async def create_indexes(mongodb):
         logger.error(f"Erreur lors de la création des index: {str(e)}")
         raise
 
+async def run_migrations(mongodb):
+    """
+    Exécute les reprises de données (MIGRATIONS) qui ne l'ont pas encore été.
+
+    Chaque reprise parcourt toute une collection : un document
+    migrations {_id: nom} l'enregistre une fois terminée et elle n'est plus
+    relancée aux démarrages suivants. Les reprises sont idempotentes : deux
+    processus qui démarrent ensemble peuvent l'exécuter tous les deux, et
+    supprimer le document la relance au démarrage suivant.
+    """
+    migrations_collection = await mongodb.get_collection("migrations")
+    for name, migration in MIGRATIONS:
+        if await migrations_collection.find_one({"_id": name}):
+            continue
+        await migration(mongodb)
+        await migrations_collection.update_one(
+            {"_id": name}, {"$set": {"applied_at": datetime.utcnow()}}, upsert=True
+        )
+        logger.info(f"Migration {name} appliquée")
+
 async def ensure_default_collections(mongodb):
     """
     S'assure que toutes les collections nécessaires existent et contiennent les documents par défaut.
@@ -108,6 +185,9 @@ async def ensure_default_collections(mongodb):
                 {"name": "Revenus", "color": "#009688", "icon": "wallet", "user_id": None}
             ]
             
+            for category in default_categories:
+                category.update(category_path(category["name"]))
+            
             logger.info(f"Ajout de {len(default_categories)} catégories par défaut")
             await categories_collection.insert_many(default_categories)
         
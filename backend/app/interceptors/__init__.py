@@ -1,5 +1,7 @@
 from fastapi import FastAPI
 
+from app.core.config import settings
+from app.interceptors.compression import CompressionMiddleware
 from app.interceptors.logging import LoggingMiddleware
 from app.interceptors.monitoring import setup_monitoring
 from app.interceptors.error_handling import exception_handlers
@@ -20,4 +22,14 @@ def setup_interceptors(app: FastAPI):
     
     # Configuration des gestionnaires d'exceptions
     for exc, handler in exception_handlers.items():
-        app.add_exception_handler(exc, handler) 
\ No newline at end of file
+        app.add_exception_handler(exc, handler)
+    
+    # Compression des réponses (ajoutée en dernier : middleware le plus externe,
+    # les autres intercepteurs voient les corps non compressés)
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MIN_SIZE,
+            thread_threshold=settings.COMPRESSION_THREAD_THRESHOLD,
+            level=settings.COMPRESSION_LEVEL
+        ) 
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Middleware ASGI de compression des réponses (négociée par Accept-Encoding).
+
+Encodages pris en charge, par ordre de préférence : zstd (paquet zstandard)
+et br (paquet brotli) s'ils sont installés, puis gzip (bibliothèque standard).
+
+- Les réponses déjà encodées (Content-Encoding) ou de type déjà compressé
+  (images, archives...) sont transmises telles quelles
+- Les corps complets inférieurs à minimum_size ne sont pas compressés
+- Toute réponse compressible porte Vary: Accept-Encoding, qu'elle soit
+  compressée ou non (petit corps, client sans Accept-Encoding) : un cache
+  partagé ne sert ainsi jamais un encodage au mauvais client
+- L'ETag d'une réponse recompressée devient faible (W/) : il ne désigne plus
+  les mêmes octets que la réponse d'origine
+- Les réponses en flux (StreamingResponse) sont compressées morceau par
+  morceau, chaque morceau étant vidé immédiatement vers le client
+- Au-delà de thread_threshold octets, la compression est exécutée dans un
+  thread pour ne pas bloquer la boucle d'événements
+"""
+
+import asyncio
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    zstandard = None
+
+# Types de contenu déjà compressés
+INCOMPRESSIBLE_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip",
+                        "application/x-gzip", "application/zstd", "application/pdf",
+                        "application/octet-stream", "text/event-stream")
+
+
+def available_encodings() -> List[str]:
+    """Encodages disponibles dans l'environnement, par ordre de préférence"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """
+    Choisit l'encodage à utiliser d'après l'en-tête Accept-Encoding
+
+    Les encodages refusés (q=0) sont ignorés ; parmi ceux acceptés, l'ordre de
+    préférence du serveur s'applique.
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for encoding in encodings:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class StreamCompressor:
+    """Compresseur incrémental commun aux différents encodages"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=min(level, 19)).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = en-tête gzip
+
+    def compress(self, data: bytes) -> bytes:
+        """Compresse un morceau et le vide (le client peut le décoder aussitôt)"""
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compresse le dernier morceau et termine le flux"""
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + self._compressor.flush()
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI pur de compression des réponses HTTP.
+
+    Args:
+        app: Application ASGI
+        minimum_size: Taille minimale d'un corps complet à compresser (octets)
+        thread_threshold: Taille à partir de laquelle la compression passe dans un thread
+        level: Niveau de compression (borné selon l'encodage)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        thread_threshold: int = 256 * 1024,
+        level: int = 6
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_threshold = thread_threshold
+        self.level = level
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    async def run(self, func: Callable[[bytes], bytes], data: bytes) -> bytes:
+        """Exécute la compression, dans un thread pour les gros volumes"""
+        if len(data) >= self.thread_threshold:
+            return await asyncio.to_thread(func, data)
+        return func(data)
+
+
+class _CompressionResponder:
+    """État de compression d'une réponse"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    def _skip(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return True
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(INCOMPRESSIBLE_TYPES)
+
+    def _add_vary(self) -> None:
+        MutableHeaders(scope=self.start_message).add_vary_header("Accept-Encoding")
+
+    def _set_headers(self, body_length: Optional[int]) -> None:
+        headers = MutableHeaders(scope=self.start_message)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if body_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(body_length)
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Différé jusqu'au premier morceau du corps (en-têtes à ajuster)
+            self.start_message = message
+            self.passthrough = self._skip(Headers(raw=message["headers"]))
+            if not self.passthrough and self.encoding is None:
+                # Compressible mais non compressée pour ce client
+                self._add_vary()
+                self.passthrough = True
+            if self.passthrough:
+                await self.downstream(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body:
+                # Corps complet : compression en une fois s'il est assez gros
+                if len(body) < self.middleware.minimum_size:
+                    self.passthrough = True
+                    self._add_vary()
+                    await self.downstream(self.start_message)
+                    await self.downstream(message)
+                    return
+                compressor = StreamCompressor(self.encoding, self.middleware.level)
+                compressed = await self.middleware.run(compressor.finish, body)
+                self._set_headers(len(compressed))
+                await self.downstream(self.start_message)
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+
+            # Réponse en flux : taille totale inconnue, compression incrémentale
+            self.compressor = StreamCompressor(self.encoding, self.middleware.level)
+            self._set_headers(None)
+            await self.downstream(self.start_message)
+
+        func = self.compressor.compress if more_body else self.compressor.finish
+        chunk = await self.middleware.run(func, body)
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
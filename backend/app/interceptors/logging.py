@@ -1,12 +1,18 @@
 import json
 import logging
+import queue
+import random
 import time
 import uuid
 from datetime import datetime, UTC
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
+from app.core.config import settings
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,6 +20,130 @@ logging.basicConfig(
 )
 logger = logging.getLogger("budget-api")
 
+# Journal des requêtes HTTP, écrit via une file et un thread d'écriture dédié
+access_logger = logging.getLogger("budget-api.access")
+
+# Paramètres de requête masqués dans les logs (token JWT du flux d'événements)
+SENSITIVE_QUERY_PARAMS = {"token"}
+
+
+class JSONMessage:
+    """
+    Message de log sérialisé en JSON à la demande.
+
+    La sérialisation n'a lieu qu'au formatage, c'est-à-dire dans le thread
+    d'écriture lorsque le pipeline asynchrone est démarré.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+
+    def __str__(self) -> str:
+        return json.dumps(self.data, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler non bloquant : l'enregistrement est mis en file tel quel
+    (sans formatage dans le thread appelant) et abandonné si la file est pleine.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Même thread et même processus : pas besoin de figer le message ici
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener dont la sentinelle d'arrêt attend une place dans une file pleine"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class AsyncLogPipeline:
+    """
+    Pipeline de logs asynchrone : QueueHandler sur le logger cible et
+    QueueListener qui écrit dans les handlers existants depuis un thread.
+
+    Tant que le pipeline n'est pas démarré, le logger écrit de façon
+    synchrone via la propagation standard.
+    """
+
+    def __init__(self, target: logging.Logger, queue_size: int):
+        self.target = target
+        self.queue_size = queue_size
+        self._handler: Optional[BoundedQueueHandler] = None
+        self._listener: Optional[DrainingQueueListener] = None
+
+    @property
+    def running(self) -> bool:
+        return self._listener is not None
+
+    @property
+    def dropped(self) -> int:
+        """Nombre d'enregistrements abandonnés (file pleine) depuis le démarrage"""
+        return self._handler.dropped if self._handler else 0
+
+    def start(self, *handlers: logging.Handler) -> None:
+        """
+        Démarre le thread d'écriture
+
+        Args:
+            handlers: Handlers de destination (par défaut ceux du logger racine)
+        """
+        if self.running:
+            return
+        handlers = handlers or tuple(logging.getLogger().handlers)
+        log_queue = queue.Queue(maxsize=self.queue_size)
+
+        self._handler = BoundedQueueHandler(log_queue)
+        self._listener = DrainingQueueListener(log_queue, *handlers, respect_handler_level=True)
+        self.target.addHandler(self._handler)
+        self.target.propagate = False
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Vide la file puis arrête le thread d'écriture"""
+        if not self.running:
+            return
+        self.target.removeHandler(self._handler)
+        self.target.propagate = True
+        self._listener.stop()
+        if self._handler.dropped:
+            logger.warning(f"{self._handler.dropped} logs de requêtes abandonnés (file pleine)")
+        self._listener = None
+        self._handler = None
+
+
+def truncate(value: Any, max_length: int) -> Any:
+    """Tronque une chaîne trop longue pour le log"""
+    if isinstance(value, str) and len(value) > max_length:
+        return value[:max_length] + "…"
+    return value
+
+
+def should_log(status_code: int, sample_rate: float) -> bool:
+    """Toutes les erreurs (>= 400) sont journalisées, les succès sont échantillonnés"""
+    if status_code >= 400 or sample_rate >= 1:
+        return True
+    return random.random() < sample_rate
+
+
+# Instance globale
+access_log_pipeline = AsyncLogPipeline(access_logger, settings.LOG_QUEUE_SIZE)
+
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     """
@@ -26,10 +156,37 @@ class LoggingMiddleware(BaseHTTPMiddleware):
     - Temps de traitement
     - Code de statut de la réponse
     - Taille de la réponse
+
+    Les erreurs sont toujours journalisées, les succès selon
+    LOG_SUCCESS_SAMPLE_RATE ; chaque champ texte est limité à
+    LOG_FIELD_MAX_LENGTH caractères.
     """
 
-    def __init__(self, app: ASGIApp):
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: Optional[float] = None,
+        field_max_length: Optional[int] = None
+    ):
         super().__init__(app)
+        self.sample_rate = settings.LOG_SUCCESS_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.field_max_length = settings.LOG_FIELD_MAX_LENGTH if field_max_length is None else field_max_length
+
+    def build_log_dict(self, request: Request, correlation_id: str, start_time: float) -> Dict[str, Any]:
+        """Construit l'enregistrement de log (uniquement pour les requêtes journalisées)"""
+        max_length = self.field_max_length
+        return {
+            "correlation_id": correlation_id,
+            "client_ip": request.client.host if request.client else None,
+            "method": request.method,
+            "path": truncate(request.url.path, max_length),
+            "query_params": {
+                truncate(key, max_length): "***" if key in SENSITIVE_QUERY_PARAMS else truncate(value, max_length)
+                for key, value in request.query_params.items()
+            },
+            "user_agent": truncate(request.headers.get("User-Agent", "Unknown"), max_length),
+            "timestamp": datetime.fromtimestamp(start_time, UTC).isoformat(),
+        }
 
     async def dispatch(self, request: Request, call_next):
         # Génération d'un ID de corrélation unique
@@ -38,15 +195,6 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
         # Enregistrement du début de la requête
         start_time = time.time()
-        log_dict = {
-            "correlation_id": correlation_id,
-            "client_ip": request.client.host if request.client else None,
-            "method": request.method,
-            "path": request.url.path,
-            "query_params": dict(request.query_params),
-            "user_agent": request.headers.get("User-Agent", "Unknown"),
-            "timestamp": datetime.now(UTC).isoformat(),
-        }
 
         # Ajout du header X-Correlation-ID
         request.headers.__dict__["_list"].append(
@@ -57,27 +205,31 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             # Traitement de la requête
             response = await call_next(request)
 
+            # Ajout du header X-Correlation-ID à la réponse
+            response.headers["X-Correlation-ID"] = correlation_id
+
+            if not should_log(response.status_code, self.sample_rate):
+                return response
+
             # Calcul du temps de traitement
             process_time = time.time() - start_time
 
             # Enregistrement de la réponse
+            log_dict = self.build_log_dict(request, correlation_id, start_time)
             log_dict.update({
                 "status_code": response.status_code,
                 "processing_time_ms": round(process_time * 1000, 2),
                 "level": "INFO" if response.status_code < 400 else "WARNING" if response.status_code < 500 else "ERROR"
             })
 
-            # Ajout du header X-Correlation-ID à la réponse
-            response.headers["X-Correlation-ID"] = correlation_id
-
-            # Log structuré
-            log_message = json.dumps(log_dict)
+            # Log structuré (sérialisé en JSON par le thread d'écriture)
+            log_message = JSONMessage(log_dict)
             if response.status_code < 400:
-                logger.info(log_message)
+                access_logger.info(log_message)
             elif response.status_code < 500:
-                logger.warning(log_message)
+                access_logger.warning(log_message)
             else:
-                logger.error(log_message)
+                access_logger.error(log_message)
 
             return response
         except Exception as e:
@@ -85,16 +237,17 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             process_time = time.time() - start_time
 
             # Enregistrement de l'erreur
+            log_dict = self.build_log_dict(request, correlation_id, start_time)
             log_dict.update({
                 "status_code": 500,
                 "processing_time_ms": round(process_time * 1000, 2),
                 "level": "ERROR",
-                "error": str(e),
+                "error": truncate(str(e), self.field_max_length),
                 "error_type": type(e).__name__
             })
 
             # Log structuré de l'erreur
-            logger.error(json.dumps(log_dict))
+            access_logger.error(JSONMessage(log_dict))
 
             # Propagation de l'exception pour la gestion d'erreur globale
-            raise 
\ No newline at end of file
+            raise
@@ -6,8 +6,12 @@ import logging
 from app.core.config import settings
 from app.db.mongodb import mongodb, get_db
 from app.db.models import create_indexes
-from app.routers import auth, users, transactions, categories, reports, dashboard, settings as settings_router, budgets, rules, bank_connections, imports, ssl, admin
+from app.routers import auth, users, transactions, categories, reports, dashboard, settings as settings_router, budgets, rules, bank_connections, imports, ssl, admin, sync, events, bootstrap
 from app.interceptors import setup_interceptors
+from app.interceptors.logging import access_log_pipeline
+from app.services.bank_executor import bank_connector_executor
+from app.services.events import event_relay
+from app.services.sync_scheduler import sync_scheduler
 
 # Configuration du logger
 logger = logging.getLogger("budget-api")
@@ -18,13 +22,24 @@ async def lifespan(app: FastAPI):
     Gestionnaire de cycle de vie de l'application.
     Se connecte à MongoDB au démarrage et ferme la connexion à l'arrêt.
     """
-    # Startup: Initialise la connexion à MongoDB
+    # Startup: Logs des requêtes écrits hors de la boucle d'événements
+    access_log_pipeline.start()
+    
+    # Initialise la connexion à MongoDB
     try:
         logger.info("Démarrage de l'application - Connexion à MongoDB...")
         await mongodb.connect_to_database()
         await create_indexes(mongodb)
         logger.info("Application démarrée avec succès - MongoDB connecté")
         
+        # Diffusion des événements temps réel entre workers
+        if settings.EVENTS_CHANGE_STREAM_ENABLED:
+            await event_relay.start(mongodb)
+        
+        # Synchronisation bancaire planifiée en heures creuses
+        if settings.BANK_SYNC_SCHEDULE_ENABLED:
+            sync_scheduler.start(mongodb)
+        
         # Afficher les identifiants de test
         logger.info("=" * 70)
         logger.info("🔐 IDENTIFIANTS DE TEST")
@@ -42,7 +57,11 @@ async def lifespan(app: FastAPI):
     
     yield
     
-    # Shutdown: Ferme la connexion à MongoDB
+    # Shutdown: Arrête la synchronisation planifiée et le pool des connecteurs bancaires,
+    # puis ferme la connexion à MongoDB
+    await sync_scheduler.stop()
+    await event_relay.stop()
+    bank_connector_executor.shutdown(wait=False)
     try:
         logger.info("Arrêt de l'application - Fermeture de la connexion MongoDB...")
         await mongodb.close_database_connection()
@@ -50,6 +69,9 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Erreur lors de la fermeture de la connexion MongoDB: {str(e)}")
         raise
+    finally:
+        # Écrit les derniers logs de requêtes en attente
+        access_log_pipeline.stop()
 
 # Création de l'application FastAPI avec le gestionnaire de cycle de vie
 app = FastAPI(
@@ -95,6 +117,9 @@ app.include_router(bank_connections.router)
 app.include_router(imports.router)
 app.include_router(ssl.router)
 app.include_router(admin.router)
+app.include_router(sync.router)
+app.include_router(events.router)
+app.include_router(bootstrap.router)
 
 
 @app.get("/api/health", tags=["health"])
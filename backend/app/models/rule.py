@@ -23,7 +23,7 @@ class Rule(BaseModel):
     user_id: str
     name: str
     pattern: str
-    match_type: str  # contains, starts_with, ends_with, exact
+    match_type: str  # contains, starts_with, ends_with, exact, regex
     category_id: str
     is_active: bool = True
     exceptions: List[str] = Field(default_factory=list)  # Liste de patterns à exclure
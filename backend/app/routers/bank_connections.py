@@ -10,9 +10,12 @@ from app.schemas.bank_connection import (
     BankConnectionUpdate,
     BankConnectionResponse,
     BankAccountResponse,
-    SyncResult
+    SyncResult,
+    SyncAllResult
 )
 from app.routers.auth import get_current_user
+from app.services.bank_executor import ConnectorTimeoutError
+from app.services.bank_sync import sync_connection, sync_user_connections
 
 router = APIRouter(
     prefix="/api/bank-connections",
@@ -74,8 +77,8 @@ async def create_bank_connection(
             "is_active": True,
             "accounts_count": 0,
             "last_sync": None,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
         }
         
         # Chiffrer les credentials selon le type de connexion (utiliser string pour le chiffrement)
@@ -141,7 +144,7 @@ async def update_bank_connection(
             )
         
         # Préparer les mises à jour
-        update_data = {"updated_at": datetime.now()}
+        update_data = {"updated_at": datetime.utcnow()}
         
         if updates.nickname is not None:
             update_data["nickname"] = updates.nickname
@@ -232,6 +235,29 @@ async def delete_bank_connection(
             detail=f"Erreur lors de la suppression: {str(e)}"
         )
 
+@router.post("/sync-all", response_model=SyncAllResult)
+async def sync_all_bank_connections(
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Synchronise toutes les connexions actives de l'utilisateur en parallèle
+    
+    Une connexion en échec n'interrompt pas les autres : son erreur est
+    renvoyée dans son résultat individuel.
+    """
+    user_id = current_user["_id"]
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+    
+    try:
+        return await sync_user_connections(db, user_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la synchronisation: {str(e)}"
+        )
+
 @router.post("/{connection_id}/sync", response_model=SyncResult)
 async def sync_bank_connection(
     connection_id: str,
@@ -262,163 +288,20 @@ async def sync_bank_connection(
             detail="Connexion désactivée"
         )
     
-    # Déchiffrer les credentials
-    user_id_str = str(user_id)
-    credentials = {}
-    if connection.get("connection_type") == "api":
-        if connection.get("encrypted_api_client_id"):
-            credentials["client_id"] = encryption_service.decrypt(
-                connection["encrypted_api_client_id"], user_id_str
-            )
-        if connection.get("encrypted_api_client_secret"):
-            credentials["client_secret"] = encryption_service.decrypt(
-                connection["encrypted_api_client_secret"], user_id_str
-            )
-    else:
-        if connection.get("encrypted_username"):
-            credentials["username"] = encryption_service.decrypt(
-                connection["encrypted_username"], user_id_str
-            )
-        if connection.get("encrypted_password"):
-            credentials["password"] = encryption_service.decrypt(
-                connection["encrypted_password"], user_id_str
-            )
-    
-    # Importer et utiliser le connecteur approprié
-    bank = connection.get("bank")
-    connection_type = connection.get("connection_type")
-    
-    if bank == "boursobank":
-        if connection_type == "mock":
-            from app.services.boursobank import BoursobankMockConnector
-            connector = BoursobankMockConnector()
-        else:
-            from app.services.boursobank import BoursobankConnector
-            connector = BoursobankConnector()
-    elif bank == "cic":
-        if connection_type == "mock":
-            from app.services.cic import CICMockConnector
-            connector = CICMockConnector()
-        else:
-            from app.services.cic import CICConnector
-            connector = CICConnector()
-    else:
+    # Synchronisation incrémentale (hors de la boucle d'événements pour le connecteur)
+    try:
+        return await sync_connection(db, connection)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Banque non supportée: {bank}"
-        )
-    
-    # Se connecter et récupérer les données
-    try:
-        login_success = await connector.login(
-            credentials.get("username", ""),
-            credentials.get("password", "")
+            detail=str(e)
         )
-        
-        if not login_success:
-            connector.close()
-            return SyncResult(
-                success=False,
-                error="Échec de la connexion: identifiants invalides"
-            )
-        
-        accounts = await connector.get_accounts()
-        new_transactions_count = 0
-        
-        # Sauvegarder les comptes
-        accounts_collection = await db.get_collection("bank_accounts")
-        transactions_collection = await db.get_collection("transactions")
-        
-        for account in accounts:
-            # Vérifier si le compte existe déjà
-            existing_account = await accounts_collection.find_one({
-                "connection_id": ObjectId(connection_id),
-                "external_id": account["id"]
-            })
-            
-            account_data = {
-                "connection_id": ObjectId(connection_id),
-                "user_id": user_id,
-                "external_id": account["id"],
-                "name": account["name"],
-                "account_type": account["type"],
-                "balance": account["balance"],
-                "currency": account.get("currency", "EUR"),
-                "iban": account.get("iban"),
-                "is_active": True,
-                "last_sync": datetime.now(),
-                "updated_at": datetime.now()
-            }
-            
-            if existing_account:
-                await accounts_collection.update_one(
-                    {"_id": existing_account["_id"]},
-                    {"$set": account_data}
-                )
-                bank_account_id = existing_account["_id"]
-            else:
-                account_data["created_at"] = datetime.now()
-                result = await accounts_collection.insert_one(account_data)
-                bank_account_id = result.inserted_id
-            
-            # Récupérer les transactions
-            transactions = await connector.get_transactions(account["id"])
-            
-            # Sauvegarder les transactions
-            for trans in transactions:
-                # Créer un external_id unique basé sur la date (sans l'heure), description et montant absolu
-                transaction_date = datetime.fromisoformat(trans["date"])
-                date_str = transaction_date.date().isoformat()  # Format YYYY-MM-DD seulement
-                amount_abs = abs(trans["amount"])
-                external_id = f"{account['id']}_{date_str}_{amount_abs}_{trans['description'][:20]}"
-                
-                # Vérifier si la transaction existe déjà
-                existing_trans = await transactions_collection.find_one({
-                    "user_id": user_id,
-                    "bank_connection_id": ObjectId(connection_id),
-                    "external_id": external_id
-                })
-                
-                if not existing_trans:
-                    # Déterminer le type en fonction du signe
-                    is_expense = trans["amount"] < 0
-                    transaction_data = {
-                        "user_id": user_id,
-                        "bank_connection_id": ObjectId(connection_id),
-                        "bank_account_id": bank_account_id,
-                        "external_id": external_id,
-                        "amount": amount_abs,  # Toujours en valeur absolue
-                        "description": trans["description"],
-                        "date": transaction_date,
-                        "type": "expense" if is_expense else "income",
-                        "category": None,  # Sera catégorisé par les règles
-                        "created_at": datetime.now(),
-                        "updated_at": datetime.now()
-                    }
-                    await transactions_collection.insert_one(transaction_data)
-                    new_transactions_count += 1
-        
-        # Mettre à jour la connexion
-        await connections_collection.update_one(
-            {"_id": ObjectId(connection_id)},
-            {
-                "$set": {
-                    "last_sync": datetime.now(),
-                    "accounts_count": len(accounts)
-                }
-            }
-        )
-        
-        connector.close()
-        
-        return SyncResult(
-            success=True,
-            new_transactions=new_transactions_count,
-            updated_accounts=len(accounts)
+    except ConnectorTimeoutError as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Délai de synchronisation dépassé: {str(e)}"
         )
-        
     except Exception as e:
-        connector.close()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de la synchronisation: {str(e)}"
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.database import get_db
+from app.routers.budgets import build_budgets
+from app.routers.categories import prepare_mongodb_document_for_response
+from app.routers.dashboard import build_dashboard_data
+from app.routers.rules import build_rules
+from app.routers.settings import get_user_settings
+from app.routers.users import read_users_me
+from app.schemas import Category as CategorySchema
+from app.schemas.rule import RuleResponse
+from app.services.auth import get_current_user
+from app.services.category_tree import CategoryTree
+from app.utils.fast_json import dumps
+
+router = APIRouter(prefix="/api/bootstrap", tags=["bootstrap"])
+
+_categories_adapter = TypeAdapter(List[CategorySchema])
+_rules_adapter = TypeAdapter(List[RuleResponse])
+
+
+def compute_etag(body: bytes) -> str:
+    """ETag fort dérivé du contenu de la réponse"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match désigne l'ETag courant"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@router.get("")
+async def get_bootstrap(
+    request: Request,
+    current_user: Dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Données du premier affichage en une requête : utilisateur, paramètres,
+    catégories, règles, budgets (mensuels) et tableau de bord (période courante).
+    
+    Chaque section est identique à la réponse de l'endpoint correspondant.
+    L'utilisateur est authentifié une seule fois et les catégories, lues une
+    seule fois, sont partagées entre les calculs exécutés en parallèle.
+    La réponse porte un ETag : avec If-None-Match, une réponse 304 vide est
+    renvoyée si rien n'a changé.
+    """
+    category_tree = await CategoryTree.load(db, current_user["_id"])
+    
+    user, user_settings, rules, budgets, dashboard = await asyncio.gather(
+        read_users_me(current_user),
+        get_user_settings(current_user),
+        build_rules(db, current_user, category_tree),
+        build_budgets(db, current_user, "monthly", category_tree),
+        build_dashboard_data(db, current_user, category_tree=category_tree)
+    )
+    
+    categories = [prepare_mongodb_document_for_response(category) for category in category_tree.categories]
+    payload = {
+        "user": user.model_dump(mode="json"),
+        "settings": user_settings,
+        "categories": _categories_adapter.dump_python(_categories_adapter.validate_python(categories), mode="json"),
+        "rules": _rules_adapter.dump_python(_rules_adapter.validate_python(rules), mode="json"),
+        "budgets": [budget.model_dump(mode="json") for budget in budgets],
+        "dashboard": jsonable_encoder(dashboard)
+    }
+    
+    body = dumps(payload)
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag_matches(request.headers.get("If-None-Match", ""), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
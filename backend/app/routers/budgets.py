@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
 
 from app.schemas.budget import BudgetCreate, BudgetUpdate, BudgetResponse
 from app.core.database import get_db
 from app.services.auth import get_current_user
+from app.services.budget_periods import EXPENSE_FILTER, budget_category_ids, reconcile_periods
+from app.services.category_tree import CategoryTree
+from app.utils.fast_json import FastJSONResponse
+from app.utils.field_selection import parse_fields
+from app.services.sync_changes import record_deletions
 
 router = APIRouter(prefix="/api/budgets", tags=["budgets"])
 
+# Champs de la réponse qui nécessitent l'agrégation des dépenses
+SPENDING_FIELDS = {"spent", "remaining", "percentage"}
+
+# Nombre maximal de périodes de /history
+HISTORY_MAX_PERIODS = 36
+
 def get_period_dates(period_type: str, billing_cycle_day: int = 1):
     """Calcule les dates de début et fin selon le type de période"""
     now = datetime.utcnow()
@@ -35,14 +46,178 @@ def get_period_dates(period_type: str, billing_cycle_day: int = 1):
     
     return start_date, end_date
 
+def history_periods(period_type: str, billing_cycle_day: int, count: int) -> List[dict]:
+    """
+    Les count dernières périodes, de la plus ancienne à la période en cours
+    
+    Returns:
+        [{"key": clé de regroupement (YYYY-MM ou YYYY), "label", "start", "end"}]
+    """
+    start_date, end_date = get_period_dates(period_type, billing_cycle_day)
+    periods = []
+    for _ in range(count):
+        if period_type == "monthly":
+            periods.append({
+                "key": start_date.strftime("%Y-%m"),
+                "label": start_date.strftime("%m/%Y"),
+                "start": start_date,
+                "end": end_date
+            })
+            end_date = start_date
+            if start_date.month == 1:
+                start_date = start_date.replace(year=start_date.year - 1, month=12)
+            else:
+                start_date = start_date.replace(month=start_date.month - 1)
+        else:
+            periods.append({
+                "key": start_date.strftime("%Y"),
+                "label": start_date.strftime("%Y"),
+                "start": start_date,
+                "end": end_date
+            })
+            end_date = start_date
+            start_date = start_date.replace(year=start_date.year - 1)
+    periods.reverse()
+    return periods
+
+
+@router.get("/history")
+async def get_budgets_history(
+    periods: int = Query(12, ge=1, le=HISTORY_MAX_PERIODS, description="Nombre de périodes, période en cours comprise"),
+    period_type: str = Query("monthly", pattern="^(monthly|yearly)$"),
+    database = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Dépenses et montant de chaque budget sur les dernières périodes
+    
+    Une seule agrégation regroupe les dépenses par catégorie et par période.
+    Les périodes mensuelles commencent au billing_cycle_day de l'utilisateur :
+    une date est décalée de billing_cycle_day - 1 jours avant d'en prendre le
+    mois. Les sous-catégories sont cumulées dans leur catégorie parente.
+    
+    Returns:
+        periods: libellés et bornes des périodes, de la plus ancienne à la plus récente
+        budgets: par budget, les listes amount et spent alignées sur periods
+        totals: sommes par période (budget, spent), prêtes pour BarChart
+    """
+    billing_cycle_day = current_user.get("billing_cycle_day", 1)
+    history = history_periods(period_type, billing_cycle_day, periods)
+    
+    budgets_collection = await database.get_collection("budgets")
+    transactions_collection = await database.get_collection("transactions")
+    category_tree = await CategoryTree.load(database, current_user["_id"])
+    
+    budgets = [
+        budget for budget in await budgets_collection.find({
+            "user_id": current_user["_id"],
+            "period_type": period_type
+        }).to_list(length=None)
+        if category_tree.get(budget["category_id"])
+    ]
+    category_ids = {str(budget["_id"]): budget_category_ids(budget, category_tree) for budget in budgets}
+    
+    totals = {}
+    if budgets:
+        offset_ms = (billing_cycle_day - 1) * 24 * 3600 * 1000 if period_type == "monthly" else 0
+        pipeline = [
+            {
+                "$match": {
+                    "user_id": current_user["_id"],
+                    "category_id": {"$in": [category_id for ids in category_ids.values() for category_id in ids]},
+                    "date": {"$gte": history[0]["start"], "$lt": history[-1]["end"]},
+                    **EXPENSE_FILTER
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "category_id": "$category_id",
+                        "period": {"$dateToString": {
+                            "format": "%Y-%m" if period_type == "monthly" else "%Y",
+                            "date": {"$subtract": ["$date", offset_ms]}
+                        }}
+                    },
+                    "total": {"$sum": "$amount"}
+                }
+            }
+        ]
+        for row in await transactions_collection.aggregate(pipeline).to_list(length=None):
+            totals[(str(row["_id"]["category_id"]), row["_id"]["period"])] = row["total"]
+    
+    budget_rows = []
+    for budget in budgets:
+        ids = [str(category_id) for category_id in category_ids[str(budget["_id"])]]
+        spent = [round(sum(totals.get((category_id, period["key"]), 0.0) for category_id in ids), 2) for period in history]
+        if budget.get("is_recurring", True):
+            amounts = [budget["amount"]] * len(history)
+        else:
+            # Budget ponctuel : seulement pour son mois (ou son année)
+            key = f"{budget.get('year')}-{budget.get('month') or 0:02d}" if period_type == "monthly" else str(budget.get("year"))
+            amounts = [budget["amount"] if period["key"] == key else 0.0 for period in history]
+        category = category_tree.get(budget["category_id"])
+        budget_rows.append({
+            "id": str(budget["_id"]),
+            "category_id": str(budget["category_id"]),
+            "category_name": category["name"],
+            "category_color": category.get("color"),
+            "amount": amounts,
+            "spent": spent
+        })
+    
+    return {
+        "period_type": period_type,
+        "periods": [
+            {"label": period["label"], "start": period["start"], "end": period["end"]}
+            for period in history
+        ],
+        "budgets": budget_rows,
+        "totals": {
+            "budget": [round(sum(row["amount"][index] for row in budget_rows), 2) for index in range(len(history))],
+            "spent": [round(sum(row["spent"][index] for row in budget_rows), 2) for index in range(len(history))]
+        }
+    }
+
+
 @router.get("/", response_model=List[BudgetResponse])
 async def get_budgets(
     period_type: str = "monthly",
+    fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules (ex. id,category_name,amount)"),
     database = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Récupère tous les budgets de l'utilisateur avec les dépenses actuelles"""
-    
+    """
+    Récupère tous les budgets de l'utilisateur avec les dépenses actuelles
+    
+    Avec fields=, seuls les champs demandés sont renvoyés ; les dépenses ne
+    sont calculées que si spent, remaining ou percentage sont demandés.
+    """
+    selected_fields = parse_fields(fields, BudgetResponse)
+    if not selected_fields:
+        return await build_budgets(database, current_user, period_type)
+    
+    with_spending = bool(SPENDING_FIELDS & set(selected_fields))
+    budgets = await build_budgets(database, current_user, period_type, with_spending=with_spending)
+    return FastJSONResponse(content=[
+        budget.model_dump(mode="json", include=set(selected_fields)) for budget in budgets
+    ])
+
+
+async def build_budgets(
+    database,
+    current_user: dict,
+    period_type: str = "monthly",
+    category_tree: Optional[CategoryTree] = None,
+    with_spending: bool = True
+) -> List[BudgetResponse]:
+    """
+    Budgets de l'utilisateur avec les dépenses de la période en cours.
+    
+    Les catégories et sous-catégories sont résolues sur l'arbre des catégories
+    (chargé une fois, ou fourni par l'appelant). Les dépenses sont lues dans
+    budget_periods (recalculées seulement si la période est absente ou
+    périmée). Avec with_spending=False, elles ne sont pas lues (spent vaut 0).
+    """
     # Récupérer le billing_cycle_day de l'utilisateur
     billing_cycle_day = current_user.get("billing_cycle_day", 1)
     
@@ -51,8 +226,8 @@ async def get_budgets(
     
     # Récupérer les collections
     budgets_collection = await database.get_collection("budgets")
-    categories_collection = await database.get_collection("categories")
-    transactions_collection = await database.get_collection("transactions")
+    if category_tree is None:
+        category_tree = await CategoryTree.load(database, current_user["_id"])
     
     # Récupérer tous les budgets de l'utilisateur
     budgets_cursor = budgets_collection.find({
@@ -60,47 +235,22 @@ async def get_budgets(
         "period_type": period_type
     })
     
-    budgets = await budgets_cursor.to_list(length=None)
+    budgets = [
+        budget for budget in await budgets_cursor.to_list(length=None)
+        if category_tree.get(budget["category_id"])
+    ]
+    
+    # Dépenses de la période (catégorie et sous-catégories), matérialisées par budget
+    spent_by_budget = {}
+    if with_spending:
+        spent_by_budget = await reconcile_periods(
+            database, current_user["_id"], budgets, start_date, end_date, category_tree
+        )
     
     result = []
     for budget in budgets:
-        # Récupérer les infos de la catégorie
-        category = await categories_collection.find_one({"_id": budget["category_id"]})
-        if not category:
-            continue
-        
-        # Récupérer les IDs des sous-catégories si c'est une catégorie parente
-        category_ids = [budget["category_id"]]
-        
-        # Chercher les sous-catégories (parent_id est ObjectId en base)
-        subcategories = await categories_collection.find({
-            "parent_id": budget["category_id"]
-        }).to_list(length=None)
-        
-        # Ajouter les IDs des sous-catégories
-        for subcat in subcategories:
-            category_ids.append(subcat["_id"])
-        
-        # Calculer les dépenses pour cette catégorie ET ses sous-catégories dans la période (utiliser datetime directement)
-        pipeline = [
-            {
-                "$match": {
-                    "user_id": current_user["_id"],
-                    "category_id": {"$in": category_ids},
-                    "is_expense": True,
-                    "date": {"$gte": start_date, "$lt": end_date}
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "total": {"$sum": "$amount"}
-                }
-            }
-        ]
-        
-        spent_result = await transactions_collection.aggregate(pipeline).to_list(length=1)
-        spent = spent_result[0]["total"] if spent_result else 0.0
+        category = category_tree.get(budget["category_id"])
+        spent = spent_by_budget.get(str(budget["_id"]), 0.0)
         
         remaining = budget["amount"] - spent
         percentage = (spent / budget["amount"] * 100) if budget["amount"] > 0 else 0
@@ -133,7 +283,6 @@ async def create_budget(
     # Récupérer les collections
     budgets_collection = await database.get_collection("budgets")
     categories_collection = await database.get_collection("categories")
-    transactions_collection = await database.get_collection("transactions")
     
     # Vérifier que la catégorie existe et appartient à l'utilisateur
     category = await categories_collection.find_one({
@@ -195,30 +344,14 @@ async def create_budget(
     result = await budgets_collection.insert_one(budget)
     budget["_id"] = result.inserted_id
     
-    # Calculer les dépenses pour la réponse
+    # Dépenses de la période en cours (catégorie et sous-catégories), matérialisées
     billing_cycle_day = current_user.get("billing_cycle_day", 1)
     start_date, end_date = get_period_dates(budget_data.period_type, billing_cycle_day)
-    
-    # Calculer le montant dépensé (utiliser datetime objects directement)
-    pipeline = [
-        {
-            "$match": {
-                "user_id": current_user["_id"],
-                "category_id": ObjectId(budget_data.category_id),
-                "is_expense": True,
-                "date": {"$gte": start_date, "$lt": end_date}
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "total": {"$sum": "$amount"}
-            }
-        }
-    ]
-    
-    spent_result = await transactions_collection.aggregate(pipeline).to_list(length=1)
-    spent = spent_result[0]["total"] if spent_result else 0.0
+    category_tree = await CategoryTree.load(database, current_user["_id"])
+    spent_by_budget = await reconcile_periods(
+        database, current_user["_id"], [budget], start_date, end_date, category_tree, force=True
+    )
+    spent = spent_by_budget[str(budget["_id"])]
     
     remaining = budget["amount"] - spent
     percentage = (spent / budget["amount"] * 100) if budget["amount"] > 0 else 0
@@ -250,7 +383,6 @@ async def update_budget(
     # Récupérer les collections
     budgets_collection = await database.get_collection("budgets")
     categories_collection = await database.get_collection("categories")
-    transactions_collection = await database.get_collection("transactions")
     
     # Vérifier que le budget existe et appartient à l'utilisateur
     budget = await budgets_collection.find_one({
@@ -287,32 +419,14 @@ async def update_budget(
     # Récupérer les infos de la catégorie
     category = await categories_collection.find_one({"_id": updated_budget["category_id"]})
     
-    # Calculer les dépenses
+    # Dépenses de la période en cours, recalculées avec le budget modifié
     billing_cycle_day = current_user.get("billing_cycle_day", 1)
     start_date, end_date = get_period_dates(updated_budget["period_type"], billing_cycle_day)
-    
-    # Convertir les dates en strings pour MongoDB
-    
-    # Calculer le montant dépensé (utiliser datetime objects directement)
-    pipeline = [
-        {
-            "$match": {
-                "user_id": current_user["_id"],
-                "category_id": updated_budget["category_id"],
-                "is_expense": True,
-                "date": {"$gte": start_date, "$lt": end_date}
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "total": {"$sum": "$amount"}
-            }
-        }
-    ]
-    
-    spent_result = await transactions_collection.aggregate(pipeline).to_list(length=1)
-    spent = spent_result[0]["total"] if spent_result else 0.0
+    category_tree = await CategoryTree.load(database, current_user["_id"])
+    spent_by_budget = await reconcile_periods(
+        database, current_user["_id"], [updated_budget], start_date, end_date, category_tree, force=True
+    )
+    spent = spent_by_budget[str(updated_budget["_id"])]
     
     remaining = updated_budget["amount"] - spent
     percentage = (spent / updated_budget["amount"] * 100) if updated_budget["amount"] > 0 else 0
@@ -353,4 +467,9 @@ async def delete_budget(
             detail="Budget non trouvé"
         )
     
+    periods_collection = await database.get_collection("budget_periods")
+    await periods_collection.delete_many({"budget_id": ObjectId(budget_id)})
+    alerts_collection = await database.get_collection("budget_alerts")
+    await alerts_collection.delete_many({"budget_id": ObjectId(budget_id)})
+    await record_deletions(database, current_user["_id"], "budgets", [budget_id])
     return None
@@ -2,11 +2,15 @@ from typing import List, Optional, Dict
 from datetime import datetime, UTC
 from bson import ObjectId
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.core.database import get_db
 from app.schemas import Category as CategorySchema, CategoryCreate, CategoryUpdate
 from app.services.auth import get_current_user
+from app.services.category_paths import category_path, refresh_subtree_paths
+from app.services.sync_changes import record_deletions
+from app.utils.fast_json import FastJSONResponse
+from app.utils.field_selection import parse_fields, projection_for_fields, select_fields
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
@@ -28,12 +32,17 @@ def prepare_mongodb_document_for_response(document: Dict) -> Dict:
             result["id"] = str(value)
         elif isinstance(value, ObjectId):
             result[key] = str(value)
+        elif isinstance(value, list) and any(isinstance(item, ObjectId) for item in value):
+            # Listes d'ObjectId (ancestors)
+            result[key] = [str(item) if isinstance(item, ObjectId) else item for item in value]
         else:
             result[key] = value
     
-    # Ajouter created_at si manquant pour compatibilité
+    # Ajouter created_at si manquant pour compatibilité (date de création de
+    # l'ObjectId : stable d'un appel à l'autre, nécessaire aux ETag du bootstrap)
     if "created_at" not in result:
-        result["created_at"] = datetime.now(UTC)
+        object_id = document.get("_id")
+        result["created_at"] = object_id.generation_time if isinstance(object_id, ObjectId) else datetime.now(UTC)
     
     return result
 
@@ -42,6 +51,7 @@ def prepare_mongodb_document_for_response(document: Dict) -> Dict:
 async def get_categories(
     type: str = None,
     include_subcategories: bool = True,
+    fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules (ex. id,name,color)"),
     current_user: Dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
@@ -49,7 +59,10 @@ async def get_categories(
     Récupérer toutes les catégories de l'utilisateur.
     Si include_subcategories=True, retourne toutes les catégories (parentes et sous-catégories).
     Sinon, retourne uniquement les catégories parentes (parent_id=null).
+    Avec fields=, seuls les champs demandés sont lus et renvoyés.
     """
+    selected_fields = parse_fields(fields, CategorySchema)
+    
     filter_query = {"user_id": current_user["_id"]}
     if type:
         filter_query["type"] = type
@@ -58,9 +71,16 @@ async def get_categories(
         filter_query["parent_id"] = None
     
     collection = await db.get_collection("categories")
-    cursor = collection.find(filter_query).sort("name", 1)
+    projection = projection_for_fields(selected_fields) if selected_fields else None
+    cursor = collection.find(filter_query, projection).sort("name", 1)
     categories = await cursor.to_list(length=None)
     
+    if selected_fields:
+        return FastJSONResponse(content=[
+            select_fields(CategorySchema, prepare_mongodb_document_for_response(cat), selected_fields)
+            for cat in categories
+        ])
+    
     return [prepare_mongodb_document_for_response(cat) for cat in categories]
 
 
@@ -87,6 +107,7 @@ async def create_category(
         )
     
     # Si c'est une sous-catégorie, vérifier que la catégorie parente existe
+    parent_category = None
     if category.parent_id:
         parent_category = await db.find_one("categories", {
             "_id": ObjectId(category.parent_id),
@@ -106,9 +127,12 @@ async def create_category(
                 detail="Impossible de créer une sous-catégorie d'une sous-catégorie (maximum 2 niveaux)"
             )
     
-    # Préparer les données de la catégorie
+    # Préparer les données de la catégorie, avec son chemin matérialisé
     category_data = category.model_dump()
+    category_data.update(category_path(category.name, parent_category))
     category_data["user_id"] = current_user["_id"]
+    category_data["created_at"] = datetime.now(UTC)
+    category_data["updated_at"] = category_data["created_at"]
     
     # Insérer la catégorie
     result = await db.insert_one("categories", category_data)
@@ -211,6 +235,40 @@ async def update_category(
     
     # Préparer les données de mise à jour
     update_data = category_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.now(UTC)
+    
+    # Déplacement : la nouvelle parente ne peut être ni la catégorie ni l'une de ses descendantes
+    moved = "parent_id" in update_data and str(update_data["parent_id"] or "") != str(existing_category.get("parent_id") or "")
+    if moved and update_data["parent_id"]:
+        parent_category = None
+        if ObjectId.is_valid(update_data["parent_id"]):
+            parent_category = await db.find_one("categories", {
+                "_id": ObjectId(update_data["parent_id"]),
+                "user_id": current_user["_id"]
+            })
+        
+        if not parent_category:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Catégorie parente non trouvée"
+            )
+        
+        if parent_category["_id"] == existing_category["_id"] or existing_category["_id"] in parent_category.get("ancestors", []):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Impossible de déplacer une catégorie sous elle-même ou l'une de ses sous-catégories"
+            )
+        
+        collection = await db.get_collection("categories")
+        has_subcategories = await collection.count_documents({
+            "ancestors": existing_category["_id"],
+            "user_id": current_user["_id"]
+        })
+        if parent_category.get("parent_id") or has_subcategories:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Impossible de créer une sous-catégorie d'une sous-catégorie (maximum 2 niveaux)"
+            )
     
     # Mettre à jour la catégorie (update_one ajoute déjà $set)
     await db.update_one(
@@ -219,15 +277,19 @@ async def update_category(
         update_data
     )
     
+    # Renommage ou déplacement : chemins de la catégorie et de ses descendantes
+    if "name" in update_data or moved:
+        await refresh_subtree_paths(db, current_user["_id"], category_id)
+    
     # Si le type a été modifié et que c'est une catégorie parente, mettre à jour toutes ses sous-catégories
     if category_update.type is not None and existing_category.get("parent_id") is None:
         collection = await db.get_collection("categories")
         await collection.update_many(
             {
-                "parent_id": category_id,
+                "ancestors": ObjectId(category_id),
                 "user_id": current_user["_id"]
             },
-            {"$set": {"type": category_update.type}}
+            {"$set": {"type": category_update.type, "updated_at": update_data["updated_at"]}}
         )
     
     # Récupérer la catégorie mise à jour
@@ -260,7 +322,7 @@ async def delete_category(
     # Vérifier si la catégorie a des sous-catégories
     collection = await db.get_collection("categories")
     subcategory_count = await collection.count_documents({
-        "parent_id": category_id,
+        "ancestors": ObjectId(category_id),
         "user_id": current_user["_id"]
     })
     
@@ -284,6 +346,7 @@ async def delete_category(
     
     # Supprimer la catégorie
     await db.delete_one("categories", {"_id": ObjectId(category_id)})
+    await record_deletions(db, current_user["_id"], "categories", [category_id])
     
     return {"message": "Catégorie supprimée avec succès"}
 
@@ -296,7 +359,8 @@ async def get_category_usage_stats(
     """
     Récupérer les statistiques d'utilisation des catégories.
     """
-    # Agréger les données d'utilisation des catégories
+    # Agréger les données d'utilisation des catégories, avec la catégorie jointe
+    # par $lookup (les groupes sans catégorie existante sont écartés)
     pipeline = [
         {"$match": {"user_id": current_user["_id"]}},
         {"$group": {
@@ -304,21 +368,26 @@ async def get_category_usage_stats(
             "total_amount": {"$sum": "$amount"},
             "count": {"$sum": 1}
         }},
+        {"$lookup": {
+            "from": "categories",
+            "localField": "_id",
+            "foreignField": "_id",
+            "as": "category"
+        }},
+        {"$unwind": "$category"},
         {"$sort": {"total_amount": -1}}
     ]
     
     collection = await db.get_collection("transactions")
     results = await collection.aggregate(pipeline).to_list(length=None)
     
-    # Récupérer les détails des catégories
-    category_stats = []
-    for result in results:
-        category = await db.find_one("categories", {"_id": result["_id"]})
-        if category:
-            category_stats.append({
-                "category": prepare_mongodb_document_for_response(category),
-                "total_amount": result["total_amount"],
-                "transaction_count": result["count"]
-            })
+    category_stats = [
+        {
+            "category": prepare_mongodb_document_for_response(result["category"]),
+            "total_amount": result["total_amount"],
+            "transaction_count": result["count"]
+        }
+        for result in results
+    ]
     
     return category_stats 
\ No newline at end of file
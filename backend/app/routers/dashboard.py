@@ -6,6 +6,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.core.database import get_db
 from app.services.auth import get_current_user
+from app.services.analytics_cache import analytics_cache
+from app.services.budget_alerts import current_alerts
+from app.services.category_tree import CategoryTree
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -21,6 +24,22 @@ async def get_dashboard_data(
     """
     Récupérer les données du tableau de bord.
     """
+    return await build_dashboard_data(db, current_user, period, start_date, end_date)
+
+
+async def build_dashboard_data(
+    db,
+    current_user: Dict,
+    period: str = "current",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category_tree: Optional[CategoryTree] = None
+) -> Dict:
+    """
+    Construit les données du tableau de bord.
+    
+    category_tree permet de réutiliser les catégories déjà chargées (bootstrap).
+    """
     try:
         # Si start_date et end_date sont fournis, utiliser ces dates
         if start_date and end_date:
@@ -70,113 +89,32 @@ async def get_dashboard_data(
                 start_datetime = datetime(now.year, 1, 1)
                 end_datetime = datetime(now.year + 1, 1, 1)
 
-        # Récupérer les transactions de la période
+        # Totaux et regroupements par catégorie calculés sur l'instantané
+        # analytique de l'utilisateur (sans aller-retour MongoDB si à jour)
         collection = await db.get_collection("transactions")
+        snapshot = await analytics_cache.get_snapshot(db, current_user)
         
-        # Pipeline pour les statistiques générales
-        stats_pipeline = [
-            {"$match": {
-                "user_id": current_user["_id"],
-                "date": {"$gte": start_datetime, "$lt": end_datetime}
-            }},
-            {"$addFields": {
-                "computed_is_expense": {
-                    "$cond": [
-                        {"$eq": [{"$type": "$is_expense"}, "bool"]},
-                        "$is_expense",
-                        {"$eq": ["$type", "expense"]}
-                    ]
-                }
-            }},
-            {"$group": {
-                "_id": "$computed_is_expense",
-                "total_amount": {"$sum": "$amount"},
-                "count": {"$sum": 1}
-            }}
-        ]
-        
-        stats_results = await collection.aggregate(stats_pipeline).to_list(length=None)
-        
-        # Calculer les totaux
-        total_income = 0
-        total_expenses = 0
-        income_count = 0
-        expense_count = 0
-        
-        for result in stats_results:
-            if result["_id"]:  # is_expense = True
-                total_expenses = result["total_amount"]
-                expense_count = result["count"]
-            else:  # is_expense = False
-                total_income = result["total_amount"]
-                income_count = result["count"]
+        stats = snapshot.totals(start_datetime, end_datetime)
+        total_income = stats["total_income"]
+        total_expenses = stats["total_expenses"]
+        income_count = stats["income_count"]
+        expense_count = stats["expense_count"]
         
         net_amount = total_income - total_expenses
         
-        # Pipeline pour les dépenses par catégorie
-        category_pipeline = [
-            {"$match": {
-                "user_id": current_user["_id"],
-                "date": {"$gte": start_datetime, "$lt": end_datetime}
-            }},
-            {"$addFields": {
-                "computed_is_expense": {
-                    "$cond": [
-                        {"$eq": [{"$type": "$is_expense"}, "bool"]},
-                        "$is_expense",
-                        {"$eq": ["$type", "expense"]}
-                    ]
-                }
-            }},
-            {"$match": {
-                "computed_is_expense": True
-            }},
-            {"$group": {
-                "_id": "$category_id",
-                "total": {"$sum": "$amount"},
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"total": -1}}
-        ]
-        
-        category_results = await collection.aggregate(category_pipeline).to_list(length=None)
-        
-        # Pipeline pour les revenus par catégorie
-        income_category_pipeline = [
-            {"$match": {
-                "user_id": current_user["_id"],
-                "date": {"$gte": start_datetime, "$lt": end_datetime}
-            }},
-            {"$addFields": {
-                "computed_is_expense": {
-                    "$cond": [
-                        {"$eq": [{"$type": "$is_expense"}, "bool"]},
-                        "$is_expense",
-                        {"$eq": ["$type", "expense"]}
-                    ]
-                }
-            }},
-            {"$match": {
-                "computed_is_expense": False
-            }},
-            {"$group": {
-                "_id": "$category_id",
-                "total": {"$sum": "$amount"},
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"total": -1}}
-        ]
-        
-        income_category_results = await collection.aggregate(income_category_pipeline).to_list(length=None)
+        # Dépenses et revenus par catégorie (triés par total décroissant)
+        category_results = snapshot.by_category(start_datetime, end_datetime, is_expense=True)
+        income_category_results = snapshot.by_category(start_datetime, end_datetime, is_expense=False)
         
         # Récupérer les détails des catégories
-        categories = await db.find_many("categories", {"user_id": current_user["_id"]})
-        category_map = {str(cat["_id"]): cat for cat in categories}
+        if category_tree is None:
+            category_tree = await CategoryTree.load(db, current_user["_id"])
+        category_map = category_tree.by_id
         
         # Préparer les données des catégories de dépenses
         expenses_by_category = []
         for result in category_results:
-            category_id = str(result["_id"]) if result["_id"] else "uncategorized"
+            category_id = result["category_id"] or "uncategorized"
             category_data = {
                 "id": category_id,
                 "total": result["total"],
@@ -207,7 +145,7 @@ async def get_dashboard_data(
         # Préparer les données des catégories de revenus
         income_by_category = []
         for result in income_category_results:
-            category_id = str(result["_id"]) if result["_id"] else "uncategorized"
+            category_id = result["category_id"] or "uncategorized"
             category_data = {
                 "id": category_id,
                 "total": result["total"],
@@ -396,10 +334,8 @@ async def get_dashboard_data(
                     spent = expenses_dict.get(budget_category_id, 0)
                     
                     # Ajouter les dépenses des sous-catégories
-                    for cat_id, cat_data in category_map.items():
-                        parent_id = cat_data.get("parent_id")
-                        if parent_id and str(parent_id) == budget_category_id:
-                            spent += expenses_dict.get(cat_id, 0)
+                    for subcategory_id in category_tree.subtree_ids(budget_category_id)[1:]:
+                        spent += expenses_dict.get(str(subcategory_id), 0)
                     
                     # Calculer le montant du budget selon la période
                     budget_amount = budget["amount"]
@@ -514,7 +450,30 @@ async def get_budget_alerts(
     db = Depends(get_db)
 ):
     """
-    Récupérer les alertes budgétaires.
+    Récupérer les alertes budgétaires des périodes en cours.
+    
+    Les alertes sont enregistrées à l'écriture des transactions, lorsqu'un
+    budget atteint un seuil (BUDGET_ALERT_THRESHOLDS) : leur lecture est une
+    requête indexée, sans agrégation des transactions.
     """
-    # À implémenter plus tard
-    return {"alerts": []}
+    alerts = await current_alerts(db, current_user["_id"])
+    category_tree = await CategoryTree.load(db, current_user["_id"]) if alerts else None
+    
+    return {
+        "alerts": [
+            {
+                "id": str(alert["_id"]),
+                "budget_id": str(alert["budget_id"]),
+                "category_id": str(alert["category_id"]) if alert.get("category_id") else None,
+                "category_name": category_tree.label(alert.get("category_id")),
+                "threshold": alert["threshold"],
+                "amount": alert["amount"],
+                "spent": alert["spent"],
+                "percentage": alert["percentage"],
+                "period_start": alert["period_start"],
+                "period_end": alert["period_end"],
+                "created_at": alert["created_at"]
+            }
+            for alert in alerts
+        ]
+    }
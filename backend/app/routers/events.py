@@ -0,0 +1,62 @@
+import asyncio
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.services.auth import get_user_from_token
+from app.services.events import Subscription, event_bus
+from app.utils.fast_json import dumps
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+def format_event(event: Dict) -> str:
+    """Formate un événement au format Server-Sent Events"""
+    return f"event: {event['type']}\ndata: {dumps(event).decode()}\n\n"
+
+
+async def event_stream(subscription: Subscription):
+    """
+    Flux SSE d'un abonnement : attend les événements sans interroger la base,
+    avec un commentaire de maintien de connexion en l'absence d'activité.
+    """
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="Token JWT (EventSource ne permet pas d'en-tête Authorization)"),
+    db = Depends(get_db)
+):
+    """
+    Événements de changement de l'utilisateur en Server-Sent Events.
+    
+    Types d'événements : transactions.changed, import.progress,
+    import.completed, bank_sync.completed, budget.threshold et resync
+    (événements perdus : recharger les données).
+    """
+    authorization = request.headers.get("Authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    current_user = await get_user_from_token(token, db)
+    
+    subscription = event_bus.subscribe(current_user["_id"])
+    return StreamingResponse(
+        event_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -9,9 +9,16 @@ from bson import ObjectId
 from app.core.database import get_db
 from app.routers.auth import get_current_user
 from app.services.csv_import import CSVImportService
+from app.services.change_tracking import notify_transactions_changed
+from app.services.events import IMPORT_COMPLETED, IMPORT_PROGRESS, event_bus
+from app.services.rule_engine import rule_set_cache
+from app.services.transaction_search import with_search_tokens
 
 router = APIRouter(prefix="/api/import", tags=["import"])
 
+# Nombre minimal de transactions entre deux événements de progression
+IMPORT_PROGRESS_MIN_STEP = 100
+
 
 @router.post("/preview")
 async def preview_csv_file(
@@ -175,19 +182,26 @@ async def import_csv_transactions(
     
     # Insère les transactions
     transactions_collection = await db.get_collection("transactions")
-    rules_collection = await db.get_collection("rules")
     
-    # Récupérer toutes les règles actives une seule fois
-    active_rules = await rules_collection.find({
-        "user_id": user_id,
-        "is_active": True
-    }).to_list(length=None)
+    # Règles actives compilées (cache par utilisateur)
+    rule_set = await rule_set_cache.get(db, user_id, current_user.get("rules_version", 0))
     
     inserted_count = 0
     skipped_count = 0
     errors = []
+    total = len(prepared['transactions'])
+    # Progression publiée aux clients connectés environ tous les 5 %
+    progress_step = max(IMPORT_PROGRESS_MIN_STEP, total // 20)
     
-    for trans_data in prepared['transactions']:
+    for index, trans_data in enumerate(prepared['transactions'], start=1):
+        if index % progress_step == 0:
+            event_bus.publish(user_id, {
+                "type": IMPORT_PROGRESS,
+                "processed": index,
+                "total": total,
+                "imported": inserted_count,
+                "skipped": skipped_count
+            })
         try:
             # Convertit les IDs en ObjectId
             trans_data['user_id'] = user_id
@@ -200,8 +214,8 @@ async def import_csv_transactions(
             
             # Convertit la date ISO en datetime
             trans_data['date'] = datetime.fromisoformat(trans_data['date'])
-            trans_data['created_at'] = datetime.now()
-            trans_data['updated_at'] = datetime.now()
+            trans_data['created_at'] = datetime.utcnow()
+            trans_data['updated_at'] = trans_data['created_at']
             
             # Vérifie si la transaction existe déjà (si external_id présent)
             if 'external_id' in trans_data:
@@ -214,54 +228,11 @@ async def import_csv_transactions(
                     skipped_count += 1
                     continue
             
-            # Applique les règles AVANT l'insertion
-            description = trans_data.get('description', '').upper()
-            transaction_date = trans_data['date']
-            
-            for rule in active_rules:
-                pattern = rule['pattern'].upper()
-                match_type = rule['match_type']
-                
-                # Vérifier la période d'application
-                if rule.get('start_date'):
-                    start_date = rule['start_date'] if isinstance(rule['start_date'], datetime) else datetime.fromisoformat(rule['start_date'])
-                    if transaction_date < start_date:
-                        continue
-                
-                if rule.get('end_date'):
-                    end_date = rule['end_date'] if isinstance(rule['end_date'], datetime) else datetime.fromisoformat(rule['end_date'])
-                    if transaction_date > end_date:
-                        continue
-                
-                # Vérifier les exceptions
-                exceptions = rule.get('exceptions', [])
-                is_exception = False
-                for exception_pattern in exceptions:
-                    if exception_pattern.upper() in description:
-                        is_exception = True
-                        break
-                
-                if is_exception:
-                    continue
-                
-                # Vérifier le match
-                matched = False
-                if match_type == 'contains':
-                    matched = pattern in description
-                elif match_type == 'starts_with':
-                    matched = description.startswith(pattern)
-                elif match_type == 'ends_with':
-                    matched = description.endswith(pattern)
-                elif match_type == 'exact':
-                    matched = description == pattern
-                
-                if matched:
-                    # Appliquer la catégorie de la règle
-                    trans_data['category_id'] = rule['category_id']
-                    break  # Première règle qui match
+            # Applique les règles AVANT l'insertion (première règle qui match)
+            rule_set.categorize(trans_data)
             
             # Insère la transaction
-            await transactions_collection.insert_one(trans_data)
+            await transactions_collection.insert_one(with_search_tokens(trans_data))
             inserted_count += 1
             
         except Exception as e:
@@ -270,10 +241,20 @@ async def import_csv_transactions(
                 'error': str(e)
             })
     
+    if inserted_count:
+        await notify_transactions_changed(db, user_id, "imported", inserted_count)
+    event_bus.publish(user_id, {
+        "type": IMPORT_COMPLETED,
+        "total": total,
+        "imported": inserted_count,
+        "skipped": skipped_count,
+        "errors": len(errors)
+    })
+    
     return {
         "success": True,
         "imported": inserted_count,
         "skipped": skipped_count,
         "errors": errors,
-        "total_processed": len(prepared['transactions'])
+        "total_processed": total
     }
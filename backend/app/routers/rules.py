@@ -1,44 +1,99 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from typing import List, Optional
 from datetime import datetime, date
 from bson import ObjectId
 
 from ..core.database import get_db
-from ..schemas.rule import RuleCreate, RuleUpdate, RuleResponse
+from ..schemas.rule import RuleCreate, RulePreview, RuleUpdate, RuleResponse
 from ..schemas.user import User
 from .auth import get_current_user
+from ..services.change_tracking import notify_rules_changed, notify_transactions_changed
+from ..services.rule_engine import (
+    CompiledRule,
+    RegexRuleError,
+    compile_regex,
+    rule_prefilter,
+    rule_set_cache,
+    to_date
+)
+from ..services.sync_changes import record_deletions
+from ..services.category_paths import category_label
+from ..services.category_tree import CategoryTree
 
 router = APIRouter(prefix="/api/rules", tags=["rules"])
 
+# Nombre de transactions renvoyées en exemple par /preview
+PREVIEW_SAMPLE_SIZE = 10
+
+
+def _validate_pattern(pattern: str, match_type: str) -> None:
+    """Vérifie qu'un motif regex est valide et d'exécution bornée (400 sinon)"""
+    if match_type != "regex":
+        return
+    try:
+        compile_regex(pattern)
+    except RegexRuleError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+async def _category_labels(categories_collection, category_ids) -> dict:
+    """
+    Construit les libellés « Parent › Catégorie » d'une liste de catégories.
+    
+    Une seule requête par $in : le libellé complet est matérialisé sur chaque
+    catégorie (path_label).
+    
+    Returns:
+        {category_id (str): libellé}
+    """
+    object_ids = {
+        ObjectId(str(category_id))
+        for category_id in category_ids
+        if category_id and ObjectId.is_valid(str(category_id))
+    }
+    if not object_ids:
+        return {}
+    
+    categories = await categories_collection.find(
+        {"_id": {"$in": list(object_ids)}}, {"name": 1, "path_label": 1}
+    ).to_list(length=None)
+    
+    return {str(category["_id"]): category_label(category) for category in categories}
+
 @router.get("/", response_model=List[RuleResponse])
 async def get_rules(
     current_user: dict = Depends(get_current_user),
     database = Depends(get_db)
 ):
     """Récupère toutes les règles de l'utilisateur"""
+    return await build_rules(database, current_user)
+
+
+async def build_rules(database, current_user: dict, category_tree: Optional[CategoryTree] = None) -> List[dict]:
+    """
+    Règles de l'utilisateur avec le libellé de leur catégorie.
+    
+    Les libellés viennent de category_tree s'il est fourni (bootstrap), sinon
+    d'une seule requête $in sur les catégories référencées, qui lit leur
+    chemin matérialisé path_label.
+    """
     rules_collection = await database.get_collection("rules")
-    categories_collection = await database.get_collection("categories")
-    
     rules = await rules_collection.find({"user_id": current_user["_id"]}).to_list(length=None)
     
-    # Enrichir avec le nom de la catégorie
+    # Libellés des catégories résolus en une seule requête
+    if category_tree is not None:
+        labels = {
+            str(rule["category_id"]): category_tree.label(rule["category_id"])
+            for rule in rules
+            if category_tree.get(rule["category_id"])
+        }
+    else:
+        categories_collection = await database.get_collection("categories")
+        labels = await _category_labels(categories_collection, [rule["category_id"] for rule in rules])
+    
     result = []
     for rule in rules:
-        # category_id peut être ObjectId ou string, on gère les deux cas
-        cat_id = rule["category_id"] if isinstance(rule["category_id"], ObjectId) else ObjectId(rule["category_id"])
-        category = await categories_collection.find_one({"_id": cat_id})
-        category_name = "Inconnue"
-        
-        if category:
-            if category.get("parent_id"):
-                parent_id = category["parent_id"] if isinstance(category["parent_id"], ObjectId) else ObjectId(category["parent_id"])
-                parent = await categories_collection.find_one({"_id": parent_id})
-                if parent:
-                    category_name = f"{parent['name']} › {category['name']}"
-                else:
-                    category_name = category["name"]
-            else:
-                category_name = category["name"]
+        category_name = labels.get(str(rule["category_id"]), "Inconnue")
         
         result.append({
             "id": str(rule["_id"]),
@@ -64,6 +119,7 @@ async def create_rule(
     database = Depends(get_db)
 ):
     """Crée une nouvelle règle"""
+    _validate_pattern(rule.pattern, rule.match_type)
     rules_collection = await database.get_collection("rules")
     categories_collection = await database.get_collection("categories")
     
@@ -92,14 +148,11 @@ async def create_rule(
     }
     
     result = await rules_collection.insert_one(rule_dict)
+    await notify_rules_changed(database, current_user["_id"])
     created_rule = await rules_collection.find_one({"_id": result.inserted_id})
     
     # Obtenir le nom de la catégorie
-    category_name = category["name"]
-    if category.get("parent_id"):
-        parent = await categories_collection.find_one({"_id": ObjectId(category["parent_id"])})
-        if parent:
-            category_name = f"{parent['name']} › {category_name}"
+    category_name = category_label(category)
     
     return {
         "id": str(created_rule["_id"]),
@@ -116,6 +169,78 @@ async def create_rule(
         "updated_at": created_rule["updated_at"]
     }
 
+@router.post("/preview")
+async def preview_rule(
+    rule: RulePreview,
+    current_user: dict = Depends(get_current_user),
+    database = Depends(get_db)
+):
+    """
+    Évalue une règle non enregistrée sur l'historique des transactions
+    
+    La période et le motif (hors regex) sont évalués par MongoDB ; seules les
+    transactions candidates sont lues, réduites à description, date et
+    category_id, puis vérifiées par le moteur de règles. Aucune écriture.
+    
+    Returns:
+        matched: transactions auxquelles la règle s'appliquerait
+        changed: parmi elles, celles dont la catégorie changerait
+        by_category: répartition par catégorie actuelle
+        sample: les PREVIEW_SAMPLE_SIZE premières transactions concernées
+    """
+    _validate_pattern(rule.pattern, rule.match_type)
+    draft = rule.model_dump()
+    if draft.get("category_id") and not ObjectId.is_valid(draft["category_id"]):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identifiant de catégorie invalide")
+    compiled_rule = CompiledRule(draft)
+    target = draft.get("category_id")
+    
+    transactions_collection = await database.get_collection("transactions")
+    categories_collection = await database.get_collection("categories")
+    
+    query = {"user_id": current_user["_id"], **rule_prefilter(draft)}
+    cursor = transactions_collection.find(query, {"description": 1, "date": 1, "category_id": 1})
+    
+    counts = {}
+    sample = []
+    matched = 0
+    changed = 0
+    async for transaction in cursor:
+        if not compiled_rule.matches(
+            (transaction.get("description") or "").upper(),
+            to_date(transaction.get("date"))
+        ):
+            continue
+        category_id = str(transaction["category_id"]) if transaction.get("category_id") else None
+        matched += 1
+        counts[category_id] = counts.get(category_id, 0) + 1
+        if target is None or category_id != target:
+            changed += 1
+        if len(sample) < PREVIEW_SAMPLE_SIZE:
+            sample.append({
+                "id": str(transaction["_id"]),
+                "description": transaction.get("description"),
+                "date": transaction.get("date"),
+                "category_id": category_id
+            })
+    
+    labels = await _category_labels(categories_collection, counts.keys())
+    by_category = [
+        {
+            "category_id": category_id,
+            "category_name": labels.get(category_id, "Catégorie inconnue") if category_id else "Sans catégorie",
+            "count": count
+        }
+        for category_id, count in sorted(counts.items(), key=lambda item: -item[1])
+    ]
+    
+    return {
+        "matched": matched,
+        "changed": changed,
+        "by_category": by_category,
+        "sample": sample
+    }
+
 @router.put("/{rule_id}", response_model=RuleResponse)
 async def update_rule(
     rule_id: str,
@@ -141,6 +266,10 @@ async def update_rule(
     
     # Préparer les données à mettre à jour
     update_data = {k: v for k, v in rule.dict(exclude_unset=True).items()}
+    _validate_pattern(
+        update_data.get("pattern") or existing_rule["pattern"],
+        update_data.get("match_type") or existing_rule["match_type"]
+    )
     
     # Convertir les dates en format ISO string pour MongoDB
     if "start_date" in update_data and update_data["start_date"] is not None:
@@ -163,6 +292,7 @@ async def update_rule(
             {"_id": ObjectId(rule_id)},
             {"$set": update_data}
         )
+        await notify_rules_changed(database, current_user["_id"])
     
     # Récupérer la règle mise à jour
     updated_rule = await rules_collection.find_one({"_id": ObjectId(rule_id)})
@@ -171,11 +301,7 @@ async def update_rule(
     category = await categories_collection.find_one({"_id": ObjectId(updated_rule["category_id"])})
     category_name = "Inconnue"
     if category:
-        category_name = category["name"]
-        if category.get("parent_id"):
-            parent = await categories_collection.find_one({"_id": ObjectId(category["parent_id"])})
-            if parent:
-                category_name = f"{parent['name']} › {category_name}"
+        category_name = category_label(category)
     
     return {
         "id": str(updated_rule["_id"]),
@@ -213,6 +339,8 @@ async def delete_rule(
             detail="Rule not found"
         )
     
+    await record_deletions(database, current_user["_id"], "rules", [rule_id])
+    await notify_rules_changed(database, current_user["_id"])
     return None
 
 @router.post("/apply/{transaction_id}")
@@ -237,63 +365,20 @@ async def apply_rules_to_transaction(
             detail="Transaction not found"
         )
     
-    # Récupérer toutes les règles actives
-    rules = await rules_collection.find({
-        "user_id": current_user["_id"],
-        "is_active": True
-    }).to_list(length=None)
-    
-    # Tester chaque règle
-    description = transaction.get("description", "").upper()
-    transaction_date = transaction.get("date")
-    matched_rule = None
-    
-    for rule in rules:
-        pattern = rule["pattern"].upper()
-        match_type = rule["match_type"]
-        
-        # Vérifier la période d'application
-        if rule.get("start_date"):
-            start_date = datetime.fromisoformat(rule["start_date"]).date() if isinstance(rule["start_date"], str) else rule["start_date"]
-            if transaction_date.date() < start_date:
-                continue
-        
-        if rule.get("end_date"):
-            end_date = datetime.fromisoformat(rule["end_date"]).date() if isinstance(rule["end_date"], str) else rule["end_date"]
-            if transaction_date.date() > end_date:
-                continue
-        
-        # Vérifier les exceptions
-        exceptions = rule.get("exceptions", [])
-        is_exception = False
-        for exception_pattern in exceptions:
-            exception_upper = exception_pattern.upper()
-            if exception_upper in description:
-                is_exception = True
-                break
-        
-        if is_exception:
-            continue
-        
-        matched = False
-        if match_type == "contains":
-            matched = pattern in description
-        elif match_type == "starts_with":
-            matched = description.startswith(pattern)
-        elif match_type == "ends_with":
-            matched = description.endswith(pattern)
-        elif match_type == "exact":
-            matched = description == pattern
-        
-        if matched:
-            matched_rule = rule
-            break
+    # Règles actives compilées (cache par utilisateur)
+    rule_set = await rule_set_cache.get(database, current_user["_id"], current_user.get("rules_version", 0))
+    compiled_rule = rule_set.match(transaction.get("description"), transaction.get("date"))
+    matched_rule = compiled_rule.rule if compiled_rule else None
     
     if matched_rule:
         # Appliquer la catégorie
         await transactions_collection.update_one(
             {"_id": ObjectId(transaction_id)},
-            {"$set": {"category_id": matched_rule["category_id"]}}
+            {"$set": {"category_id": ObjectId(matched_rule["category_id"]), "updated_at": datetime.utcnow()}}
+        )
+        await notify_transactions_changed(
+            database, current_user["_id"], "categorized", 1,
+            changes=[(transaction, {**transaction, "category_id": ObjectId(matched_rule["category_id"])})]
         )
         
         return {
@@ -331,64 +416,26 @@ async def apply_rule_to_all_transactions(
         "user_id": current_user["_id"]
     }).to_list(length=None)
     
-    pattern = rule["pattern"].upper()
-    match_type = rule["match_type"]
+    compiled_rule = CompiledRule(rule)
     matched_count = 0
     
     for transaction in transactions:
-        description = transaction.get("description", "").upper()
-        transaction_date = transaction.get("date")
-        
-        # Vérifier la période d'application
-        if rule.get("start_date"):
-            start_date = datetime.fromisoformat(rule["start_date"]).date() if isinstance(rule["start_date"], str) else rule["start_date"]
-            if isinstance(transaction_date, str):
-                transaction_date = datetime.fromisoformat(transaction_date).date()
-            elif isinstance(transaction_date, datetime):
-                transaction_date = transaction_date.date()
-            if transaction_date < start_date:
-                continue
-        
-        if rule.get("end_date"):
-            end_date = datetime.fromisoformat(rule["end_date"]).date() if isinstance(rule["end_date"], str) else rule["end_date"]
-            if isinstance(transaction_date, str):
-                transaction_date = datetime.fromisoformat(transaction_date).date()
-            elif isinstance(transaction_date, datetime):
-                transaction_date = transaction_date.date()
-            if transaction_date > end_date:
-                continue
-        
-        # Vérifier les exceptions
-        exceptions = rule.get("exceptions", [])
-        is_exception = False
-        for exception_pattern in exceptions:
-            exception_upper = exception_pattern.upper()
-            if exception_upper in description:
-                is_exception = True
-                break
-        
-        if is_exception:
-            continue
-        
-        # Vérifier la correspondance
-        matched = False
-        if match_type == "contains":
-            matched = pattern in description
-        elif match_type == "starts_with":
-            matched = description.startswith(pattern)
-        elif match_type == "ends_with":
-            matched = description.endswith(pattern)
-        elif match_type == "exact":
-            matched = description == pattern
+        matched = compiled_rule.matches(
+            (transaction.get("description") or "").upper(),
+            to_date(transaction.get("date"))
+        )
         
         if matched:
             # Appliquer la catégorie
             await transactions_collection.update_one(
                 {"_id": transaction["_id"]},
-                {"$set": {"category_id": ObjectId(rule["category_id"])}}
+                {"$set": {"category_id": ObjectId(rule["category_id"]), "updated_at": datetime.utcnow()}}
             )
             matched_count += 1
     
+    if matched_count:
+        await notify_transactions_changed(database, current_user["_id"], "categorized", matched_count)
+    
     return {
         "rule_name": rule["name"],
         "matched_count": matched_count,
@@ -404,13 +451,10 @@ async def apply_all_active_rules(
     transactions_collection = await database.get_collection("transactions")
     rules_collection = await database.get_collection("rules")
     
-    # Récupérer toutes les règles actives
-    active_rules = await rules_collection.find({
-        "user_id": current_user["_id"],
-        "is_active": True
-    }).to_list(length=None)
+    # Règles actives compilées (cache par utilisateur)
+    rule_set = await rule_set_cache.get(database, current_user["_id"], current_user.get("rules_version", 0))
     
-    if not active_rules:
+    if not rule_set:
         return {
             "matched_count": 0,
             "message": "Aucune règle active"
@@ -425,58 +469,17 @@ async def apply_all_active_rules(
     matched_count = 0
     
     for transaction in uncategorized_transactions:
-        description = transaction.get("description", "").upper()
-        transaction_date = transaction.get("date")
-        
-        # Chercher la première règle qui matche
-        for rule in active_rules:
-            pattern = rule["pattern"].upper()
-            match_type = rule["match_type"]
-            
-            # Vérifier la période d'application
-            if rule.get("start_date"):
-                start_date = datetime.fromisoformat(rule["start_date"]).date() if isinstance(rule["start_date"], str) else rule["start_date"]
-                trans_date = datetime.fromisoformat(transaction_date).date() if isinstance(transaction_date, str) else transaction_date.date() if isinstance(transaction_date, datetime) else transaction_date
-                if trans_date < start_date:
-                    continue
-            
-            if rule.get("end_date"):
-                end_date = datetime.fromisoformat(rule["end_date"]).date() if isinstance(rule["end_date"], str) else rule["end_date"]
-                trans_date = datetime.fromisoformat(transaction_date).date() if isinstance(transaction_date, str) else transaction_date.date() if isinstance(transaction_date, datetime) else transaction_date
-                if trans_date > end_date:
-                    continue
-            
-            # Vérifier les exceptions
-            exceptions = rule.get("exceptions", [])
-            is_exception = False
-            for exception_pattern in exceptions:
-                exception_upper = exception_pattern.upper()
-                if exception_upper in description:
-                    is_exception = True
-                    break
-            
-            if is_exception:
-                continue
-            
-            # Vérifier la correspondance
-            matched = False
-            if match_type == "contains":
-                matched = pattern in description
-            elif match_type == "starts_with":
-                matched = description.startswith(pattern)
-            elif match_type == "ends_with":
-                matched = description.endswith(pattern)
-            elif match_type == "exact":
-                matched = description == pattern
-            
-            if matched:
-                # Appliquer la catégorie (première règle qui matche)
-                await transactions_collection.update_one(
-                    {"_id": transaction["_id"]},
-                    {"$set": {"category_id": ObjectId(rule["category_id"])}}
-                )
-                matched_count += 1
-                break  # Première règle qui matche
+        # Première règle qui matche
+        compiled_rule = rule_set.match(transaction.get("description"), transaction.get("date"))
+        if compiled_rule:
+            await transactions_collection.update_one(
+                {"_id": transaction["_id"]},
+                {"$set": {"category_id": ObjectId(compiled_rule.category_id), "updated_at": datetime.utcnow()}}
+            )
+            matched_count += 1
+    
+    if matched_count:
+        await notify_transactions_changed(database, current_user["_id"], "categorized", matched_count)
     
     return {
         "matched_count": matched_count,
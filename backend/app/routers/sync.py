@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Dict, Optional
+
+from app.core.database import get_db
+from app.services.auth import get_current_user
+from app.services.sync_changes import InvalidSyncToken, get_changes
+from app.utils.fast_json import FastJSONResponse
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+
+@router.get("/changes")
+async def get_sync_changes(
+    since: Optional[str] = Query(None, description="Jeton next_token de la réponse précédente (absent : synchronisation complète)"),
+    limit: int = Query(500, ge=1, le=5000, description="Nombre maximal d'éléments par page"),
+    current_user: Dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Changements (créations, modifications, suppressions) des transactions,
+    catégories, règles et budgets depuis un point de synchronisation.
+    
+    Le client applique dans l'ordre : purges (vider la collection), suppressions
+    puis documents modifiés. Si reset vaut true, il remplace d'abord tout son
+    cache local. Tant que has_more vaut true, il rappelle l'endpoint avec
+    next_token ; le dernier next_token est le point de départ de la prochaine
+    synchronisation.
+    """
+    try:
+        changes = await get_changes(db, current_user["_id"], since, limit)
+    except InvalidSyncToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return FastJSONResponse(content=changes)
@@ -1,25 +1,66 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, UTC, timezone
 from bson import ObjectId
+import json
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
 
+from app.core.config import settings
 from app.core.database import get_db
 
 logger = logging.getLogger("budget-api")
 from app.models.user import User
 from app.models.transaction import Transaction, Category, Tag
 from app.schemas import (
+    Category as CategorySchema,
+    Tag as TagSchema,
     Transaction as TransactionSchema,
     TransactionCreate,
     TransactionUpdate,
+    TransactionBatchResult,
+    TransactionBatchUpdate,
+    TransactionSuggestion,
     TransactionWithCategory
 )
 from app.services.auth import get_current_user
+from app.services.bulk_import import BulkImporter
+from app.services.category_paths import subtree_category_ids
+from app.services.change_tracking import notify_transactions_changed
+from app.services.rule_engine import rule_set_cache
+from app.services.suggestions import SUGGESTION_FIELDS, suggestion_cache
+from app.services.sync_changes import record_deletions, record_purge
+from app.services.transaction_search import (
+    SEARCH_MODES,
+    build_search_filter,
+    ranked_search_pipeline,
+    search_tokens,
+    with_search_tokens
+)
+from app.utils.fast_json import FastJSONResponse, projection_for, shape_document
+from app.utils.field_selection import parse_fields, projection_for_fields, select_fields
+from app.utils.json_stream import JSONStreamError, iter_json_array, iter_ndjson, peek_first_character
 # from app.services.boursorama import BoursoramaService  # Ancien service, remplacé par bank_connections
 
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
+
+# Champs lus pour le chemin rapide (category, bank et account sont joints)
+TRANSACTION_RESPONSE_PROJECTION = projection_for(TransactionWithCategory, exclude=("category", "bank", "account"))
+# Champs stockés nécessaires aux champs joints ou calculés de la réponse (fields=)
+TRANSACTION_FIELD_DEPENDENCIES = {
+    "category": ("category_id",),
+    "bank": ("bank_connection_id",),
+    "account": ("bank_account_id",),
+    "is_expense": ("is_expense", "type")
+}
+# Types de contenu du format NDJSON accepté par POST /bulk
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+# Nombre maximal de transactions modifiées par identifiant dans un PATCH /batch
+BATCH_MAX_ITEMS = 1000
+# Champs de recherche : modifiables uniquement par identifiant (search_tokens par transaction)
+BATCH_SEARCH_FIELDS = {"description", "merchant"}
 # boursorama_service = BoursoramaService()  # Ancien service, remplacé par bank_connections
 
 
@@ -38,6 +79,9 @@ def prepare_mongodb_document_for_response(document: Dict[str, Any]) -> Dict[str,
         elif isinstance(value, ObjectId):
             # Convertir les ObjectId en chaînes de caractères
             result[key] = str(value)
+        elif isinstance(value, list) and any(isinstance(item, ObjectId) for item in value):
+            # Listes d'ObjectId (ancestors des catégories)
+            result[key] = [str(item) if isinstance(item, ObjectId) else item for item in value]
         elif isinstance(value, str) and key in ["date", "created_at", "updated_at"]:
             # Convertir les dates en string ISO en objets datetime
             try:
@@ -63,15 +107,43 @@ async def get_transactions(
     year: Optional[int] = None,
     month: Optional[int] = None,
     category_id: Optional[str] = None,
+    include_subcategories: bool = Query(False, description="Inclure les sous-catégories de category_id"),
     is_expense: Optional[bool] = None,
     tag_id: Optional[str] = None,
     search: Optional[str] = None,
+    search_mode: str = Query("regex", description="Mode de recherche : regex (sous-chaîne, par défaut), text, prefix ou fuzzy"),
+    fast: bool = Query(False, description="Réponse sérialisée par orjson, sans validation du schéma"),
+    fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules (ex. date,amount,description,category_id)"),
     current_user: Dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
     """
     Récupérer toutes les transactions de l'utilisateur avec filtres optionnels.
+    
+    Avec fast=true, la même réponse JSON est produite par un chemin rapide
+    (projection MongoDB, mise en forme directe et encodage orjson).
+    
+    Avec include_subcategories=true, le filtre category_id couvre aussi
+    toutes les sous-catégories de la catégorie.
+    
+    Avec fields=, seuls les champs demandés sont lus et renvoyés (chemin
+    rapide) ; category, bank et account ne sont joints que s'ils sont demandés.
+    Sans « id », une sélection parmi date, amount, category_id, is_expense et
+    type est servie directement par l'index de liste.
+    
+    search_mode choisit la recherche (voir app/services/transaction_search.py) :
+    regex (sous-chaîne insensible à la casse, sans index : comportement
+    historique, par défaut), text (mots, index texte), prefix (début des mots)
+    ou fuzzy (une faute de frappe tolérée). Les modes indexés sont à demander
+    explicitement ; leurs résultats sont triés par pertinence puis par date.
     """
+    if search_mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Mode de recherche invalide. Modes disponibles: {', '.join(SEARCH_MODES)}"
+        )
+    selected_fields = parse_fields(fields, TransactionWithCategory)
+    
     # Construire le filtre MongoDB
     filter_query = {"user_id": current_user["_id"]}
     
@@ -94,91 +166,153 @@ async def get_transactions(
         
         filter_query["date"] = {"$gte": start_of_month, "$lt": end_of_month}
     
-    if category_id:
+    if category_id and include_subcategories:
+        # Sous-arbre lu par l'index ancestors des catégories : un seul $in
+        filter_query["category_id"] = {"$in": await subtree_category_ids(db, current_user["_id"], category_id)}
+    elif category_id:
         filter_query["category_id"] = ObjectId(category_id)
     
     if is_expense is not None:
         filter_query["is_expense"] = is_expense
     
     if search:
-        filter_query["$or"] = [
-            {"description": {"$regex": search, "$options": "i"}},
-            {"merchant": {"$regex": search, "$options": "i"}}
-        ]
+        filter_query.update(build_search_filter(search, search_mode))
     
-    # Exécuter la requête MongoDB
+    # Exécuter la requête MongoDB (projection sur les champs du schéma en mode rapide)
     collection = await db.get_collection("transactions")
-    cursor = collection.find(filter_query).sort("date", -1).skip(skip).limit(limit)
-    transactions = await cursor.to_list(length=limit)
-    
-    # Préparer les transactions pour la réponse
-    result = []
-    bank_connections_collection = await db.get_collection("bank_connections")
-    
-    for transaction in transactions:
-        # Récupérer la catégorie si elle existe
-        category = None
-        if transaction.get("category_id"):
-            category = await db.find_one("categories", {"_id": transaction["category_id"]})
-        
-        # Récupérer la connexion bancaire si elle existe
-        bank_connection = None
-        bank_account = None
-        if transaction.get("bank_connection_id"):
-            # bank_connection_id est déjà un ObjectId dans la base
-            bank_conn_id = transaction["bank_connection_id"]
-            if isinstance(bank_conn_id, str):
-                bank_conn_id = ObjectId(bank_conn_id)
-            bank_connection = await bank_connections_collection.find_one({
-                "_id": bank_conn_id
-            })
-        
-        # Récupérer le compte bancaire si il existe
-        if transaction.get("bank_account_id"):
-            bank_accounts_collection = await db.get_collection("bank_accounts")
-            bank_acc_id = transaction["bank_account_id"]
-            if isinstance(bank_acc_id, str):
-                bank_acc_id = ObjectId(bank_acc_id)
-            bank_account = await bank_accounts_collection.find_one({
-                "_id": bank_acc_id
-            })
-        
-        # Préparer la transaction
-        transaction_data = prepare_mongodb_document_for_response(transaction)
-        
-        # Calculer is_expense si absent (pour les transactions bancaires avec type)
-        if transaction_data.get("is_expense") is None and transaction_data.get("type"):
-            transaction_data["is_expense"] = transaction_data["type"] == "expense"
-        elif transaction_data.get("is_expense") is None:
-            # Par défaut, considérer comme une dépense si aucune info
-            transaction_data["is_expense"] = True
-        
-        if category:
-            transaction_data["category"] = prepare_mongodb_document_for_response(category)
-        
-        # Ajouter les infos de la banque
-        if bank_connection:
-            transaction_data["bank"] = {
-                "id": str(bank_connection["_id"]),
-                "name": bank_connection.get("bank"),
-                "nickname": bank_connection.get("nickname"),
-                "connection_type": bank_connection.get("connection_type")
-            }
-        
-        # Ajouter les infos du compte bancaire
-        if bank_account:
-            transaction_data["account"] = {
-                "id": str(bank_account["_id"]),
-                "name": bank_account.get("name"),
-                "type": bank_account.get("account_type"),
-                "external_id": bank_account.get("external_id"),
-                "balance": bank_account.get("balance"),
-                "currency": bank_account.get("currency", "EUR")
-            }
-        
-        result.append(transaction_data)
+    if selected_fields:
+        projection = projection_for_fields(selected_fields, TRANSACTION_FIELD_DEPENDENCIES)
+    elif fast:
+        projection = TRANSACTION_RESPONSE_PROJECTION
+    else:
+        projection = None
+    if search and search_mode in ("prefix", "fuzzy"):
+        pipeline = ranked_search_pipeline(filter_query, search, skip, limit, projection)
+        transactions = await collection.aggregate(pipeline).to_list(length=limit)
+    else:
+        if search and search_mode == "text":
+            sort = [("score", {"$meta": "textScore"}), ("date", -1)]
+        else:
+            sort = [("date", -1)]
+        cursor = collection.find(filter_query, projection).sort(sort).skip(skip).limit(limit)
+        transactions = await cursor.to_list(length=limit)
+    
+    # Résoudre catégories, connexions et comptes bancaires en une requête $in chacun
+    categories, bank_connections, bank_accounts = await _resolve_related(db, transactions)
+    
+    if fast or selected_fields:
+        # Chemin rapide : documents mis à la forme du schéma puis encodés par orjson,
+        # sans validation (données de confiance issues de la base)
+        shaped_categories = {
+            category_id: shape_document(CategorySchema, prepare_mongodb_document_for_response(category))
+            for category_id, category in categories.items()
+        }
+        result = []
+        for transaction in transactions:
+            transaction_data = _build_transaction_response(
+                transaction,
+                None,
+                bank_connections.get(_as_object_id(transaction.get("bank_connection_id"))),
+                bank_accounts.get(_as_object_id(transaction.get("bank_account_id")))
+            )
+            transaction_data["category"] = shaped_categories.get(transaction.get("category_id"))
+            if transaction_data.get("tags"):
+                transaction_data["tags"] = [
+                    shape_document(TagSchema, tag) if isinstance(tag, dict) else tag
+                    for tag in transaction_data["tags"]
+                ]
+            if selected_fields:
+                result.append(select_fields(TransactionWithCategory, transaction_data, selected_fields))
+            else:
+                result.append(shape_document(TransactionWithCategory, transaction_data))
+        return FastJSONResponse(content=result)
+    
+    return [
+        _build_transaction_response(
+            transaction,
+            categories.get(transaction.get("category_id")),
+            bank_connections.get(_as_object_id(transaction.get("bank_connection_id"))),
+            bank_accounts.get(_as_object_id(transaction.get("bank_account_id")))
+        )
+        for transaction in transactions
+    ]
+
+
+def _as_object_id(value):
+    """Les identifiants de connexion/compte peuvent être stockés en string"""
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+async def _resolve_related(db, transactions: List[Dict[str, Any]]):
+    """
+    Charge les catégories, connexions et comptes bancaires référencés par une
+    liste de transactions, avec une requête $in par collection.
     
-    return result
+    Returns:
+        (categories, bank_connections, bank_accounts) indexés par _id
+    """
+    related = {}
+    lookups = {
+        "categories": {t["category_id"] for t in transactions if t.get("category_id")},
+        "bank_connections": {
+            _as_object_id(t["bank_connection_id"]) for t in transactions if t.get("bank_connection_id")
+        },
+        "bank_accounts": {
+            _as_object_id(t["bank_account_id"]) for t in transactions if t.get("bank_account_id")
+        }
+    }
+    for collection_name, ids in lookups.items():
+        related[collection_name] = {}
+        if ids:
+            collection = await db.get_collection(collection_name)
+            documents = await collection.find({"_id": {"$in": list(ids)}}).to_list(length=None)
+            related[collection_name] = {document["_id"]: document for document in documents}
+    
+    return related["categories"], related["bank_connections"], related["bank_accounts"]
+
+
+def _build_transaction_response(
+    transaction: Dict[str, Any],
+    category: Optional[Dict[str, Any]],
+    bank_connection: Optional[Dict[str, Any]],
+    bank_account: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Construit l'élément de réponse d'une transaction avec ses informations jointes"""
+    transaction_data = prepare_mongodb_document_for_response(transaction)
+    
+    # Calculer is_expense si absent (pour les transactions bancaires avec type)
+    if transaction_data.get("is_expense") is None and transaction_data.get("type"):
+        transaction_data["is_expense"] = transaction_data["type"] == "expense"
+    elif transaction_data.get("is_expense") is None:
+        # Par défaut, considérer comme une dépense si aucune info
+        transaction_data["is_expense"] = True
+    
+    if category:
+        transaction_data["category"] = prepare_mongodb_document_for_response(category)
+    
+    # Ajouter les infos de la banque
+    if bank_connection:
+        transaction_data["bank"] = {
+            "id": str(bank_connection["_id"]),
+            "name": bank_connection.get("bank"),
+            "nickname": bank_connection.get("nickname"),
+            "connection_type": bank_connection.get("connection_type")
+        }
+    
+    # Ajouter les infos du compte bancaire
+    if bank_account:
+        transaction_data["account"] = {
+            "id": str(bank_account["_id"]),
+            "name": bank_account.get("name"),
+            "type": bank_account.get("account_type"),
+            "external_id": bank_account.get("external_id"),
+            "balance": bank_account.get("balance"),
+            "currency": bank_account.get("currency", "EUR")
+        }
+    
+    return transaction_data
 
 
 @router.post("/", response_model=TransactionSchema)
@@ -199,14 +333,234 @@ async def create_transaction(
     # Convertir les ObjectId si nécessaire
     if transaction_data.get("category_id"):
         transaction_data["category_id"] = ObjectId(transaction_data["category_id"])
+    else:
+        # Catégorisation automatique par les règles actives
+        rule_set = await rule_set_cache.get(db, current_user["_id"], current_user.get("rules_version", 0))
+        rule_set.categorize(transaction_data)
+    with_search_tokens(transaction_data)
     
     # Insérer la transaction
     result = await db.insert_one("transactions", transaction_data)
     transaction_data["_id"] = result
+    data_version = await notify_transactions_changed(db, current_user["_id"], "created", 1, changes=[(None, transaction_data)])
+    suggestion_cache.record_write(current_user["_id"], data_version, added=[transaction_data])
     
     return prepare_mongodb_document_for_response(transaction_data)
 
 
+@router.get("/suggest", response_model=List[TransactionSuggestion])
+async def suggest_transactions(
+    prefix: str = Query(..., min_length=1, description="Début du marchand ou de la description"),
+    field: Optional[str] = Query(None, description="merchant ou description (les deux par défaut)"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Suggestions de marchands et de descriptions connus commençant par prefix
+    (sans accents ni casse), classées par fréquence.
+    
+    Servies depuis un index en mémoire par utilisateur (voir
+    app/services/suggestions.py), chargé à la première demande.
+    """
+    if field is not None and field not in SUGGESTION_FIELDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Champ invalide. Champs disponibles: {', '.join(SUGGESTION_FIELDS)}"
+        )
+    
+    index = await suggestion_cache.get_index(db, current_user)
+    fields = (field,) if field else SUGGESTION_FIELDS
+    return FastJSONResponse(content=index.suggest(prefix, fields, limit))
+
+
+@router.patch("/batch", response_model=TransactionBatchResult)
+async def batch_update_transactions(
+    batch: TransactionBatchUpdate,
+    current_user: Dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Modifier plusieurs transactions en une requête.
+    
+    Deux formes :
+    - items : liste de {id, update} ; l'appartenance des transactions est
+      vérifiée par une seule requête $in et chaque élément reçoit un statut
+      (updated, not_found ou error) ;
+    - filter + update : la même modification appliquée à toutes les
+      transactions correspondant au filtre (la description et le marchand ne
+      sont modifiables que par identifiant).
+    
+    Les modifications sont appliquées par un seul bulk_write.
+    """
+    user_id = current_user["_id"]
+    if (batch.items is None) == (batch.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Fournir soit items, soit filter et update"
+        )
+    
+    transactions_collection = await db.get_collection("transactions")
+    now = datetime.now(UTC)
+    
+    if batch.filter is not None:
+        if batch.update is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="update est requis avec filter")
+        update_data = batch.update.model_dump(exclude_unset=True)
+        if not update_data:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucune modification fournie")
+        if BATCH_SEARCH_FIELDS & set(update_data):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La description et le marchand ne peuvent être modifiés que par identifiant (items)"
+            )
+        await _validate_batch_categories(db, user_id, [update_data])
+        if update_data.get("category_id"):
+            update_data["category_id"] = ObjectId(update_data["category_id"])
+        
+        update_data["updated_at"] = now
+        result = await transactions_collection.bulk_write(
+            [UpdateMany(_batch_filter_query(user_id, batch.filter), {"$set": update_data})]
+        )
+        if result.modified_count:
+            data_version = await notify_transactions_changed(db, user_id, "updated", result.modified_count)
+            suggestion_cache.record_write(user_id, data_version)
+        return {"matched": result.matched_count, "modified": result.modified_count, "results": []}
+    
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Au plus {BATCH_MAX_ITEMS} transactions par requête"
+        )
+    
+    results: Dict[str, Dict[str, Any]] = {}
+    updates: Dict[ObjectId, Dict[str, Any]] = {}
+    for item in batch.items:
+        if not ObjectId.is_valid(item.id):
+            results[item.id] = {"id": item.id, "status": "error", "error": "Identifiant invalide"}
+            continue
+        update_data = item.update.model_dump(exclude_unset=True)
+        if not update_data:
+            results[item.id] = {"id": item.id, "status": "error", "error": "Aucune modification fournie"}
+            continue
+        # Un même identifiant répété : les modifications sont fusionnées dans l'ordre
+        updates.setdefault(ObjectId(item.id), {}).update(update_data)
+        results[item.id] = {"id": item.id, "status": "updated"}
+    
+    invalid_categories = await _validate_batch_categories(db, user_id, updates.values(), raise_error=False)
+    
+    # Vérification de l'appartenance en une requête
+    existing = {
+        document["_id"]: document
+        async for document in transactions_collection.find(
+            {"_id": {"$in": list(updates)}, "user_id": user_id},
+            {"description": 1, "merchant": 1}
+        )
+    }
+    
+    operations = []
+    operation_ids = []
+    for transaction_id, update_data in updates.items():
+        key = str(transaction_id)
+        if transaction_id not in existing:
+            results[key] = {"id": key, "status": "not_found", "error": "Transaction non trouvée"}
+            continue
+        if update_data.get("category_id") in invalid_categories:
+            results[key] = {"id": key, "status": "error", "error": "Catégorie non trouvée"}
+            continue
+        
+        update_data = dict(update_data, updated_at=now)
+        if update_data.get("category_id"):
+            update_data["category_id"] = ObjectId(update_data["category_id"])
+        if BATCH_SEARCH_FIELDS & set(update_data):
+            update_data["search_tokens"] = search_tokens({**existing[transaction_id], **update_data})
+        operations.append(UpdateOne({"_id": transaction_id, "user_id": user_id}, {"$set": update_data}))
+        operation_ids.append(transaction_id)
+    
+    matched = modified = 0
+    written = []
+    if operations:
+        try:
+            result = await transactions_collection.bulk_write(operations, ordered=False)
+            matched, modified = result.matched_count, result.modified_count
+            written = operation_ids
+        except BulkWriteError as e:
+            details = e.details
+            matched, modified = details.get("nMatched", 0), details.get("nModified", 0)
+            failed = set()
+            for error in details.get("writeErrors", []):
+                transaction_id = operation_ids[error["index"]]
+                failed.add(transaction_id)
+                results[str(transaction_id)] = {"id": str(transaction_id), "status": "error", "error": error.get("errmsg")}
+            written = [transaction_id for transaction_id in operation_ids if transaction_id not in failed]
+    
+    if modified:
+        data_version = await notify_transactions_changed(db, user_id, "updated", modified)
+        suggestion_cache.record_write(
+            user_id,
+            data_version,
+            added=[{**existing[transaction_id], **updates[transaction_id]} for transaction_id in written],
+            removed=[existing[transaction_id] for transaction_id in written]
+        )
+    
+    return {"matched": matched, "modified": modified, "results": list(results.values())}
+
+
+async def _validate_batch_categories(db, user_id, updates, raise_error: bool = True) -> set:
+    """
+    Vérifie en une requête que les catégories ciblées existent pour l'utilisateur
+    
+    Returns:
+        Identifiants (chaînes) des catégories introuvables
+    """
+    category_ids = {update["category_id"] for update in updates if update.get("category_id")}
+    if not category_ids:
+        return set()
+    invalid = {category_id for category_id in category_ids if not ObjectId.is_valid(category_id)}
+    categories_collection = await db.get_collection("categories")
+    found = {
+        str(category["_id"])
+        async for category in categories_collection.find(
+            {
+                "_id": {"$in": [ObjectId(category_id) for category_id in category_ids - invalid]},
+                "user_id": {"$in": [user_id, None]}
+            },
+            {"_id": 1}
+        )
+    }
+    invalid |= category_ids - found
+    if invalid and raise_error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Catégorie non trouvée")
+    return invalid
+
+
+def _batch_filter_query(user_id, batch_filter) -> Dict[str, Any]:
+    """Filtre MongoDB d'une modification groupée par filtre"""
+    filter_query: Dict[str, Any] = {"user_id": user_id}
+    if batch_filter.start_date or batch_filter.end_date:
+        filter_query["date"] = {}
+        if batch_filter.start_date:
+            filter_query["date"]["$gte"] = batch_filter.start_date
+        if batch_filter.end_date:
+            filter_query["date"]["$lte"] = batch_filter.end_date
+    if batch_filter.category_id == "none":
+        filter_query["category_id"] = None
+    elif batch_filter.category_id:
+        if not ObjectId.is_valid(batch_filter.category_id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Identifiant de catégorie invalide")
+        filter_query["category_id"] = ObjectId(batch_filter.category_id)
+    if batch_filter.is_expense is not None:
+        filter_query["is_expense"] = batch_filter.is_expense
+    if batch_filter.search:
+        if batch_filter.search_mode not in SEARCH_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Mode de recherche invalide. Modes disponibles: {', '.join(SEARCH_MODES)}"
+            )
+        filter_query.update(build_search_filter(batch_filter.search, batch_filter.search_mode))
+    return filter_query
+
+
 @router.get("/{transaction_id}", response_model=TransactionWithCategory)
 async def get_transaction(
     transaction_id: str,
@@ -271,12 +625,26 @@ async def update_transaction(
     if update_data.get("category_id"):
         update_data["category_id"] = ObjectId(update_data["category_id"])
     
+    # Mots de recherche recalculés si la description ou le marchand changent
+    if "description" in update_data or "merchant" in update_data:
+        update_data["search_tokens"] = search_tokens({**existing_transaction, **update_data})
+    
     # Mettre à jour la transaction
     await db.update_one(
         "transactions",
         {"_id": ObjectId(transaction_id)},
         update_data
     )
+    data_version = await notify_transactions_changed(
+        db, current_user["_id"], "updated", 1,
+        changes=[(existing_transaction, {**existing_transaction, **update_data})]
+    )
+    suggestion_cache.record_write(
+        current_user["_id"],
+        data_version,
+        added=[{**existing_transaction, **update_data}],
+        removed=[existing_transaction]
+    )
     
     # Récupérer la transaction mise à jour
     updated_transaction = await db.find_one("transactions", {"_id": ObjectId(transaction_id)})
@@ -286,76 +654,96 @@ async def update_transaction(
 
 @router.post("/bulk")
 async def bulk_import_transactions(
-    data: Dict[str, Any],
+    request: Request,
+    bank_connection_id: Optional[str] = Query(None),
+    bank_account_id: Optional[str] = Query(None),
+    category_id: Optional[str] = Query(None),
     current_user: Dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
     """
     Import en masse de transactions depuis le frontend.
-    Détecte les doublons via external_id.
+    
+    Le corps peut être :
+    - un objet {"transactions": [...], "bank_connection_id", "bank_account_id", "category_id"} ;
+    - un tableau JSON de transactions, lu en flux ;
+    - un flux NDJSON (Content-Type: application/x-ndjson), une transaction par ligne.
+    Pour les deux derniers, la connexion, le compte et la catégorie sont
+    passés en paramètres de requête.
+    
+    Les transactions sont traitées par lots (voir app/services/bulk_import.py) :
+    doublons détectés via external_id en une requête par lot, règles de
+    catégorisation appliquées aux transactions sans catégorie et insertion
+    par insert_many. Le rapport détaille les doublons et les erreurs par ligne.
     """
     user_id = current_user["_id"]
-    transactions = data.get("transactions", [])
-    bank_connection_id = data.get("bank_connection_id")
-    bank_account_id = data.get("bank_account_id")
-    category_id = data.get("category_id")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
     
-    if not transactions:
-        raise HTTPException(status_code=400, detail="Aucune transaction à importer")
+    options = {
+        "bank_connection_id": bank_connection_id,
+        "bank_account_id": bank_account_id,
+        "category_id": category_id
+    }
+    if content_type in NDJSON_CONTENT_TYPES:
+        rows = iter_ndjson(request.stream())
+    else:
+        first, chunks = await peek_first_character(request.stream())
+        if first == "{":
+            # Format historique : objet enveloppe lu en entier
+            try:
+                data = json.loads(b"".join([chunk async for chunk in chunks]))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Corps JSON invalide")
+            options.update({key: data.get(key) for key in options if data.get(key)})
+            rows = _iter_list(data.get("transactions") or [])
+        else:
+            rows = iter_json_array(chunks)
+    
+    defaults = {}
+    for key, value in options.items():
+        if value and not ObjectId.is_valid(value):
+            raise HTTPException(status_code=400, detail=f"Identifiant invalide: {key}")
+        defaults[key] = ObjectId(value) if value else None
     
     transactions_collection = await db.get_collection("transactions")
+    importer = BulkImporter(
+        transactions_collection,
+        user_id,
+        (await rule_set_cache.get(db, user_id, current_user.get("rules_version", 0))).rules,
+        defaults,
+        settings.BULK_IMPORT_BATCH_SIZE
+    )
     
-    imported = 0
-    skipped = 0
-    errors = []
+    stream_error = None
+    try:
+        async for row in rows:
+            await importer.add(row)
+    except JSONStreamError as e:
+        stream_error = e
+    else:
+        await importer.flush()
+    
+    logger.info(
+        f"Import bulk - User: {user_id}, Lignes: {importer.rows}, Importées: {importer.imported}, "
+        f"Ignorées: {importer.skipped}, Erreurs: {importer.failed}"
+    )
+    if importer.imported:
+        await notify_transactions_changed(db, user_id, "imported", importer.imported)
     
-    for trans in transactions:
-        try:
-            # Vérifier les doublons par external_id
-            external_id = trans.get("external_id")
-            if external_id:
-                existing = await transactions_collection.find_one({
-                    "user_id": user_id,
-                    "external_id": external_id
-                })
-                if existing:
-                    skipped += 1
-                    continue
-            
-            # Préparer la transaction
-            transaction_data = {
-                "user_id": user_id,
-                "date": trans.get("date"),
-                "description": trans.get("description", ""),
-                "amount": float(trans.get("amount", 0)),
-                "type": trans.get("type", "expense"),
-                "is_expense": trans.get("type") == "expense",
-                "category_id": ObjectId(category_id) if category_id else None,
-                "bank_connection_id": ObjectId(bank_connection_id) if bank_connection_id else None,
-                "bank_account_id": ObjectId(bank_account_id) if bank_account_id else None,
-                "external_id": external_id,
-                "tags": trans.get("tags", []),
-                "notes": trans.get("notes", ""),
-                "created_at": datetime.now(timezone.utc),
-                "updated_at": datetime.now(timezone.utc)
-            }
-            
-            await transactions_collection.insert_one(transaction_data)
-            imported += 1
-            
-        except Exception as e:
-            errors.append(f"Erreur sur transaction {trans.get('description', 'inconnue')}: {str(e)}")
-            logger.error(f"Erreur import transaction: {str(e)}")
-    
-    logger.info(f"Import bulk - User: {user_id}, Importées: {imported}, Ignorées: {skipped}")
+    if stream_error is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{stream_error} ({importer.imported} transaction(s) importée(s) avant l'erreur)"
+        )
+    if importer.rows == 0:
+        raise HTTPException(status_code=400, detail="Aucune transaction à importer")
     
-    return {
-        "success": True,
-        "imported": imported,
-        "skipped": skipped,
-        "errors": errors,
-        "message": f"{imported} transaction(s) importée(s), {skipped} doublon(s) ignoré(s)"
-    }
+    return importer.report()
+
+
+async def _iter_list(items: List[Any]):
+    for item in items:
+        yield item
 
 
 @router.delete("/purge")
@@ -377,6 +765,8 @@ async def purge_all_transactions(
     
     # Supprime toutes les transactions de l'utilisateur
     result = await transactions_collection.delete_many({"user_id": user_id})
+    await record_purge(db, user_id, ["transactions"])
+    await notify_transactions_changed(db, user_id, "purged", result.deleted_count)
     
     logger.info(f"Purge des transactions - Utilisateur: {user_id}, Supprimées: {result.deleted_count}")
     
@@ -410,6 +800,9 @@ async def delete_transaction(
     
     # Supprimer la transaction
     await db.delete_one("transactions", {"_id": ObjectId(transaction_id)})
+    await record_deletions(db, current_user["_id"], "transactions", [transaction_id])
+    data_version = await notify_transactions_changed(db, current_user["_id"], "deleted", 1, changes=[(existing_transaction, None)])
+    suggestion_cache.record_write(current_user["_id"], data_version, removed=[existing_transaction])
     
     return {"message": "Transaction supprimée avec succès"}
 
@@ -9,6 +9,10 @@ from app.core.database import get_db
 from app.models.user import User
 from app.schemas import User as UserSchema, UserUpdate, ChangePasswordRequest
 from app.services.auth import get_user, get_user_by_email, update_user, delete_user, get_current_user, verify_password, get_password_hash
+from app.services.category_paths import rebuild_user_paths
+from app.services.change_tracking import notify_rules_changed, notify_transactions_changed
+from app.services.sync_changes import SYNC_COLLECTIONS, record_purge
+from app.services.transaction_search import with_search_tokens
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -166,6 +170,8 @@ async def export_user_data(
                     continue  # On ne garde pas l'user_id
                 elif key == "_id":
                     cleaned["id"] = str(value)
+                elif key in ("ancestors", "path_label") and doc_type == "category":
+                    continue  # Chemins recalculés à l'import
                 elif key == "parent_id" and doc_type == "category" and value:
                     # Pour les catégories, ajouter parent_name au lieu de parent_id
                     parent_cat = categories_by_id.get(str(value))
@@ -481,8 +487,9 @@ async def import_user_data(
                 if key == "id":
                     old_id = value
                     prepared["_id"] = ObjectId()  # Nouveau ObjectId
-                elif key == "parent_name":
-                    # Ignorer parent_name, il sera géré manuellement dans l'import des catégories
+                elif key in ("parent_name", "ancestors", "path_label"):
+                    # Ignorer parent_name (géré manuellement dans l'import des catégories)
+                    # et les chemins matérialisés, recalculés après l'import
                     continue
                 elif key.endswith("_id") and key != "user_id":
                     # Gérer les références à d'autres IDs
@@ -498,6 +505,8 @@ async def import_user_data(
                         prepared[key] = value
                 else:
                     prepared[key] = value
+            # Date d'écriture dans cette base (synchronisation différentielle des clients)
+            prepared["updated_at"] = datetime.now(timezone.utc)
             return prepared, old_id
         
         # Importer les banques
@@ -630,6 +639,10 @@ async def import_user_data(
                             category_id_map[old_id] = str(existing["_id"])
                         categories_skipped += 1
         
+        # Chemins matérialisés (ancestors, path_label) des catégories importées
+        if categories_imported:
+            await rebuild_user_paths(db, user_id)
+        
         # Importer les transactions
         transactions = data.get("transactions", [])
         transactions_imported = 0
@@ -670,11 +683,14 @@ async def import_user_data(
                     })
                 
                 if not existing:
-                    await transactions_collection.insert_one(prepared)
+                    await transactions_collection.insert_one(with_search_tokens(prepared))
                     transactions_imported += 1
                 else:
                     transactions_skipped += 1
         
+        if transactions_imported:
+            await notify_transactions_changed(db, user_id, "imported", transactions_imported)
+        
         # Importer les règles
         rules = data.get("rules", [])
         rules_imported = 0
@@ -701,6 +717,9 @@ async def import_user_data(
                 else:
                     rules_skipped += 1
         
+        if rules_imported:
+            await notify_rules_changed(db, user_id)
+        
         # Importer les budgets
         budgets = data.get("budgets", [])
         budgets_imported = 0
@@ -771,6 +790,8 @@ async def purge_user_data(
             "transactions", 
             "rules",
             "budgets",
+            "budget_periods",
+            "budget_alerts",
             "accounts",
             "banks",
             "bank_connections"
@@ -785,6 +806,10 @@ async def purge_user_data(
             deleted_counts[collection_name] = result.deleted_count
             total_deleted += result.deleted_count
         
+        await record_purge(db, user_id, SYNC_COLLECTIONS)
+        await notify_transactions_changed(db, user_id, "purged")
+        await notify_rules_changed(db, user_id)
+        
         return {
             "message": "Données purgées avec succès",
             "total_deleted": total_deleted,
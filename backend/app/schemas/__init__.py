@@ -1,6 +1,7 @@
 from app.schemas.user import User, UserCreate, UserUpdate, UserInDB, Token, TokenData, BoursoramaCredentials, LoginRequest, ChangePasswordRequest
 from app.schemas.transaction import (
-    Transaction, TransactionCreate, TransactionUpdate, TransactionWithCategory,
+    Transaction, TransactionCreate, TransactionUpdate, TransactionWithCategory, TransactionSuggestion,
+    TransactionBatchUpdate, TransactionBatchResult,
     Category, CategoryCreate, CategoryUpdate,
     Tag, TagCreate, TagUpdate,
     MonthlyReport, PeriodReport
@@ -89,3 +89,25 @@ class SyncResult(BaseModel):
         json_encoders = {
             datetime: lambda v: v.isoformat() if v else None,
         }
+
+
+class ConnectionSyncResult(SyncResult):
+    """Résultat de synchronisation d'une connexion dans une synchronisation groupée"""
+    connection_id: str
+    bank: Optional[str] = None
+    nickname: Optional[str] = None
+
+class SyncAllResult(BaseModel):
+    """Schéma de résultat de synchronisation de toutes les connexions"""
+    success: bool
+    connections: List[ConnectionSyncResult] = []
+    succeeded: int = 0
+    failed: int = 0
+    new_transactions: int = 0
+    updated_accounts: int = 0
+    synced_at: datetime = Field(default_factory=datetime.now)
+    
+    class Config:
+        json_encoders = {
+            datetime: lambda v: v.isoformat() if v else None,
+        }
@@ -5,7 +5,7 @@ from datetime import datetime, date
 class RuleCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     pattern: str = Field(..., min_length=1)
-    match_type: str = Field(..., pattern="^(contains|starts_with|ends_with|exact)$")
+    match_type: str = Field(..., pattern="^(contains|starts_with|ends_with|exact|regex)$")
     category_id: str
     is_active: bool = True
     exceptions: List[str] = Field(default_factory=list)
@@ -22,7 +22,7 @@ class RuleCreate(BaseModel):
 class RuleUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     pattern: Optional[str] = Field(None, min_length=1)
-    match_type: Optional[str] = Field(None, pattern="^(contains|starts_with|ends_with|exact)$")
+    match_type: Optional[str] = Field(None, pattern="^(contains|starts_with|ends_with|exact|regex)$")
     category_id: Optional[str] = None
     is_active: Optional[bool] = None
     exceptions: Optional[List[str]] = None
@@ -36,6 +36,22 @@ class RuleUpdate(BaseModel):
             return None
         return v
 
+class RulePreview(BaseModel):
+    """Règle en cours de saisie, évaluée sans être enregistrée"""
+    pattern: str = Field(..., min_length=1)
+    match_type: str = Field(..., pattern="^(contains|starts_with|ends_with|exact|regex)$")
+    category_id: Optional[str] = None
+    exceptions: List[str] = Field(default_factory=list)
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+    @field_validator('start_date', 'end_date', mode='before')
+    @classmethod
+    def empty_str_to_none(cls, v):
+        if v == '' or v == 'null':
+            return None
+        return v
+
 class RuleResponse(BaseModel):
     id: str
     name: str
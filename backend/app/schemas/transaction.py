@@ -48,6 +48,8 @@ class Category(CategoryBase):
     user_id: Optional[str] = None
     type: Optional[str] = "expense"
     parent_id: Optional[str] = None
+    ancestors: List[str] = []  # IDs des catégories ancêtres, de la racine au parent
+    path_label: Optional[str] = None  # Libellé complet « Parent › Catégorie »
     created_at: datetime
 
     class Config:
@@ -102,6 +104,45 @@ class TransactionWithCategory(Transaction):
     category: Optional[Category] = None
 
 
+class TransactionBatchItem(BaseModel):
+    id: str
+    update: TransactionUpdate
+
+
+class TransactionBatchFilter(BaseModel):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    category_id: Optional[str] = None  # "none" : transactions sans catégorie
+    is_expense: Optional[bool] = None
+    search: Optional[str] = None
+    search_mode: str = "regex"  # Mêmes modes et défaut que GET /api/transactions
+
+
+class TransactionBatchUpdate(BaseModel):
+    """Modification groupée : une liste (id, modification) ou un filtre et une modification"""
+    items: Optional[List[TransactionBatchItem]] = None
+    filter: Optional[TransactionBatchFilter] = None
+    update: Optional[TransactionUpdate] = None
+
+
+class TransactionBatchItemResult(BaseModel):
+    id: str
+    status: str  # "updated", "not_found" ou "error"
+    error: Optional[str] = None
+
+
+class TransactionBatchResult(BaseModel):
+    matched: int
+    modified: int
+    results: List[TransactionBatchItemResult] = []
+
+
+class TransactionSuggestion(BaseModel):
+    value: str
+    field: str  # "merchant" ou "description"
+    count: int
+
+
 class CategoryAmount(BaseModel):
     category_id: str
     category_name: str
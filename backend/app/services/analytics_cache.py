@@ -0,0 +1,223 @@
+"""
+Cache analytique en colonnes des transactions (NumPy)
+
+Pour chaque utilisateur, les transactions sont chargées une seule fois dans un
+instantané en colonnes triées par date :
+- dates : datetime64[ms]
+- amounts : float64
+- category_codes : int32 (-1 = non catégorisé, sinon index dans category_ids)
+- is_expense : masque booléen (is_expense si booléen, sinon type == "expense")
+
+Les regroupements sur une plage de dates quelconque se font alors par
+searchsorted (bornes) et bincount (sommes par catégorie), sans requête MongoDB.
+
+Les instantanés sont conservés dans un LRU borné en mémoire
+(ANALYTICS_CACHE_MAX_MB) et étiquetés par la version des données de
+l'utilisateur (champ data_version, incrémenté par app.services.change_tracking
+à chaque écriture sur ses transactions). Un instantané d'une version antérieure
+est rechargé à la requête suivante, y compris dans les autres processus.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from app.core.config import settings
+from app.utils.memory_cache import MemoryBudgetLRU
+
+logger = logging.getLogger(__name__)
+
+# Champs nécessaires à l'instantané
+SNAPSHOT_PROJECTION = {"_id": 0, "date": 1, "amount": 1, "category_id": 1, "is_expense": 1, "type": 1}
+
+
+def _to_datetime64(value: datetime) -> np.datetime64:
+    return np.datetime64(value.replace(tzinfo=None), "ms")
+
+
+class TransactionSnapshot:
+    """Transactions d'un utilisateur en colonnes NumPy, triées par date"""
+
+    __slots__ = ("dates", "amounts", "category_codes", "is_expense", "category_ids", "version")
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        amounts: np.ndarray,
+        category_codes: np.ndarray,
+        is_expense: np.ndarray,
+        category_ids: List[str],
+        version: int = 0
+    ):
+        self.dates = dates
+        self.amounts = amounts
+        self.category_codes = category_codes
+        self.is_expense = is_expense
+        self.category_ids = category_ids
+        self.version = version
+
+    @classmethod
+    def from_documents(cls, documents: List[Dict[str, Any]], version: int = 0) -> "TransactionSnapshot":
+        """
+        Construit l'instantané à partir des documents MongoDB
+
+        Les documents sans date (datetime) ou sans montant numérique sont
+        ignorés, comme ils le sont par les filtres et $sum de MongoDB.
+        """
+        dates = []
+        amounts = []
+        codes = []
+        expenses = []
+        category_index: Dict[str, int] = {}
+
+        for doc in documents:
+            tx_date = doc.get("date")
+            amount = doc.get("amount")
+            if not isinstance(tx_date, datetime) or not isinstance(amount, (int, float)):
+                continue
+
+            category_id = doc.get("category_id")
+            if category_id:
+                code = category_index.setdefault(str(category_id), len(category_index))
+            else:
+                code = -1
+
+            is_expense = doc.get("is_expense")
+            if not isinstance(is_expense, bool):
+                is_expense = doc.get("type") == "expense"
+
+            dates.append(tx_date.replace(tzinfo=None))
+            amounts.append(amount)
+            codes.append(code)
+            expenses.append(is_expense)
+
+        dates_array = np.array(dates, dtype="datetime64[ms]")
+        order = np.argsort(dates_array, kind="stable")
+
+        return cls(
+            dates=dates_array[order],
+            amounts=np.array(amounts, dtype=np.float64)[order],
+            category_codes=np.array(codes, dtype=np.int32)[order],
+            is_expense=np.array(expenses, dtype=bool)[order],
+            category_ids=list(category_index),
+            version=version
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def nbytes(self) -> int:
+        """Taille approximative en mémoire (tableaux + identifiants de catégories)"""
+        arrays = self.dates.nbytes + self.amounts.nbytes + self.category_codes.nbytes + self.is_expense.nbytes
+        return arrays + 80 * len(self.category_ids)
+
+    def bounds(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """Indices [lo, hi) des transactions avec start <= date < end"""
+        lo = int(np.searchsorted(self.dates, _to_datetime64(start), side="left"))
+        hi = int(np.searchsorted(self.dates, _to_datetime64(end), side="left"))
+        return lo, max(lo, hi)
+
+    def totals(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Totaux et nombres de revenus et de dépenses sur [start, end)"""
+        lo, hi = self.bounds(start, end)
+        amounts = self.amounts[lo:hi]
+        expense_mask = self.is_expense[lo:hi]
+        expense_count = int(np.count_nonzero(expense_mask))
+
+        return {
+            "total_income": float(amounts[~expense_mask].sum()),
+            "total_expenses": float(amounts[expense_mask].sum()),
+            "income_count": (hi - lo) - expense_count,
+            "expense_count": expense_count
+        }
+
+    def by_category(self, start: datetime, end: datetime, is_expense: bool) -> List[Dict[str, Any]]:
+        """
+        Totaux par catégorie sur [start, end), triés par total décroissant
+
+        Returns:
+            [{"category_id": str ou None, "total": float, "count": int}, ...]
+        """
+        lo, hi = self.bounds(start, end)
+        mask = self.is_expense[lo:hi] == is_expense
+        # Décalage de 1 : l'indice 0 regroupe les transactions non catégorisées
+        codes = self.category_codes[lo:hi][mask] + 1
+        size = len(self.category_ids) + 1
+
+        totals = np.bincount(codes, weights=self.amounts[lo:hi][mask], minlength=size)
+        counts = np.bincount(codes, minlength=size)
+
+        present = np.nonzero(counts)[0]
+        present = present[np.argsort(-totals[present], kind="stable")]
+        return [
+            {
+                "category_id": self.category_ids[index - 1] if index else None,
+                "total": float(totals[index]),
+                "count": int(counts[index])
+            }
+            for index in present
+        ]
+
+
+class AnalyticsCache:
+    """Instantanés par utilisateur dans un LRU borné en mémoire"""
+
+    def __init__(self, max_bytes: int):
+        self._cache = MemoryBudgetLRU(max_bytes)
+        self._loading: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    async def get_snapshot(self, db, user: Dict[str, Any]) -> TransactionSnapshot:
+        """
+        Renvoie l'instantané de l'utilisateur, rechargé si sa version a changé
+
+        Args:
+            db: Instance MongoDB
+            user: Document utilisateur (current_user), porteur de data_version
+        """
+        key = str(user["_id"])
+        version = user.get("data_version", 0)
+
+        snapshot = self._cache.get(key)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        # Un seul chargement par utilisateur et version, partagé entre requêtes simultanées
+        loading_key = (key, version)
+        task = self._loading.get(loading_key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(db, user["_id"], version))
+            self._loading[loading_key] = task
+            task.add_done_callback(lambda _: self._loading.pop(loading_key, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, db, user_id, version: int) -> TransactionSnapshot:
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        collection = await db.get_collection("transactions")
+        documents = await collection.find({"user_id": user_id}, SNAPSHOT_PROJECTION).to_list(None)
+        snapshot = TransactionSnapshot.from_documents(documents, version)
+
+        self._cache.put(str(user_id), snapshot, snapshot.nbytes)
+        logger.debug(
+            f"Instantané analytique chargé pour {user_id}: {len(snapshot)} transactions, "
+            f"{snapshot.nbytes} octets (version {version})"
+        )
+        return snapshot
+
+    def invalidate(self, user_id) -> None:
+        """Supprime l'instantané d'un utilisateur de ce processus"""
+        self._cache.pop(str(user_id))
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        self._cache.clear()
+
+
+# Instance globale
+analytics_cache = AnalyticsCache(settings.ANALYTICS_CACHE_MAX_MB * 1024 * 1024)
@@ -56,12 +56,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_d
     """
     Récupère l'utilisateur actuel à partir du token JWT.
     """
+    return await get_user_from_token(token, db)
+
+
+async def get_user_from_token(token: Optional[str], db) -> Dict:
+    """
+    Récupère l'utilisateur d'un token JWT (en-tête Authorization ou paramètre
+    de requête pour les clients qui ne peuvent pas définir d'en-tête, comme EventSource).
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Impossible de valider les identifiants",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    if not token:
+        raise credentials_exception
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
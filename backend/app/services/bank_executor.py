@@ -0,0 +1,226 @@
+"""
+Couche d'exécution des connecteurs bancaires
+
+Les connecteurs CIC et BoursoBank déclarent des méthodes async mais appellent
+l'API synchrone de Selenium (driver.get, WebDriverWait.until...). Exécutés
+directement dans la boucle d'événements de l'API, ils gèlent tout le processus
+pendant la synchronisation.
+
+Ce module exécute chaque session de connecteur (connexion, comptes,
+transactions, fermeture) dans un pool de threads dédié, chaque thread disposant
+de sa propre boucle d'événements. Le nombre de sessions navigateur simultanées
+est borné par la taille du pool et chaque session est soumise à un délai
+maximal. Les connecteurs mock passent par le même chemin.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectorTimeoutError(Exception):
+    """La session du connecteur a dépassé le délai autorisé"""
+
+
+class ConnectorCancelledError(Exception):
+    """La session du connecteur a été interrompue avant la fin"""
+
+
+def create_connector(bank: str, connection_type: str):
+    """
+    Instancie le connecteur correspondant à une banque et un type de connexion
+
+    Args:
+        bank: Identifiant de la banque ('boursobank', 'cic')
+        connection_type: Type de connexion ('mock', 'scraping', 'api')
+
+    Returns:
+        Instance du connecteur
+
+    Raises:
+        ValueError: Si la banque n'est pas supportée
+    """
+    if bank == "boursobank":
+        if connection_type == "mock":
+            from app.services.boursobank import BoursobankMockConnector
+            return BoursobankMockConnector()
+        from app.services.boursobank import BoursobankConnector
+        return BoursobankConnector()
+    if bank == "cic":
+        if connection_type == "mock":
+            from app.services.cic import CICMockConnector
+            return CICMockConnector()
+        from app.services.cic import CICConnector
+        return CICConnector()
+    raise ValueError(f"Banque non supportée: {bank}")
+
+
+def _close_connector(connector) -> None:
+    """Ferme le connecteur sans propager d'erreur (driver déjà fermé, etc.)"""
+    try:
+        connector.close()
+    except Exception as e:
+        logger.warning(f"Erreur lors de la fermeture du connecteur: {e}")
+
+
+class BankConnectorExecutor:
+    """
+    Exécute les sessions de connecteurs bancaires dans un pool de threads borné
+
+    Une session enchaîne login, get_accounts puis get_transactions pour chaque
+    compte, et ferme toujours le connecteur à la fin. Le résultat est un dict :
+    {"login_success": bool, "accounts": [...], "transactions": {account_id: [...]}}
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            max_sessions: Nombre maximum de sessions navigateur simultanées
+            timeout: Durée maximale d'une session en secondes
+        """
+        self.max_sessions = max_sessions or settings.BANK_SYNC_MAX_SESSIONS
+        self.timeout = timeout or settings.BANK_SYNC_SESSION_TIMEOUT
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Crée le pool à la première utilisation (ou après un shutdown)"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_sessions,
+                    thread_name_prefix="bank-connector"
+                )
+            return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Arrête le pool de threads (appelé à l'arrêt de l'application)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def run_session(
+        self,
+        connector,
+        credentials: Dict[str, str],
+        start_dates: Optional[Dict[str, Optional[datetime]]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Exécute une session complète du connecteur dans le pool
+
+        Le délai ne commence qu'au démarrage effectif de la session : l'attente
+        d'une place libre dans le pool n'est pas comptée.
+
+        Args:
+            connector: Instance du connecteur (réel ou mock)
+            credentials: Identifiants déchiffrés (username, password)
+            start_dates: Date de début de récupération par identifiant de compte
+            timeout: Délai maximal de la session (par défaut celui de l'exécuteur)
+
+        Returns:
+            Résultat de la session
+
+        Raises:
+            ConnectorTimeoutError: Si la session dépasse le délai
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.create_future()
+        cancel_event = threading.Event()
+
+        def notify_started():
+            if not started.done():
+                started.set_result(None)
+
+        future = self._get_executor().submit(
+            self._run_session,
+            connector,
+            credentials,
+            start_dates or {},
+            cancel_event,
+            lambda: loop.call_soon_threadsafe(notify_started)
+        )
+        session = asyncio.wrap_future(future)
+
+        try:
+            # Attente d'une place libre dans le pool
+            await asyncio.wait({started, session}, return_when=asyncio.FIRST_COMPLETED)
+            return await asyncio.wait_for(asyncio.shield(session), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            await self._abort(loop, connector, cancel_event, future)
+            raise ConnectorTimeoutError(
+                f"La session du connecteur a dépassé {timeout or self.timeout}s"
+            )
+        except asyncio.CancelledError:
+            await self._abort(loop, connector, cancel_event, future)
+            raise
+        finally:
+            if not started.done():
+                started.cancel()
+
+    async def _abort(self, loop, connector, cancel_event: threading.Event, future) -> None:
+        """
+        Interrompt une session en cours
+
+        La session ne peut pas être tuée depuis l'extérieur : on signale
+        l'annulation et on ferme le navigateur depuis un autre thread, ce qui
+        fait échouer l'appel Selenium bloqué et libère le thread du pool.
+        """
+        cancel_event.set()
+        if future.cancel():
+            # La session n'avait pas démarré
+            return
+        await loop.run_in_executor(None, _close_connector, connector)
+
+    @staticmethod
+    def _run_session(
+        connector,
+        credentials: Dict[str, str],
+        start_dates: Dict[str, Optional[datetime]],
+        cancel_event: threading.Event,
+        on_start
+    ) -> Dict[str, Any]:
+        """Corps de la session, exécuté dans un thread du pool"""
+        on_start()
+
+        def check_cancelled():
+            if cancel_event.is_set():
+                raise ConnectorCancelledError("Session interrompue")
+
+        async def session() -> Dict[str, Any]:
+            login_success = await connector.login(
+                credentials.get("username", ""),
+                credentials.get("password", "")
+            )
+            if not login_success:
+                return {"login_success": False, "accounts": [], "transactions": {}}
+
+            check_cancelled()
+            accounts = await connector.get_accounts()
+
+            transactions = {}
+            for account in accounts:
+                check_cancelled()
+                transactions[account["id"]] = await connector.get_transactions(
+                    account["id"],
+                    start_date=start_dates.get(account["id"])
+                )
+
+            return {"login_success": True, "accounts": accounts, "transactions": transactions}
+
+        try:
+            return asyncio.run(session())
+        finally:
+            _close_connector(connector)
+
+
+# Instance globale
+bank_connector_executor = BankConnectorExecutor()
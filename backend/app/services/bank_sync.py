@@ -0,0 +1,427 @@
+"""
+Synchronisation incrémentale des connexions bancaires
+
+Chaque document bank_accounts conserve un filigrane (sync_watermark) : la date
+de la transaction la plus récente déjà enregistrée pour ce compte. Lors de la
+synchronisation suivante, le connecteur n'est interrogé qu'à partir de ce
+filigrane moins une fenêtre de recouvrement (BANK_SYNC_OVERLAP_DAYS), qui
+rattrape les opérations publiées en retard par la banque.
+
+Les écritures sont groupées : un bulk_write non ordonné d'upserts par compte
+pour les transactions ($setOnInsert, les transactions existantes ne sont
+jamais modifiées), puis un bulk_write unique pour les comptes. Les filigranes
+ne sont avancés qu'après l'écriture des transactions.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.encryption import encryption_service
+from app.schemas.bank_connection import ConnectionSyncResult, SyncAllResult, SyncResult
+from app.services.change_tracking import notify_transactions_changed
+from app.services.events import BANK_SYNC_COMPLETED, event_bus
+from app.services.rule_engine import CompiledRuleSet, rule_set_cache
+from app.services.transaction_search import with_search_tokens
+from app.services.bank_executor import (
+    bank_connector_executor,
+    create_connector,
+    ConnectorTimeoutError
+)
+
+logger = logging.getLogger(__name__)
+
+
+def decrypt_credentials(connection: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Déchiffre les identifiants d'une connexion bancaire
+
+    Args:
+        connection: Document de la collection bank_connections
+
+    Returns:
+        Identifiants en clair (username/password ou client_id/client_secret)
+    """
+    user_id_str = str(connection["user_id"])
+    if connection.get("connection_type") == "api":
+        fields = {
+            "client_id": "encrypted_api_client_id",
+            "client_secret": "encrypted_api_client_secret"
+        }
+    else:
+        fields = {
+            "username": "encrypted_username",
+            "password": "encrypted_password"
+        }
+
+    credentials = {}
+    for key, field in fields.items():
+        if connection.get(field):
+            credentials[key] = encryption_service.decrypt(connection[field], user_id_str)
+    return credentials
+
+
+def build_external_id(account_external_id: str, transaction_date: datetime, trans: Dict[str, Any]) -> str:
+    """
+    Identifiant stable d'une transaction bancaire
+
+    Basé sur la date (sans l'heure), le montant absolu et le début du libellé,
+    pour reconnaître une transaction déjà importée d'une synchronisation à l'autre.
+    """
+    date_str = transaction_date.date().isoformat()
+    amount_abs = abs(trans["amount"])
+    return f"{account_external_id}_{date_str}_{amount_abs}_{trans['description'][:20]}"
+
+
+def compute_start_dates(
+    existing_accounts: Dict[str, Dict[str, Any]],
+    overlap_days: int
+) -> Dict[str, Optional[datetime]]:
+    """
+    Calcule la date de début de récupération de chaque compte connu
+
+    Les comptes sans filigrane (jamais synchronisés) sont absents du résultat :
+    le connecteur applique alors sa période par défaut.
+    """
+    start_dates = {}
+    for external_id, account in existing_accounts.items():
+        watermark = account.get("sync_watermark")
+        if watermark:
+            start_dates[external_id] = watermark - timedelta(days=overlap_days)
+    return start_dates
+
+
+def build_transaction_operations(
+    transactions: List[Dict[str, Any]],
+    account_external_id: str,
+    user_id: ObjectId,
+    connection_id: ObjectId,
+    bank_account_id: ObjectId,
+    now: datetime,
+    rule_set: Optional[CompiledRuleSet] = None
+) -> Tuple[List[UpdateOne], Optional[datetime]]:
+    """
+    Prépare les upserts des transactions d'un compte
+
+    Les doublons au sein d'un même lot sont éliminés avant l'écriture. Les
+    transactions sont catégorisées par rule_set s'il est fourni.
+
+    Returns:
+        (opérations UpdateOne, date de transaction la plus récente du lot)
+    """
+    documents = {}
+    latest_date = None
+
+    for trans in transactions:
+        transaction_date = datetime.fromisoformat(trans["date"])
+        external_id = build_external_id(account_external_id, transaction_date, trans)
+        if latest_date is None or transaction_date > latest_date:
+            latest_date = transaction_date
+        if external_id in documents:
+            continue
+
+        # Déterminer le type en fonction du signe
+        is_expense = trans["amount"] < 0
+        documents[external_id] = with_search_tokens({
+            "user_id": user_id,
+            "bank_connection_id": connection_id,
+            "bank_account_id": bank_account_id,
+            "external_id": external_id,
+            "amount": abs(trans["amount"]),  # Toujours en valeur absolue
+            "description": trans["description"],
+            "date": transaction_date,
+            "type": "expense" if is_expense else "income",
+            "category": None,  # Sera catégorisé par les règles
+            "created_at": now,
+            "updated_at": now
+        })
+        if rule_set is not None:
+            rule_set.categorize(documents[external_id])
+
+    operations = [
+        UpdateOne(
+            {
+                "user_id": user_id,
+                "bank_connection_id": connection_id,
+                "external_id": external_id
+            },
+            {"$setOnInsert": document},
+            upsert=True
+        )
+        for external_id, document in documents.items()
+    ]
+    return operations, latest_date
+
+
+async def sync_connection(
+    db,
+    connection: Dict[str, Any],
+    executor=None,
+    connector_factory: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> SyncResult:
+    """
+    Synchronise une connexion bancaire (comptes et nouvelles transactions)
+
+    Args:
+        db: Instance MongoDB
+        connection: Document de la collection bank_connections
+        executor: Exécuteur des sessions de connecteur (par défaut l'instance globale)
+        connector_factory: Fabrique de connecteur à partir de la connexion
+            (par défaut selon la banque et le type de connexion)
+
+    Returns:
+        Résultat de la synchronisation
+
+    Raises:
+        ValueError: Si la banque n'est pas supportée
+        ConnectorTimeoutError: Si la session du connecteur dépasse le délai
+    """
+    executor = executor or bank_connector_executor
+    connection_id = connection["_id"]
+    user_id = connection["user_id"]
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+
+    if connector_factory:
+        connector = connector_factory(connection)
+    else:
+        connector = create_connector(connection.get("bank"), connection.get("connection_type"))
+    credentials = decrypt_credentials(connection)
+
+    accounts_collection = await db.get_collection("bank_accounts")
+    transactions_collection = await db.get_collection("transactions")
+    connections_collection = await db.get_collection("bank_connections")
+
+    # Comptes déjà connus, lus en une seule requête
+    existing_accounts = {
+        account["external_id"]: account
+        async for account in accounts_collection.find(
+            {"connection_id": connection_id},
+            {"_id": 1, "external_id": 1, "sync_watermark": 1}
+        )
+    }
+    start_dates = compute_start_dates(existing_accounts, settings.BANK_SYNC_OVERLAP_DAYS)
+
+    # Session du connecteur hors de la boucle d'événements
+    session = await executor.run_session(connector, credentials, start_dates=start_dates)
+    if not session["login_success"]:
+        return SyncResult(
+            success=False,
+            error="Échec de la connexion: identifiants invalides"
+        )
+
+    accounts = session["accounts"]
+    # Heure UTC naïve : clé de la synchronisation différentielle (updated_at)
+    now = datetime.utcnow()
+    new_transactions_count = 0
+    account_operations = []
+    rule_set = await rule_set_cache.get(db, user_id)
+
+    for account in accounts:
+        existing = existing_accounts.get(account["id"])
+        # Identifiant généré côté client pour les nouveaux comptes : les
+        # transactions peuvent le référencer avant l'écriture du compte
+        bank_account_id = existing["_id"] if existing else ObjectId()
+        watermark = existing.get("sync_watermark") if existing else None
+
+        operations, latest_date = build_transaction_operations(
+            session["transactions"].get(account["id"], []),
+            account["id"],
+            user_id,
+            connection_id,
+            bank_account_id,
+            now,
+            rule_set
+        )
+        if operations:
+            result = await transactions_collection.bulk_write(operations, ordered=False)
+            new_transactions_count += result.upserted_count
+
+        if latest_date and (watermark is None or latest_date > watermark):
+            watermark = latest_date
+
+        account_data = {
+            "connection_id": connection_id,
+            "user_id": user_id,
+            "external_id": account["id"],
+            "name": account["name"],
+            "account_type": account["type"],
+            "balance": account["balance"],
+            "currency": account.get("currency", "EUR"),
+            "iban": account.get("iban"),
+            "is_active": True,
+            "sync_watermark": watermark,
+            "last_sync": now,
+            "updated_at": now
+        }
+        account_operations.append(
+            UpdateOne(
+                {"_id": bank_account_id},
+                {"$set": account_data, "$setOnInsert": {"created_at": now}},
+                upsert=True
+            )
+        )
+
+    if account_operations:
+        await accounts_collection.bulk_write(account_operations, ordered=False)
+
+    # Mettre à jour la connexion
+    await connections_collection.update_one(
+        {"_id": connection_id},
+        {
+            "$set": {
+                "last_sync": now,
+                "accounts_count": len(accounts)
+            }
+        }
+    )
+
+    if new_transactions_count:
+        await notify_transactions_changed(db, user_id, "synced", new_transactions_count)
+
+    logger.info(
+        f"Synchronisation {connection_id}: {len(accounts)} comptes, "
+        f"{new_transactions_count} nouvelles transactions"
+    )
+    event_bus.publish(user_id, {
+        "type": BANK_SYNC_COMPLETED,
+        "connection_id": str(connection_id),
+        "new_transactions": new_transactions_count,
+        "updated_accounts": len(accounts)
+    })
+
+    return SyncResult(
+        success=True,
+        new_transactions=new_transactions_count,
+        updated_accounts=len(accounts)
+    )
+
+
+async def _sync_isolated(
+    db,
+    connection: Dict[str, Any],
+    semaphore: asyncio.Semaphore,
+    executor=None,
+    connector_factory: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> ConnectionSyncResult:
+    """
+    Synchronise une connexion sous sémaphore, sans jamais propager d'erreur
+
+    Une banque en échec (identifiants, délai dépassé, erreur base) produit un
+    résultat en échec sans interrompre les autres synchronisations.
+    """
+    async with semaphore:
+        try:
+            result = await sync_connection(db, connection, executor, connector_factory)
+        except ConnectorTimeoutError as e:
+            result = SyncResult(success=False, error=f"Délai de synchronisation dépassé: {str(e)}")
+        except Exception as e:
+            logger.error(f"Erreur lors de la synchronisation de {connection['_id']}: {e}")
+            result = SyncResult(success=False, error=f"Erreur lors de la synchronisation: {str(e)}")
+
+    return ConnectionSyncResult(
+        **result.model_dump(),
+        connection_id=str(connection["_id"]),
+        bank=connection.get("bank"),
+        nickname=connection.get("nickname")
+    )
+
+
+async def sync_connections(
+    db,
+    connections: List[Dict[str, Any]],
+    max_concurrency: int,
+    executor=None,
+    connector_factory: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> SyncAllResult:
+    """
+    Synchronise plusieurs connexions en parallèle
+
+    Args:
+        db: Instance MongoDB
+        connections: Documents de la collection bank_connections
+        max_concurrency: Nombre maximum de synchronisations simultanées
+        executor: Exécuteur des sessions de connecteur
+        connector_factory: Fabrique de connecteur (benchmarks)
+
+    Returns:
+        Résultats agrégés
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    results = await asyncio.gather(*[
+        _sync_isolated(db, connection, semaphore, executor, connector_factory)
+        for connection in connections
+    ])
+
+    succeeded = [result for result in results if result.success]
+    return SyncAllResult(
+        success=len(succeeded) == len(results),
+        connections=list(results),
+        succeeded=len(succeeded),
+        failed=len(results) - len(succeeded),
+        new_transactions=sum(result.new_transactions for result in succeeded),
+        updated_accounts=sum(result.updated_accounts for result in succeeded)
+    )
+
+
+async def sync_user_connections(
+    db,
+    user_id: ObjectId,
+    max_concurrency: Optional[int] = None,
+    executor=None,
+    connector_factory: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> SyncAllResult:
+    """
+    Synchronise toutes les connexions actives d'un utilisateur
+
+    Args:
+        db: Instance MongoDB
+        user_id: Identifiant de l'utilisateur
+        max_concurrency: Synchronisations simultanées (BANK_SYNC_USER_CONCURRENCY par défaut)
+    """
+    collection = await db.get_collection("bank_connections")
+    connections = await collection.find({"user_id": user_id, "is_active": True}).to_list(None)
+    return await sync_connections(
+        db,
+        connections,
+        max_concurrency or settings.BANK_SYNC_USER_CONCURRENCY,
+        executor,
+        connector_factory
+    )
+
+
+async def sync_all_users(
+    db,
+    max_concurrency: Optional[int] = None,
+    executor=None
+) -> SyncAllResult:
+    """
+    Synchronise les connexions actives de tous les utilisateurs
+
+    Utilisé par le planificateur en heures creuses. Le plafond de concurrence
+    est global (toutes connexions confondues), le nombre de navigateurs restant
+    borné par le pool de l'exécuteur.
+
+    Args:
+        db: Instance MongoDB
+        max_concurrency: Synchronisations simultanées (BANK_SYNC_GLOBAL_CONCURRENCY par défaut)
+    """
+    collection = await db.get_collection("bank_connections")
+    connections = await collection.find({"is_active": True}).to_list(None)
+    logger.info(f"Synchronisation planifiée de {len(connections)} connexions")
+    result = await sync_connections(
+        db,
+        connections,
+        max_concurrency or settings.BANK_SYNC_GLOBAL_CONCURRENCY,
+        executor
+    )
+    logger.info(
+        f"Synchronisation planifiée terminée: {result.succeeded} réussies, "
+        f"{result.failed} en échec, {result.new_transactions} nouvelles transactions"
+    )
+    return result
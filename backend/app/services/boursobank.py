@@ -25,6 +25,10 @@ class BoursobankConnector:
     - Budget Insight API
     - Bridge API
     - Linxo Connect
+    
+    Les méthodes appellent l'API synchrone de Selenium : ne pas les attendre
+    depuis la boucle d'événements de l'API, passer par
+    app.services.bank_executor.bank_connector_executor.
     """
     
     BASE_URL = "https://clients.boursobank.com"
@@ -280,7 +284,7 @@ class BoursobankMockConnector:
         
         # Transactions différentes selon le compte
         if 'FR7612345678901234567890123' in account_id:  # Compte Courant
-            return [
+            transactions = [
                 {
                     'date': (now - timedelta(days=1)).isoformat(),
                     'description': 'VIR SEPA SALAIRE ENTREPRISE',
@@ -325,7 +329,7 @@ class BoursobankMockConnector:
                 }
             ]
         else:  # Livret BoursoBank+
-            return [
+            transactions = [
                 {
                     'date': (now - timedelta(days=1)).isoformat(),
                     'description': 'VIR INTERNE EPARGNE',
@@ -349,6 +353,14 @@ class BoursobankMockConnector:
                 }
             ]
         
+        # Respecter la date de début demandée (synchronisation incrémentale)
+        if start_date:
+            transactions = [
+                t for t in transactions
+                if datetime.fromisoformat(t['date']) >= start_date
+            ]
+        return transactions
+        
     def close(self):
         """Mock de fermeture"""
         pass
@@ -0,0 +1,120 @@
+"""
+Alertes budgétaires évaluées à l'écriture
+
+Lorsqu'une écriture modifie le montant dépensé d'une période de budget
+(budget_periods), les seuils BUDGET_ALERT_THRESHOLDS (en % du montant)
+atteints sont enregistrés dans la collection budget_alerts : un document par
+budget, période et seuil, créé par un find_one_and_update en upsert qui
+assure la déduplication même entre processus. Seule la création d'une
+alerte publie un événement budget.threshold ; les autres sous-systèmes
+(notifications, SSE) s'abonnent à cet événement.
+
+Une alerte dont le seuil n'est plus atteint (transaction supprimée,
+recatégorisée ou réduite, montant du budget relevé) est supprimée : les
+alertes enregistrées sont toujours celles des seuils atteints. Leurs champs
+amount, spent et percentage suivent ceux de la période à chaque écriture.
+
+La lecture des alertes de la période en cours est une requête indexée
+(user_id, period_end), sans agrégation des transactions.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.services.events import BUDGET_THRESHOLD, event_bus
+
+logger = logging.getLogger(__name__)
+
+
+def reached_thresholds(amount: float, spent: float) -> List[int]:
+    """Seuils atteints pour un budget de montant amount"""
+    if not amount or amount <= 0:
+        return []
+    return [threshold for threshold in settings.BUDGET_ALERT_THRESHOLDS if spent * 100 >= threshold * amount]
+
+
+async def update_alerts(db, period: Dict[str, Any], previous_spent: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Met à jour les alertes d'une période de budget après une écriture
+
+    Les alertes des seuils atteints sont créées ou mises à jour (montant
+    dépensé et pourcentage), celles des seuils qui ne le sont plus sont
+    supprimées.
+
+    Args:
+        period: Document budget_periods après l'écriture
+        previous_spent: Montant dépensé avant l'écriture, si connu : seuls les
+            seuils franchis par cette écriture (dans un sens ou dans l'autre)
+            sont alors évalués
+
+    Returns:
+        Les alertes nouvellement créées
+    """
+    amount = period.get("amount") or 0
+    reached = reached_thresholds(amount, period["spent"])
+    thresholds = reached
+    resolve = True
+    if previous_spent is not None:
+        already_reached = reached_thresholds(amount, previous_spent)
+        thresholds = [threshold for threshold in reached if threshold not in already_reached]
+        resolve = any(threshold not in reached for threshold in already_reached)
+    if not reached and not resolve:
+        return []
+
+    alerts_collection = await db.get_collection("budget_alerts")
+    if resolve:
+        await alerts_collection.delete_many({
+            "budget_id": period["budget_id"],
+            "period_start": period["period_start"],
+            "threshold": {"$nin": reached}
+        })
+    stats = {"amount": amount, "spent": period["spent"], "percentage": period["spent"] / amount * 100} if reached else {}
+    if reached:
+        await alerts_collection.update_many(
+            {"budget_id": period["budget_id"], "period_start": period["period_start"], "threshold": {"$in": reached}},
+            {"$set": stats}
+        )
+    created = []
+    for threshold in thresholds:
+        alert = {
+            "user_id": period["user_id"],
+            "budget_id": period["budget_id"],
+            "category_id": period["category_ids"][0] if period.get("category_ids") else None,
+            "period_start": period["period_start"],
+            "period_end": period["period_end"],
+            "threshold": threshold,
+            **stats,
+            "created_at": datetime.utcnow()
+        }
+        existing = await alerts_collection.find_one_and_update(
+            {"budget_id": period["budget_id"], "period_start": period["period_start"], "threshold": threshold},
+            {"$setOnInsert": alert},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        if existing is None:
+            created.append(alert)
+            event_bus.publish(period["user_id"], {
+                "type": BUDGET_THRESHOLD,
+                "budget_id": str(period["budget_id"]),
+                "category_id": str(alert["category_id"]) if alert["category_id"] else None,
+                "threshold": threshold,
+                "spent": alert["spent"],
+                "amount": amount
+            })
+    return created
+
+
+async def current_alerts(db, user_id: ObjectId, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Alertes des périodes en cours, les plus récentes d'abord"""
+    alerts_collection = await db.get_collection("budget_alerts")
+    cursor = alerts_collection.find({
+        "user_id": user_id,
+        "period_end": {"$gt": now or datetime.utcnow()}
+    }).sort("created_at", -1)
+    return await cursor.to_list(length=None)
@@ -0,0 +1,318 @@
+"""
+Dépenses matérialisées des budgets par période
+
+Chaque budget a, pour sa période en cours, un document budget_periods qui
+conserve le montant dépensé (spent) sur sa catégorie et ses sous-catégories
+(category_ids) :
+- une écriture de transaction dont l'état avant/après est connu (création,
+  modification, suppression unitaire) ajuste spent par $inc sur les périodes
+  qui contiennent sa date (apply_transaction_changes) ; si aucune période ne
+  la contient encore (première écriture d'une nouvelle période) ou si elle
+  est périmée, les périodes en cours de ses budgets sont recalculées ;
+- les écritures en masse (imports, synchronisation, mises à jour par filtre,
+  application de règles, purge) marquent les périodes de l'utilisateur comme
+  périmées (mark_stale) puis recalculent aussitôt celles en cours
+  (reconcile_current_periods) ;
+- une période absente, périmée ou dont le budget a changé (montant,
+  sous-catégories) est recalculée par une seule agrégation (reconcile_periods),
+  à l'écriture pour la période en cours, à la lecture pour l'historique ; le
+  recalcul n'est enregistré que si la période n'a pas été modifiée entre-temps
+  (compteur version).
+
+Lire les dépenses des budgets coûte ainsi une requête sur budget_periods,
+quel que soit le nombre de transactions. Chaque nouveau montant est comparé
+aux seuils d'alerte (budget_alerts.update_alerts) dès l'écriture.
+notify_transactions_changed appelle apply_transaction_changes ou mark_stale
+et reconcile_current_periods ; scripts/rebuild_budget_periods.py recalcule
+toutes les périodes.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.services.budget_alerts import update_alerts
+from app.services.category_tree import CategoryTree
+
+
+# Tentatives de recalcul d'une période modifiée entre sa lecture et son écriture
+RECONCILE_MAX_ATTEMPTS = 3
+
+# Une transaction est une dépense si is_expense vaut True ou, à défaut de
+# booléen, si son type vaut "expense" (transactions synchronisées), comme
+# IS_EXPENSE_EXPR des rapports
+EXPENSE_FILTER = {
+    "$or": [
+        {"is_expense": True},
+        {"is_expense": {"$not": {"$type": "bool"}}, "type": "expense"}
+    ]
+}
+
+
+def is_expense(transaction: Dict[str, Any]) -> bool:
+    """Équivalent de EXPENSE_FILTER pour un document"""
+    value = transaction.get("is_expense")
+    if isinstance(value, bool):
+        return value
+    return transaction.get("type") == "expense"
+
+
+def budget_category_ids(budget: Dict[str, Any], category_tree: CategoryTree) -> List[ObjectId]:
+    """Catégorie du budget et ses sous-catégories (chemins matérialisés ancestors)"""
+    return category_tree.subtree_ids(budget["category_id"]) or [budget["category_id"]]
+
+
+async def _write_periods(periods_collection, operations: List[UpdateOne]) -> bool:
+    """Écritures conditionnelles des périodes ; False si l'une a changé depuis sa lecture"""
+    try:
+        result = await periods_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError:
+        # Période créée entre-temps par un autre processus (index unique)
+        return False
+    return result.matched_count + result.upserted_count == len(operations)
+
+
+async def reconcile_periods(
+    db,
+    user_id: ObjectId,
+    budgets: List[Dict[str, Any]],
+    start_date: datetime,
+    end_date: datetime,
+    category_tree: CategoryTree,
+    force: bool = False
+) -> Dict[str, float]:
+    """
+    Dépenses de la période [start_date, end_date[ pour chaque budget
+
+    Les périodes à jour sont lues telles quelles ; les autres (ou toutes avec
+    force=True) sont recalculées par une agrégation commune puis enregistrées.
+
+    Chaque période porte un compteur version, incrémenté par toute écriture
+    ($inc de apply_transaction_changes, mark_stale, recalcul). Le recalcul
+    n'écrit spent que si version n'a pas changé depuis sa lecture : un $inc
+    concurrent, déjà compté ou non par l'agrégation, n'est jamais écrasé. En
+    cas de conflit, les périodes sont relues et recalculées
+    (RECONCILE_MAX_ATTEMPTS tentatives, puis laissées périmées).
+
+    Returns:
+        {budget_id (str): montant dépensé}
+    """
+    if not budgets:
+        return {}
+    periods_collection = await db.get_collection("budget_periods")
+    transactions_collection = await db.get_collection("transactions")
+    expected = {str(budget["_id"]): budget_category_ids(budget, category_tree) for budget in budgets}
+
+    spent = {}
+    pending = budgets
+    for _ in range(RECONCILE_MAX_ATTEMPTS):
+        cursor = periods_collection.find(
+            {"budget_id": {"$in": [budget["_id"] for budget in pending]}, "period_start": start_date},
+            {"budget_id": 1, "category_ids": 1, "amount": 1, "spent": 1, "stale": 1, "version": 1}
+        )
+        existing = {str(period["budget_id"]): period for period in await cursor.to_list(length=None)}
+
+        to_rebuild = []
+        for budget in pending:
+            key = str(budget["_id"])
+            period = existing.get(key)
+            if (
+                not force
+                and period
+                and not period.get("stale")
+                and period.get("amount") == budget["amount"]
+                and {str(category_id) for category_id in period.get("category_ids", [])}
+                == {str(category_id) for category_id in expected[key]}
+            ):
+                spent[key] = period["spent"]
+            else:
+                to_rebuild.append(budget)
+        if not to_rebuild:
+            return spent
+
+        category_ids = {category_id for budget in to_rebuild for category_id in expected[str(budget["_id"])]}
+        pipeline = [
+            {
+                "$match": {
+                    "user_id": user_id,
+                    "category_id": {"$in": list(category_ids)},
+                    "date": {"$gte": start_date, "$lt": end_date},
+                    **EXPENSE_FILTER
+                }
+            },
+            {"$group": {"_id": "$category_id", "total": {"$sum": "$amount"}}}
+        ]
+        totals = {
+            str(row["_id"]): row["total"]
+            for row in await transactions_collection.aggregate(pipeline).to_list(length=None)
+        }
+
+        now = datetime.utcnow()
+        operations = []
+        periods = []
+        for budget in to_rebuild:
+            key = str(budget["_id"])
+            spent[key] = sum(totals.get(str(category_id), 0.0) for category_id in expected[key])
+            period = {
+                "user_id": user_id,
+                "budget_id": budget["_id"],
+                "period_start": start_date,
+                "period_end": end_date,
+                "category_ids": expected[key],
+                "amount": budget["amount"],
+                "spent": spent[key],
+                "stale": False,
+                "updated_at": now
+            }
+            periods.append(period)
+            previous = existing.get(key)
+            # version absente (période à créer ou antérieure au compteur) : filtre sur None
+            version = previous.get("version") if previous else None
+            operations.append(UpdateOne(
+                {"budget_id": budget["_id"], "period_start": start_date, "version": version},
+                {"$set": period, "$inc": {"version": 1}},
+                upsert=previous is None
+            ))
+
+        if await _write_periods(periods_collection, operations):
+            # Seuils atteints ou quittés depuis la dernière mise à jour (écritures
+            # en masse, montant du budget modifié)
+            for period in periods:
+                await update_alerts(db, period)
+            return spent
+        # Écriture concurrente entre la lecture et l'écriture : recalcul
+        pending, force = to_rebuild, True
+
+    await periods_collection.update_many(
+        {"budget_id": {"$in": [budget["_id"] for budget in pending]}, "period_start": start_date},
+        {"$set": {"stale": True}, "$inc": {"version": 1}}
+    )
+    return spent
+
+
+def _contribution(transaction: Optional[Dict[str, Any]]) -> Optional[Tuple[ObjectId, datetime, float]]:
+    """(catégorie, date, montant) d'une dépense catégorisée, None sinon"""
+    if not transaction or not is_expense(transaction):
+        return None
+    category_id = transaction.get("category_id")
+    if not category_id or not ObjectId.is_valid(str(category_id)):
+        return None
+    transaction_date = transaction.get("date")
+    if isinstance(transaction_date, date) and not isinstance(transaction_date, datetime):
+        transaction_date = datetime.combine(transaction_date, datetime.min.time())
+    if not isinstance(transaction_date, datetime):
+        return None
+    return ObjectId(str(category_id)), transaction_date.replace(tzinfo=None), float(transaction.get("amount") or 0)
+
+
+async def apply_transaction_changes(
+    db,
+    user_id: ObjectId,
+    changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+) -> None:
+    """
+    Ajuste par $inc les dépenses des périodes touchées par des transactions
+
+    Chaque période est mise à jour par find_one_and_update afin de connaître
+    son montant avant et après l'écriture : les alertes des seuils franchis
+    sont créées ou supprimées.
+
+    Args:
+        changes: couples (transaction avant, transaction après) ; None pour
+            une création (avant) ou une suppression (après)
+    """
+    deltas: Dict[Tuple[ObjectId, datetime], float] = defaultdict(float)
+    for before, after in changes:
+        for transaction, sign in ((before, -1), (after, 1)):
+            contribution = _contribution(transaction)
+            if contribution:
+                category_id, transaction_date, amount = contribution
+                deltas[(category_id, transaction_date)] += sign * amount
+
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    periods_collection = await db.get_collection("budget_periods")
+    # Catégories sans période à jour pour la date écrite
+    unresolved: Set[ObjectId] = set()
+    for (category_id, transaction_date), delta in deltas.items():
+        cursor = periods_collection.find(
+            {
+                "user_id": user_id,
+                "category_ids": category_id,
+                "period_start": {"$lte": transaction_date},
+                "period_end": {"$gt": transaction_date}
+            },
+            {"_id": 1}
+        )
+        periods = await cursor.to_list(length=None)
+        if not periods:
+            unresolved.add(category_id)
+        for period in periods:
+            updated = await periods_collection.find_one_and_update(
+                {"_id": period["_id"]},
+                {"$inc": {"spent": delta, "version": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated and not updated.get("stale"):
+                await update_alerts(db, updated, previous_spent=updated["spent"] - delta)
+            else:
+                unresolved.add(category_id)
+
+    # Première écriture d'une période ou période périmée : recalcul immédiat
+    # (la transaction écrite est déjà comptée par l'agrégation)
+    if unresolved:
+        await reconcile_current_periods(db, user_id, unresolved)
+
+
+async def reconcile_current_periods(db, user_id: ObjectId, category_ids: Optional[Iterable[ObjectId]] = None) -> None:
+    """
+    Recalcule les périodes en cours absentes ou périmées des budgets de l'utilisateur
+
+    Appelée à la fin des écritures : les alertes des seuils franchis sont
+    évaluées sans attendre la lecture suivante des budgets.
+
+    Args:
+        category_ids: limite aux budgets dont le sous-arbre contient l'une de
+            ces catégories (tous les budgets par défaut)
+    """
+    # Import local : le routeur des budgets importe ce module
+    from app.routers.budgets import get_period_dates
+
+    budgets_collection = await db.get_collection("budgets")
+    budgets = await budgets_collection.find({"user_id": user_id}).to_list(length=None)
+    if not budgets:
+        return
+    category_tree = await CategoryTree.load(db, user_id)
+    wanted = {str(category_id) for category_id in category_ids} if category_ids is not None else None
+
+    by_period_type: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for budget in budgets:
+        if not category_tree.get(budget["category_id"]):
+            continue
+        if wanted is not None and not wanted & {
+            str(category_id) for category_id in budget_category_ids(budget, category_tree)
+        }:
+            continue
+        by_period_type[budget.get("period_type", "monthly")].append(budget)
+    if not by_period_type:
+        return
+
+    users_collection = await db.get_collection("users")
+    user = await users_collection.find_one({"_id": user_id}, {"billing_cycle_day": 1}) or {}
+    for period_type, period_budgets in by_period_type.items():
+        start_date, end_date = get_period_dates(period_type, user.get("billing_cycle_day", 1))
+        await reconcile_periods(db, user_id, period_budgets, start_date, end_date, category_tree)
+
+
+async def mark_stale(db, user_id: ObjectId) -> None:
+    """Marque les périodes de l'utilisateur comme à recalculer"""
+    periods_collection = await db.get_collection("budget_periods")
+    await periods_collection.update_many(
+        {"user_id": user_id, "stale": False},
+        {"$set": {"stale": True}, "$inc": {"version": 1}}
+    )
@@ -0,0 +1,187 @@
+"""
+Import en masse de transactions par lots
+
+Les lignes reçues (en flux) sont accumulées par lots de
+BULK_IMPORT_BATCH_SIZE. Pour chaque lot :
+- les doublons sont détectés par une seule requête $in sur les external_id
+  du lot (index user_id + external_id), ainsi qu'au sein de l'import ;
+- les règles de catégorisation actives sont appliquées aux transactions
+  sans catégorie ;
+- les transactions sont insérées par un insert_many non ordonné : une ligne
+  en erreur n'empêche pas l'insertion des autres.
+
+Le rapport donne les totaux exacts et, pour les doublons et les erreurs, le
+numéro de ligne (à partir de 1), dans la limite de BULK_REPORT_LIMIT entrées.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.services.rule_engine import CompiledRule, find_matching_rule
+from app.services.transaction_search import with_search_tokens
+
+# Nombre maximal de doublons et d'erreurs détaillés dans le rapport
+BULK_REPORT_LIMIT = 1000
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def build_transaction_document(
+    row: Dict[str, Any],
+    user_id: ObjectId,
+    defaults: Dict[str, Optional[ObjectId]],
+    now: datetime
+) -> Dict[str, Any]:
+    """
+    Document MongoDB d'une ligne importée
+
+    Raises:
+        ValueError: si la ligne n'est pas un objet ou si sa date ou son montant sont invalides
+    """
+    if not isinstance(row, dict):
+        raise ValueError("La ligne doit être un objet JSON")
+    raw_date = row.get("date")
+    if not isinstance(raw_date, str) or not raw_date:
+        raise ValueError("Date manquante")
+    try:
+        transaction_date = datetime.fromisoformat(raw_date.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Date invalide: {raw_date}")
+    try:
+        amount = float(row.get("amount", 0))
+    except (TypeError, ValueError):
+        raise ValueError(f"Montant invalide: {row.get('amount')}")
+
+    description = row.get("description") or ""
+    transaction_type = row.get("type", "expense")
+    return with_search_tokens({
+        "user_id": user_id,
+        "date": transaction_date,
+        "description": description if isinstance(description, str) else str(description),
+        "amount": amount,
+        "type": transaction_type,
+        "is_expense": transaction_type == "expense",
+        "category_id": defaults.get("category_id"),
+        "bank_connection_id": defaults.get("bank_connection_id"),
+        "bank_account_id": defaults.get("bank_account_id"),
+        "external_id": row.get("external_id"),
+        "tags": row.get("tags", []),
+        "notes": row.get("notes", ""),
+        "created_at": now,
+        "updated_at": now
+    })
+
+
+class BulkImporter:
+    """Importe des lignes par lots (dédoublonnage, règles, insert_many)"""
+
+    def __init__(
+        self,
+        collection,
+        user_id: ObjectId,
+        rules: List[CompiledRule],
+        defaults: Optional[Dict[str, Optional[ObjectId]]] = None,
+        batch_size: int = 1000
+    ):
+        self.collection = collection
+        self.user_id = user_id
+        self.rules = rules
+        self.defaults = defaults or {}
+        self.batch_size = batch_size
+
+        self.rows = 0
+        self.imported = 0
+        self.skipped = 0
+        self.categorized = 0
+        self.failed = 0
+        self.duplicates: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+
+        self._pending: List[tuple] = []
+        self._seen_external_ids = set()
+
+    async def add(self, row: Any) -> None:
+        """Ajoute une ligne ; le lot est écrit dès qu'il est plein"""
+        self.rows += 1
+        try:
+            document = build_transaction_document(row, self.user_id, self.defaults, datetime.now(timezone.utc))
+        except ValueError as e:
+            self._error(self.rows, str(e))
+        else:
+            self._pending.append((self.rows, document))
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Écrit le lot en attente"""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        external_ids = [document["external_id"] for _, document in batch if document.get("external_id")]
+        existing = set()
+        if external_ids:
+            cursor = self.collection.find(
+                {"user_id": self.user_id, "external_id": {"$in": external_ids}},
+                {"_id": 0, "external_id": 1}
+            )
+            existing = {document["external_id"] async for document in cursor}
+
+        rows = []
+        documents = []
+        for row_number, document in batch:
+            external_id = document.get("external_id")
+            if external_id:
+                if external_id in existing or external_id in self._seen_external_ids:
+                    self._duplicate(row_number, external_id)
+                    continue
+                self._seen_external_ids.add(external_id)
+
+            if not document.get("category_id") and self.rules:
+                rule = find_matching_rule(self.rules, document["description"], document["date"])
+                if rule:
+                    document["category_id"] = ObjectId(rule.category_id)
+                    self.categorized += 1
+            rows.append(row_number)
+            documents.append(document)
+
+        if not documents:
+            return
+        try:
+            result = await self.collection.insert_many(documents, ordered=False)
+            self.imported += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            self.imported += e.details.get("nInserted", 0)
+            for error in write_errors:
+                row_number = rows[error["index"]]
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    self._duplicate(row_number, documents[error["index"]].get("external_id"))
+                else:
+                    self._error(row_number, error.get("errmsg", "Erreur d'insertion"))
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "rows": self.rows,
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "categorized": self.categorized,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "message": f"{self.imported} transaction(s) importée(s), {self.skipped} doublon(s) ignoré(s)"
+        }
+
+    def _duplicate(self, row_number: int, external_id) -> None:
+        self.skipped += 1
+        if len(self.duplicates) < BULK_REPORT_LIMIT:
+            self.duplicates.append({"row": row_number, "external_id": external_id})
+
+    def _error(self, row_number: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < BULK_REPORT_LIMIT:
+            self.errors.append({"row": row_number, "error": message})
@@ -0,0 +1,165 @@
+"""
+Chemins matérialisés des catégories
+
+En plus de parent_id, chaque catégorie conserve :
+- ancestors : identifiants (ObjectId) de ses ancêtres, de la racine au parent ;
+- path_label : son libellé complet « Parent › Catégorie ».
+
+Ils sont calculés à la création (category_path), recalculés pour la
+catégorie et tout son sous-arbre à chaque renommage ou déplacement
+(refresh_subtree_paths), et renseignés une fois sur les catégories
+antérieures (backfill_category_paths, migration du démarrage). parent_id reste la référence : les
+chemins s'en déduisent toujours, ce qui rend chaque recalcul idempotent.
+
+Le sous-arbre d'une catégorie (« toutes les dépenses sous Logement ») se lit
+ainsi par une seule requête sur l'index multiclé ancestors (subtree_query),
+sans parcours récursif de parent_id.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+PATH_SEPARATOR = " › "
+
+# Champs lus pour recalculer les chemins
+PATH_PROJECTION = {"name": 1, "parent_id": 1, "ancestors": 1, "path_label": 1}
+
+
+def category_label(category: Dict[str, Any]) -> str:
+    """Libellé complet d'une catégorie (son nom si le chemin n'est pas encore renseigné)"""
+    return category.get("path_label") or category["name"]
+
+
+def category_path(name: str, parent: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """ancestors et path_label d'une catégorie nommée name sous parent"""
+    if parent is None:
+        return {"ancestors": [], "path_label": name}
+    return {
+        "ancestors": [*parent.get("ancestors", []), parent["_id"]],
+        "path_label": f"{category_label(parent)}{PATH_SEPARATOR}{name}"
+    }
+
+
+def compute_paths(categories: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Chemins de catégories déduits de leur parent_id
+
+    Un parent absent de categories (ou un cycle) fait de la catégorie une
+    racine du calcul.
+
+    Returns:
+        {category_id (str): {"ancestors": [...], "path_label": ...}}
+    """
+    by_id = {str(category["_id"]): category for category in categories}
+    paths: Dict[str, Dict[str, Any]] = {}
+
+    def resolve(category: Dict[str, Any], visiting: frozenset) -> Dict[str, Any]:
+        key = str(category["_id"])
+        if key not in paths:
+            parent = by_id.get(str(category["parent_id"])) if category.get("parent_id") else None
+            if parent is None or str(parent["_id"]) in visiting | {key}:
+                paths[key] = category_path(category["name"])
+            else:
+                parent_path = resolve(parent, visiting | {key})
+                paths[key] = category_path(category["name"], {"_id": parent["_id"], **parent_path})
+        return paths[key]
+
+    for category in by_id.values():
+        resolve(category, frozenset())
+    return paths
+
+
+def subtree_query(category_id) -> Dict[str, Any]:
+    """Filtre d'une catégorie et de toutes ses descendantes"""
+    category_id = ObjectId(str(category_id))
+    return {"$or": [{"_id": category_id}, {"ancestors": category_id}]}
+
+
+async def subtree_category_ids(db, user_id: ObjectId, category_id) -> List[ObjectId]:
+    """Identifiants d'une catégorie et de ses descendantes, en une requête indexée"""
+    collection = await db.get_collection("categories")
+    categories = await collection.find(
+        {"user_id": user_id, **subtree_query(category_id)}, {"_id": 1}
+    ).to_list(length=None)
+    return [category["_id"] for category in categories]
+
+
+def _path_operations(categories: Iterable[Dict[str, Any]], paths: Dict[str, Dict[str, Any]]) -> List[UpdateOne]:
+    """
+    Mises à jour des catégories dont le chemin enregistré diffère
+
+    updated_at est avancé avec le chemin : les descendantes d'une catégorie
+    renommée ou déplacée sont renvoyées par la synchronisation différentielle.
+    """
+    now = datetime.utcnow()
+    operations = []
+    for category in categories:
+        path = paths[str(category["_id"])]
+        if category.get("ancestors") != path["ancestors"] or category.get("path_label") != path["path_label"]:
+            operations.append(UpdateOne({"_id": category["_id"]}, {"$set": {**path, "updated_at": now}}))
+    return operations
+
+
+async def refresh_subtree_paths(db, user_id: ObjectId, category_id) -> int:
+    """
+    Recalcule les chemins d'une catégorie renommée ou déplacée et de ses descendantes
+
+    Le sous-arbre est lu par l'index ancestors (avant mise à jour) et réécrit
+    par un seul bulk_write ordonné.
+
+    Returns:
+        Nombre de catégories modifiées
+    """
+    collection = await db.get_collection("categories")
+    root = await collection.find_one({"_id": ObjectId(str(category_id)), "user_id": user_id}, PATH_PROJECTION)
+    if root is None:
+        return 0
+    parent = None
+    if root.get("parent_id") and ObjectId.is_valid(str(root["parent_id"])):
+        parent = await collection.find_one({"_id": ObjectId(str(root["parent_id"]))}, PATH_PROJECTION)
+    descendants = await collection.find(
+        {"user_id": user_id, "ancestors": root["_id"]}, PATH_PROJECTION
+    ).to_list(length=None)
+
+    # Chemins relatifs à la catégorie, puis préfixés par celui de son parent
+    relative = compute_paths([{**root, "parent_id": None}, *descendants])
+    prefix = category_path(root["name"], parent)
+    paths = {
+        key: {
+            "ancestors": [*prefix["ancestors"], *path["ancestors"]],
+            "path_label": prefix["path_label"] + path["path_label"][len(root["name"]):]
+        }
+        for key, path in relative.items()
+    }
+
+    operations = _path_operations([root, *descendants], paths)
+    if operations:
+        await collection.bulk_write(operations, ordered=True)
+    return len(operations)
+
+
+async def rebuild_user_paths(db, user_id: Optional[ObjectId]) -> int:
+    """Recalcule les chemins de toutes les catégories d'un utilisateur (import, migration)"""
+    collection = await db.get_collection("categories")
+    categories = await collection.find({"user_id": user_id}, PATH_PROJECTION).to_list(length=None)
+    operations = _path_operations(categories, compute_paths(categories))
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+async def backfill_category_paths(mongodb) -> None:
+    """Renseigne ancestors et path_label pour les utilisateurs dont des catégories n'en ont pas"""
+    collection = await mongodb.get_collection("categories")
+    user_ids = await collection.distinct("user_id", {"ancestors": {"$exists": False}})
+    updated = 0
+    for user_id in user_ids:
+        updated += await rebuild_user_paths(mongodb, user_id)
+    if updated:
+        logger.info(f"ancestors/path_label renseignés sur {updated} catégorie(s)")
@@ -0,0 +1,72 @@
+"""
+Arbre des catégories d'un utilisateur, chargé en une requête
+
+Permet de partager les catégories entre plusieurs calculs d'une même requête
+(budgets, règles, tableau de bord) au lieu de les relire chacun. parent_id
+peut être stocké en string ou en ObjectId : les identifiants sont comparés
+sous forme de chaîne.
+
+Libellés et sous-arbres viennent des chemins matérialisés (ancestors,
+path_label, voir category_paths), déduits de parent_id pour les catégories
+qui ne les ont pas encore.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.services.category_paths import compute_paths
+
+
+class CategoryTree:
+    """Catégories d'un utilisateur indexées par identifiant et par parent"""
+
+    def __init__(self, categories: List[Dict[str, Any]]):
+        self.categories = categories
+        self.by_id: Dict[str, Dict[str, Any]] = {str(category["_id"]): category for category in categories}
+        self._children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for category in categories:
+            if category.get("parent_id"):
+                self._children[str(category["parent_id"])].append(category)
+        
+        computed = compute_paths(categories) if any("ancestors" not in category for category in categories) else {}
+        self._paths: Dict[str, Dict[str, Any]] = {
+            str(category["_id"]): computed.get(str(category["_id"])) or {
+                "ancestors": category["ancestors"], "path_label": category.get("path_label") or category["name"]
+            }
+            for category in categories
+        }
+        self._descendants: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for category in categories:
+            for ancestor_id in self._paths[str(category["_id"])]["ancestors"]:
+                self._descendants[str(ancestor_id)].append(category)
+
+    @classmethod
+    async def load(cls, db, user_id) -> "CategoryTree":
+        """Charge les catégories de l'utilisateur (triées par nom)"""
+        collection = await db.get_collection("categories")
+        categories = await collection.find({"user_id": user_id}).sort("name", 1).to_list(length=None)
+        return cls(categories)
+
+    def get(self, category_id) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(str(category_id)) if category_id else None
+
+    def children(self, category_id) -> List[Dict[str, Any]]:
+        """Sous-catégories directes d'une catégorie"""
+        return self._children.get(str(category_id), [])
+
+    def ancestors(self, category_id) -> List[Any]:
+        """Identifiants des ancêtres d'une catégorie, de la racine au parent"""
+        path = self._paths.get(str(category_id))
+        return path["ancestors"] if path else []
+
+    def subtree_ids(self, category_id) -> List[Any]:
+        """Identifiants d'une catégorie et de toutes ses descendantes"""
+        category = self.get(category_id)
+        if category is None:
+            return []
+        return [category["_id"], *(descendant["_id"] for descendant in self._descendants.get(str(category_id), []))]
+
+    def label(self, category_id) -> Optional[str]:
+        """Libellé « Parent › Catégorie » (ou le nom seul pour une catégorie principale)"""
+        path = self._paths.get(str(category_id)) if category_id else None
+        return path["path_label"] if path else None
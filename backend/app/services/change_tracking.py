@@ -0,0 +1,107 @@
+"""
+Suivi des modifications des transactions
+
+Point d'appel unique après toute écriture sur les transactions d'un
+utilisateur (création, modification, suppression, import, synchronisation
+bancaire, application de règles). Incrémente la version des données de
+l'utilisateur (users.data_version), ce qui invalide les instantanés du cache
+analytique dans tous les processus, supprime immédiatement celui du
+processus courant, met à jour les dépenses matérialisées des budgets
+(budget_periods) et publie un événement transactions.changed aux clients
+connectés.
+
+notify_rules_changed joue le même rôle pour les règles de catégorisation
+(users.rules_version et règles compilées du cache).
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.services.analytics_cache import analytics_cache
+from app.services.budget_periods import apply_transaction_changes, mark_stale, reconcile_current_periods
+from app.services.events import TRANSACTIONS_CHANGED, event_bus
+from app.services.rule_engine import rule_set_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def notify_transactions_changed(
+    db,
+    user_id,
+    reason: str = "updated",
+    count: Optional[int] = None,
+    changes: Optional[List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]] = None
+) -> Optional[int]:
+    """
+    Signale que les transactions d'un utilisateur ont été modifiées
+
+    À appeler après l'écriture. Une erreur est journalisée sans être propagée :
+    l'écriture elle-même a déjà réussi.
+
+    Args:
+        db: Instance MongoDB
+        user_id: Identifiant de l'utilisateur
+        reason: Nature de l'écriture (created, updated, deleted, imported, synced, categorized, purged)
+        count: Nombre de transactions concernées, si connu
+        changes: Couples (avant, après) des transactions écrites, si connus :
+            les dépenses des budgets sont alors ajustées par $inc, sinon
+            leurs périodes sont marquées à recalculer et celles en cours
+            recalculées aussitôt (alertes comprises)
+
+    Returns:
+        data_version après l'incrément (None en cas d'erreur), à transmettre
+        à suggestion_cache.record_write
+    """
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+
+    analytics_cache.invalidate(user_id)
+    data_version = None
+    try:
+        users_collection = await db.get_collection("users")
+        user = await users_collection.find_one_and_update(
+            {"_id": user_id},
+            {"$inc": {"data_version": 1}},
+            projection={"data_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if user is not None:
+            data_version = user.get("data_version")
+    except Exception as e:
+        logger.error(f"Impossible d'incrémenter la version des données de {user_id}: {e}")
+
+    try:
+        if changes is not None:
+            await apply_transaction_changes(db, user_id, changes)
+        else:
+            await mark_stale(db, user_id)
+            await reconcile_current_periods(db, user_id)
+    except Exception as e:
+        logger.error(f"Impossible de mettre à jour les dépenses des budgets de {user_id}: {e}")
+
+    event = {"type": TRANSACTIONS_CHANGED, "reason": reason}
+    if count is not None:
+        event["count"] = count
+    event_bus.publish(user_id, event)
+    return data_version
+
+
+async def notify_rules_changed(db, user_id) -> None:
+    """
+    Signale que les règles d'un utilisateur ont été modifiées
+
+    À appeler après l'écriture : les règles compilées sont recompilées à la
+    prochaine catégorisation, dans ce processus comme dans les autres.
+    """
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+
+    rule_set_cache.invalidate(user_id)
+    try:
+        users_collection = await db.get_collection("users")
+        await users_collection.update_one({"_id": user_id}, {"$inc": {"rules_version": 1}})
+    except Exception as e:
+        logger.error(f"Impossible d'incrémenter la version des règles de {user_id}: {e}")
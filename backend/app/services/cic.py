@@ -25,6 +25,10 @@ class CICConnector:
     - Budget Insight API
     - Bridge API
     - Linxo Connect
+    
+    Les méthodes appellent l'API synchrone de Selenium : ne pas les attendre
+    depuis la boucle d'événements de l'API, passer par
+    app.services.bank_executor.bank_connector_executor.
     """
     
     BASE_URL = "https://www.cic.fr"
@@ -299,7 +303,7 @@ class CICMockConnector:
         
         # Transactions différentes selon le compte
         if account_id == '12345678901':  # Compte Chèque
-            return [
+            transactions = [
                 {
                     'date': (now - timedelta(days=1)).isoformat(),
                     'description': 'VIR SALAIRE',
@@ -337,7 +341,7 @@ class CICMockConnector:
                 }
             ]
         elif account_id == '12345678902':  # Livret A
-            return [
+            transactions = [
                 {
                     'date': (now - timedelta(days=3)).isoformat(),
                     'description': 'VIR EPARGNE MENSUELLE',
@@ -361,7 +365,7 @@ class CICMockConnector:
                 }
             ]
         else:  # PEA (12345678903)
-            return [
+            transactions = [
                 {
                     'date': (now - timedelta(days=5)).isoformat(),
                     'description': 'ACHAT ACTIONS TOTAL',
@@ -385,6 +389,13 @@ class CICMockConnector:
                 }
             ]
         
+        # Respecter la date de début demandée (synchronisation incrémentale)
+        if start_date:
+            transactions = [
+                t for t in transactions
+                if datetime.fromisoformat(t['date']) >= start_date
+            ]
+        return transactions
         
     def close(self):
         """Mock de fermeture"""
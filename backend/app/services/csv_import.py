@@ -438,8 +438,8 @@ class CSVImportService:
                 'amount': trans['amount'],
                 'type': trans['type'],
                 'category': category_id,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'created_at': datetime.utcnow().isoformat(),
+                'updated_at': datetime.utcnow().isoformat()
             }
             
             # Ajoute les références bancaires si fournies
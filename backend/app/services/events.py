@@ -0,0 +1,162 @@
+"""
+Diffusion d'événements de changement aux clients connectés (SSE)
+
+EventBus est un pub/sub par processus : chaque connexion SSE abonne une file
+bornée (EVENTS_QUEUE_SIZE) à l'identifiant de son utilisateur et les chemins
+d'écriture publient des événements compacts ({"type": ..., ...}). La
+publication ne bloque jamais : si la file d'un client lent est pleine, ses
+événements en attente sont remplacés par un unique événement « resync » qui
+l'invite à recharger ses données.
+
+Avec plusieurs workers, EventRelay (EVENTS_CHANGE_STREAM_ENABLED, nécessite
+un replica set MongoDB) recopie chaque événement publié dans la collection
+events et diffuse localement, via un change stream, ceux publiés par les
+autres workers. Les documents de la collection expirent après une heure.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Types d'événements
+TRANSACTIONS_CHANGED = "transactions.changed"
+IMPORT_PROGRESS = "import.progress"
+IMPORT_COMPLETED = "import.completed"
+BANK_SYNC_COMPLETED = "bank_sync.completed"
+BUDGET_THRESHOLD = "budget.threshold"
+RESYNC = "resync"
+
+EVENTS_COLLECTION = "events"
+EVENTS_RETENTION_SECONDS = 3600
+
+
+class Subscription:
+    """Abonnement d'une connexion aux événements d'un utilisateur"""
+
+    def __init__(self, user_key: str, queue_size: int):
+        self.user_key = user_key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Client trop lent : les événements en attente sont remplacés par une resynchronisation
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": RESYNC})
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class EventBus:
+    """Pub/sub par processus, indexé par utilisateur"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        # Identifiant du worker (évite de rediffuser ses propres événements relayés)
+        self.origin = uuid.uuid4().hex
+        self.relay: Optional["EventRelay"] = None
+        self._subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, user_id) -> Subscription:
+        subscription = Subscription(str(user_id), self.queue_size)
+        self._subscriptions[subscription.user_key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_key]
+
+    def subscriber_count(self, user_id=None) -> int:
+        if user_id is not None:
+            return len(self._subscriptions.get(str(user_id), ()))
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, user_id, event: Dict[str, Any]) -> None:
+        """Publie un événement pour un utilisateur (non bloquant)"""
+        self.dispatch(str(user_id), event)
+        if self.relay is not None:
+            self.relay.forward(str(user_id), event)
+
+    def dispatch(self, user_key: str, event: Dict[str, Any]) -> None:
+        """Distribue un événement aux abonnés locaux"""
+        for subscription in tuple(self._subscriptions.get(user_key, ())):
+            subscription.push(event)
+
+
+class EventRelay:
+    """Diffusion entre workers via la collection events et un change stream"""
+
+    def __init__(self, bus: EventBus):
+        self.bus = bus
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    async def start(self, mongodb) -> None:
+        """Démarre l'écoute du change stream et le relais des événements publiés"""
+        if self._task is not None:
+            return
+        self._collection = await mongodb.get_collection(EVENTS_COLLECTION)
+        await self._collection.create_index("created_at", expireAfterSeconds=EVENTS_RETENTION_SECONDS)
+        self.bus.relay = self
+        self._task = asyncio.create_task(self._watch())
+        logger.info("Relais des événements entre workers démarré (change stream)")
+
+    async def stop(self) -> None:
+        self.bus.relay = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def forward(self, user_key: str, event: Dict[str, Any]) -> None:
+        """Recopie un événement publié localement pour les autres workers"""
+        task = asyncio.ensure_future(self._insert(user_key, event))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _insert(self, user_key: str, event: Dict[str, Any]) -> None:
+        try:
+            await self._collection.insert_one({
+                "user_key": user_key,
+                "origin": self.bus.origin,
+                "event": event,
+                "created_at": datetime.now(timezone.utc)
+            })
+        except Exception as e:
+            logger.error(f"Impossible de relayer l'événement {event.get('type')}: {e}")
+
+    async def _watch(self) -> None:
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": self.bus.origin}}}]
+        while True:
+            try:
+                async with self._collection.watch(pipeline) as stream:
+                    async for change in stream:
+                        document = change["fullDocument"]
+                        self.bus.dispatch(document["user_key"], document["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change stream des événements interrompu: {e}")
+                await asyncio.sleep(5)
+
+
+# Instances globales
+event_bus = EventBus(settings.EVENTS_QUEUE_SIZE)
+event_relay = EventRelay(event_bus)
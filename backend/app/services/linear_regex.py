@@ -0,0 +1,236 @@
+"""
+Recherche regex en temps linéaire
+
+Le moteur re de Python procède par retour arrière : un motif comme
+A.*B.*C peut coûter un nombre de pas polynomial (voire exponentiel) en la
+longueur du texte. LinearRegex exécute le même motif par simulation d'automate
+non déterministe (Thompson) : chaque caractère du texte fait avancer au plus
+une fois chaque état du programme, soit un coût borné par
+len(texte) × taille du programme, quel que soit le motif.
+
+Seule la présence d'une correspondance est calculée (pas de groupes), ce qui
+suffit aux règles de catégorisation. Sont pris en charge : littéraux, classes
+de caractères, ., ancres (^, $, \\A, \\Z, \\b, \\B), alternatives, groupes et
+répétitions gourmandes ou paresseuses, insensibles à la casse. Les références
+arrière, assertions, groupes atomiques, quantificateurs possessifs et
+drapeaux locaux lèvent LinearRegexError.
+"""
+
+import re
+from typing import Callable, List, Optional, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse  # Python >= 3.11
+except ImportError:  # pragma: no cover
+    import sre_constants
+    import sre_parse
+
+# Nombre maximal d'instructions du programme (répétitions {n,m} dépliées)
+MAX_PROGRAM_SIZE = 4000
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+
+
+class LinearRegexError(ValueError):
+    """Motif hors du sous-ensemble pris en charge ou programme trop grand"""
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: str.isdecimal,
+    sre_constants.CATEGORY_NOT_DIGIT: lambda char: not char.isdecimal(),
+    sre_constants.CATEGORY_SPACE: str.isspace,
+    sre_constants.CATEGORY_NOT_SPACE: lambda char: not char.isspace(),
+    sre_constants.CATEGORY_WORD: _is_word,
+    sre_constants.CATEGORY_NOT_WORD: lambda char: not _is_word(char),
+}
+
+
+def _variants(char: str) -> Tuple[str, ...]:
+    """Formes d'un caractère comparées sans tenir compte de la casse"""
+    return tuple({char, char.lower(), char.upper()})
+
+
+def _class_predicate(items) -> Callable[[str], bool]:
+    """Prédicat d'une classe de caractères [...]"""
+    negate = False
+    literals = set()
+    ranges = []
+    categories = []
+    for op, value in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            literals.update(_variants(chr(value)))
+        elif op == sre_constants.RANGE:
+            ranges.append(value)
+        elif op == sre_constants.CATEGORY and value in _CATEGORIES:
+            categories.append(_CATEGORIES[value])
+        else:
+            raise LinearRegexError(f"Classe de caractères non supportée: {op}")
+
+    def predicate(char: str) -> bool:
+        found = (
+            char in literals
+            or any(low <= ord(variant) <= high for variant in _variants(char) for low, high in ranges)
+            or any(category(char) for category in categories)
+        )
+        return found != negate
+
+    return predicate
+
+
+class _Compiler:
+    """Traduit l'arbre de sre_parse en programme d'automate"""
+
+    def __init__(self, flags: int):
+        self.dotall = bool(flags & re.DOTALL)
+        self.multiline = bool(flags & re.MULTILINE)
+        self.program: List[list] = []
+
+    def emit(self, *instruction) -> int:
+        if len(self.program) >= MAX_PROGRAM_SIZE:
+            raise LinearRegexError("Expression régulière trop complexe")
+        self.program.append(list(instruction))
+        return len(self.program) - 1
+
+    def sequence(self, items) -> None:
+        for op, value in items:
+            self.item(op, value)
+
+    def item(self, op, value) -> None:
+        if op == sre_constants.LITERAL:
+            self.emit("char", _variants(chr(value)).__contains__)
+        elif op == sre_constants.NOT_LITERAL:
+            excluded = _variants(chr(value))
+            self.emit("char", lambda char: char not in excluded)
+        elif op == sre_constants.ANY:
+            self.emit("char", (lambda char: True) if self.dotall else (lambda char: char != "\n"))
+        elif op == sre_constants.IN:
+            self.emit("char", _class_predicate(value))
+        elif op == sre_constants.AT:
+            self.emit("at", value)
+        elif op == sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, items = value
+            if add_flags or del_flags:
+                raise LinearRegexError("Drapeaux locaux non supportés")
+            self.sequence(items)
+        elif op == sre_constants.BRANCH:
+            self.branch(value[1])
+        elif op in _REPEATS:
+            self.repeat(*value)
+        else:
+            raise LinearRegexError(f"Construction non supportée: {op}")
+
+    def branch(self, branches) -> None:
+        jumps = []
+        for index, branch in enumerate(branches):
+            if index < len(branches) - 1:
+                split = self.emit("split", None, None)
+                self.program[split][1] = len(self.program)
+                self.sequence(branch)
+                jumps.append(self.emit("jmp", None))
+                self.program[split][2] = len(self.program)
+            else:
+                self.sequence(branch)
+        for jump in jumps:
+            self.program[jump][1] = len(self.program)
+
+    def repeat(self, low: int, high: int, items) -> None:
+        for _ in range(low):
+            self.sequence(items)
+        if high == sre_constants.MAXREPEAT:
+            loop = self.emit("split", None, None)
+            self.program[loop][1] = len(self.program)
+            self.sequence(items)
+            self.emit("jmp", loop)
+            self.program[loop][2] = len(self.program)
+            return
+        splits = []
+        for _ in range(high - low):
+            split = self.emit("split", None, None)
+            self.program[split][1] = len(self.program)
+            splits.append(split)
+            self.sequence(items)
+        for split in splits:
+            self.program[split][2] = len(self.program)
+
+    def at(self, code, text: str, position: int) -> bool:
+        """Ancre code vérifiée à position"""
+        length = len(text)
+        if code == sre_constants.AT_BEGINNING:
+            return position == 0 or (self.multiline and text[position - 1] == "\n")
+        if code == sre_constants.AT_BEGINNING_STRING:
+            return position == 0
+        if code == sre_constants.AT_END:
+            if self.multiline:
+                return position == length or text[position] == "\n"
+            return position == length or (position == length - 1 and text[position] == "\n")
+        if code == sre_constants.AT_END_STRING:
+            return position == length
+        if code in (sre_constants.AT_BOUNDARY, sre_constants.AT_NON_BOUNDARY):
+            before = position > 0 and _is_word(text[position - 1])
+            after = position < length and _is_word(text[position])
+            if code == sre_constants.AT_NON_BOUNDARY:
+                return length > 0 and before == after
+            return before != after
+        raise LinearRegexError(f"Ancre non supportée: {code}")
+
+
+class LinearRegex:
+    """Motif insensible à la casse recherché en temps linéaire"""
+
+    def __init__(self, pattern: str):
+        try:
+            parsed = sre_parse.parse(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise LinearRegexError(f"Expression régulière invalide: {e}")
+        compiler = _Compiler(parsed.state.flags)
+        compiler.sequence(parsed)
+        compiler.emit("match")
+        self.pattern = pattern
+        self._compiler = compiler
+        self._program = compiler.program
+
+    def _closure(self, states: List[int], text: str, position: int) -> List[int]:
+        """États atteints sans consommer de caractère (instructions char et match)"""
+        program = self._program
+        seen = set()
+        result = []
+        stack = list(reversed(states))
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            instruction = program[pc]
+            kind = instruction[0]
+            if kind == "split":
+                stack.append(instruction[2])
+                stack.append(instruction[1])
+            elif kind == "jmp":
+                stack.append(instruction[1])
+            elif kind == "at":
+                if self._compiler.at(instruction[1], text, position):
+                    stack.append(pc + 1)
+            else:
+                result.append(pc)
+        return result
+
+    def search(self, text: str) -> Optional[bool]:
+        """True si le motif correspond quelque part dans text, None sinon (comme re.search)"""
+        program = self._program
+        states: List[int] = []
+        for position in range(len(text) + 1):
+            # Recherche non ancrée : une tentative démarre à chaque position
+            current = self._closure(states + [0], text, position)
+            if any(program[pc][0] == "match" for pc in current):
+                return True
+            if position == len(text):
+                break
+            char = text[position]
+            states = [pc + 1 for pc in current if program[pc][0] == "char" and program[pc][1](char)]
+        return None
@@ -0,0 +1,102 @@
+"""
+Connecteur bancaire simulé à volume paramétrable
+
+Produit N comptes × M transactions déterministes pour mesurer le chemin de
+synchronisation (exécuteur, upserts groupés, filigranes) sans navigateur.
+Utilisé par scripts/benchmark_sync.py.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+MERCHANTS = [
+    "CB CARREFOUR", "CB AUCHAN", "CB SNCF", "PRLV SEPA EDF", "CB FNAC",
+    "CB AMAZON", "PRLV ORANGE", "CB TOTAL", "CB UBER EATS", "VIR SALAIRE"
+]
+
+
+class ScalableMockConnector:
+    """Connecteur mock générant un nombre configurable de comptes et de transactions"""
+
+    def __init__(
+        self,
+        accounts: int = 3,
+        transactions_per_account: int = 100,
+        days: int = 90,
+        latency: float = 0.0,
+        seed: int = 42
+    ):
+        """
+        Args:
+            accounts: Nombre de comptes (N)
+            transactions_per_account: Nombre de transactions par compte (M)
+            days: Période couverte par les transactions, jusqu'à aujourd'hui
+            latency: Délai simulé par appel (secondes)
+            seed: Graine du générateur (mêmes données à chaque session)
+        """
+        self.accounts = accounts
+        self.transactions_per_account = transactions_per_account
+        self.days = days
+        self.latency = latency
+        self.seed = seed
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def login(self, username: str, password: str) -> bool:
+        """Mock de connexion"""
+        await self._wait()
+        return password != "invalid"
+
+    async def get_accounts(self) -> List[Dict[str, Any]]:
+        """Mock de récupération des comptes"""
+        await self._wait()
+        return [
+            {
+                'id': f'MOCK{index:06d}',
+                'name': f'Compte {index + 1}',
+                'number': f'MOCK{index:06d}',
+                'balance': 1000.0 * (index + 1),
+                'currency': 'EUR',
+                'type': 'checking' if index == 0 else 'savings'
+            }
+            for index in range(self.accounts)
+        ]
+
+    async def get_transactions(
+        self,
+        account_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Mock de récupération des transactions (réparties sur la période, plus récentes en premier)"""
+        await self._wait()
+
+        rng = random.Random(f"{self.seed}-{account_id}")
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        step = self.days * 86400 / max(1, self.transactions_per_account)
+
+        transactions = []
+        for index in range(self.transactions_per_account):
+            tx_date = today - timedelta(seconds=int(index * step))
+            if start_date and tx_date < start_date:
+                break
+            if end_date and tx_date > end_date:
+                continue
+            is_income = rng.random() < 0.1
+            amount = round(rng.uniform(5, 3000 if is_income else 200), 2)
+            transactions.append({
+                'date': tx_date.isoformat(),
+                'description': f"{rng.choice(MERCHANTS)} {index}",
+                'amount': amount if is_income else -amount,
+                'type': 'income' if is_income else 'expense',
+                'account_id': account_id
+            })
+        return transactions
+
+    def close(self):
+        """Mock de fermeture"""
+        pass
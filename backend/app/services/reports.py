@@ -2,9 +2,22 @@ import calendar
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 
+from bson import ObjectId
+
 from app.models.transaction import Transaction, Category, Tag
 
 
+# Une transaction est une dépense si is_expense vaut True ou, à défaut de
+# booléen, si son type vaut "expense" (transactions importées/synchronisées)
+IS_EXPENSE_EXPR = {
+    "$cond": [
+        {"$eq": [{"$type": "$is_expense"}, "bool"]},
+        "$is_expense",
+        {"$eq": ["$type", "expense"]}
+    ]
+}
+
+
 def get_month_boundaries(year: int, month: int) -> Tuple[date, date]:
     """
     Récupère les dates de début et de fin d'un mois donné.
@@ -39,59 +52,128 @@ def get_salary_month_boundaries(year: int, month: int, salary_day: int = 25) ->
     return start_date, end_date
 
 
-async def generate_monthly_report(db_session, user_id: str, year: int, month: int) -> Dict[str, Any]:
+def _to_object_id(user_id):
+    """Les user_id sont stockés en ObjectId dans les transactions"""
+    if isinstance(user_id, str) and ObjectId.is_valid(user_id):
+        return ObjectId(user_id)
+    return user_id
+
+
+def period_month_expr(salary_day: Optional[int] = None) -> Dict[str, Any]:
     """
-    Génère un rapport mensuel des transactions pour un utilisateur.
+    Expression d'agrégation donnant le mois (1er jour, minuit) auquel appartient $date.
+
+    Sans jour de salaire, il s'agit du mois calendaire ($dateTrunc). Avec un jour
+    de salaire, la période du mois M va du salary_day de M-1 à la veille du
+    salary_day de M (cf. get_salary_month_boundaries) : on recule la date de
+    salary_day - 1 jours, on tronque au mois, puis on avance d'un mois.
     """
-    start_date, end_date = get_month_boundaries(year, month)
+    if not salary_day or salary_day == 1:
+        return {"$dateTrunc": {"date": "$date", "unit": "month"}}
     
-    # Requête pour trouver les transactions du mois
-    transactions = await db_session.find({
-        "user_id": user_id,
-        "date": {
-            "$gte": datetime.combine(start_date, datetime.min.time()),
-            "$lte": datetime.combine(end_date, datetime.max.time())
+    return {
+        "$dateAdd": {
+            "startDate": {
+                "$dateTrunc": {
+                    "date": {"$dateSubtract": {"startDate": "$date", "unit": "day", "amount": salary_day - 1}},
+                    "unit": "month"
+                }
+            },
+            "unit": "month",
+            "amount": 1
         }
-    }).to_list(None)
+    }
+
+
+def _category_totals_pipeline(user_id, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """
+    Pipeline renvoyant un document par (catégorie, dépense/revenu) sur la période,
+    avec le nom de la catégorie joint par $lookup.
+    """
+    return [
+        {"$match": {
+            "user_id": _to_object_id(user_id),
+            "date": {"$gte": start, "$lte": end}
+        }},
+        {"$group": {
+            "_id": {"category_id": "$category_id", "is_expense": IS_EXPENSE_EXPR},
+            "amount": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }},
+        {"$lookup": {
+            "from": "categories",
+            # category_id peut être stocké en string ou en ObjectId
+            "let": {"category_id": {"$convert": {
+                "input": "$_id.category_id", "to": "objectId", "onError": None, "onNull": None
+            }}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$category_id"]}}},
+                {"$project": {"name": 1}}
+            ],
+            "as": "category"
+        }},
+        {"$project": {
+            "_id": 0,
+            "category_id": "$_id.category_id",
+            "is_expense": "$_id.is_expense",
+            "amount": 1,
+            "count": 1,
+            "category_name": {"$first": "$category.name"}
+        }}
+    ]
+
+
+async def _aggregate_period_report(db_session, user_id, start_date: date, end_date: date) -> Dict[str, Any]:
+    """
+    Calcule le résumé et la répartition par catégorie d'une période.
+
+    Seules les lignes agrégées (quelques dizaines au plus) sont transférées.
+    """
+    rows = await db_session.aggregate(_category_totals_pipeline(
+        user_id,
+        datetime.combine(start_date, datetime.min.time()),
+        datetime.combine(end_date, datetime.max.time())
+    )).to_list(None)
     
     # Statistiques de base
-    total_income = sum(tx["amount"] for tx in transactions if not tx["is_expense"])
-    total_expense = sum(tx["amount"] for tx in transactions if tx["is_expense"])
-    balance = total_income - total_expense
+    total_income = sum(row["amount"] for row in rows if not row["is_expense"])
+    total_expense = sum(row["amount"] for row in rows if row["is_expense"])
     
-    # Transactions par catégorie
+    # Montant net par catégorie (dépenses - revenus)
     categories = {}
-    for tx in transactions:
-        if tx["category_id"]:
-            cat_id = str(tx["category_id"])
-            if cat_id not in categories:
-                categories[cat_id] = 0
-            
-            if tx["is_expense"]:
-                categories[cat_id] += tx["amount"]
-            else:
-                categories[cat_id] -= tx["amount"]
-    
-    # Récupération des noms des catégories
-    category_ids = list(categories.keys())
-    cats = await db_session.find({
-        "_id": {"$in": category_ids}
-    }).to_list(None)
-    
-    cat_dict = {str(cat["_id"]): cat["name"] for cat in cats}
-    
-    # Formater les catégories pour le rapport
-    category_expenses = [
-        {
+    for row in rows:
+        if not row.get("category_id"):
+            continue
+        cat_id = str(row["category_id"])
+        entry = categories.setdefault(cat_id, {
             "category_id": cat_id,
-            "category_name": cat_dict.get(cat_id, "Inconnu"),
-            "amount": amount
-        }
-        for cat_id, amount in categories.items()
-    ]
+            "category_name": row.get("category_name") or "Inconnu",
+            "amount": 0
+        })
+        entry["amount"] += row["amount"] if row["is_expense"] else -row["amount"]
     
     # Tri par montant
-    category_expenses.sort(key=lambda x: x["amount"], reverse=True)
+    category_expenses = sorted(categories.values(), key=lambda x: x["amount"], reverse=True)
+    
+    return {
+        "summary": {
+            "total_income": total_income,
+            "total_expense": total_expense,
+            "balance": total_income - total_expense
+        },
+        "categories": category_expenses
+    }
+
+
+async def generate_monthly_report(db_session, user_id: str, year: int, month: int) -> Dict[str, Any]:
+    """
+    Génère un rapport mensuel des transactions pour un utilisateur.
+    
+    db_session est la collection des transactions ; les totaux sont calculés
+    par MongoDB ($group) et les noms de catégories joints par $lookup.
+    """
+    start_date, end_date = get_month_boundaries(year, month)
+    report = await _aggregate_period_report(db_session, user_id, start_date, end_date)
     
     return {
         "period": {
@@ -100,13 +182,7 @@ async def generate_monthly_report(db_session, user_id: str, year: int, month: in
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat()
         },
-        "summary": {
-            "total_income": total_income,
-            "total_expense": total_expense,
-            "balance": balance
-        },
-        "categories": category_expenses,
-        "transactions": transactions
+        **report
     }
 
 
@@ -115,55 +191,7 @@ async def generate_salary_based_monthly_report(db_session, user_id: str, year: i
     Génère un rapport mensuel basé sur la période de salaire (du jour de paie à la veille du jour de paie du mois suivant).
     """
     start_date, end_date = get_salary_month_boundaries(year, month, salary_day)
-    
-    # Le reste de la fonction est similaire à generate_monthly_report, mais avec des dates différentes
-    # Requête pour trouver les transactions de la période
-    transactions = await db_session.find({
-        "user_id": user_id,
-        "date": {
-            "$gte": datetime.combine(start_date, datetime.min.time()),
-            "$lte": datetime.combine(end_date, datetime.max.time())
-        }
-    }).to_list(None)
-    
-    # Statistiques de base
-    total_income = sum(tx["amount"] for tx in transactions if not tx["is_expense"])
-    total_expense = sum(tx["amount"] for tx in transactions if tx["is_expense"])
-    balance = total_income - total_expense
-    
-    # Transactions par catégorie
-    categories = {}
-    for tx in transactions:
-        if tx["category_id"]:
-            cat_id = str(tx["category_id"])
-            if cat_id not in categories:
-                categories[cat_id] = 0
-            
-            if tx["is_expense"]:
-                categories[cat_id] += tx["amount"]
-            else:
-                categories[cat_id] -= tx["amount"]
-    
-    # Récupération des noms des catégories
-    category_ids = list(categories.keys())
-    cats = await db_session.find({
-        "_id": {"$in": category_ids}
-    }).to_list(None)
-    
-    cat_dict = {str(cat["_id"]): cat["name"] for cat in cats}
-    
-    # Formater les catégories pour le rapport
-    category_expenses = [
-        {
-            "category_id": cat_id,
-            "category_name": cat_dict.get(cat_id, "Inconnu"),
-            "amount": amount
-        }
-        for cat_id, amount in categories.items()
-    ]
-    
-    # Tri par montant
-    category_expenses.sort(key=lambda x: x["amount"], reverse=True)
+    report = await _aggregate_period_report(db_session, user_id, start_date, end_date)
     
     return {
         "period": {
@@ -173,59 +201,72 @@ async def generate_salary_based_monthly_report(db_session, user_id: str, year: i
             "end_date": end_date.isoformat(),
             "salary_day": salary_day
         },
-        "summary": {
-            "total_income": total_income,
-            "total_expense": total_expense,
-            "balance": balance
-        },
-        "categories": category_expenses,
-        "transactions": transactions
+        **report
     }
 
 
-async def get_trend_data(db_session, user_id: str, months: int = 6) -> Dict[str, Any]:
+def get_trend_start(months: int, salary_day: Optional[int] = None, today: Optional[date] = None) -> date:
+    """
+    Premier jour de la période la plus ancienne d'une tendance sur `months` mois
+    (mois courant inclus).
+    """
+    today = today or datetime.now().date()
+    year, month = today.year, today.month
+    # Avec un jour de salaire, la période courante est celle du mois suivant
+    # dès que le jour de paie est passé
+    if salary_day and salary_day > 1 and today.day >= salary_day:
+        month += 1
+    
+    # Reculer de months - 1 mois
+    index = year * 12 + (month - 1) - (months - 1)
+    year, month = divmod(index, 12)
+    month += 1
+    
+    if salary_day and salary_day > 1:
+        return get_salary_month_boundaries(year, month, salary_day)[0]
+    return date(year, month, 1)
+
+
+async def get_trend_data(db_session, user_id: str, months: int = 6, salary_day: Optional[int] = None) -> Dict[str, Any]:
     """
     Récupère les données de tendance des derniers mois.
+    
+    Les transactions sont regroupées par mois côté MongoDB ($dateTrunc, ou
+    période de salaire si salary_day est fourni) : une ligne par mois est renvoyée.
     """
-    # Date de début (il y a X mois)
     end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=30 * months)
-    
-    # Requête pour trouver les transactions des derniers mois
-    transactions = await db_session.find({
-        "user_id": user_id,
-        "date": {
-            "$gte": datetime.combine(start_date, datetime.min.time()),
-            "$lte": datetime.combine(end_date, datetime.max.time())
-        }
-    }).to_list(None)
-    
-    # Grouper les transactions par mois
-    monthly_data = {}
-    for tx in transactions:
-        tx_date = tx["date"]
-        key = f"{tx_date.year}-{tx_date.month:02d}"
-        
-        if key not in monthly_data:
-            monthly_data[key] = {
-                "income": 0,
-                "expense": 0
+    start_date = get_trend_start(months, salary_day, end_date)
+    
+    pipeline = [
+        {"$match": {
+            "user_id": _to_object_id(user_id),
+            "date": {
+                "$gte": datetime.combine(start_date, datetime.min.time()),
+                "$lte": datetime.combine(end_date, datetime.max.time())
             }
-        
-        if tx["is_expense"]:
-            monthly_data[key]["expense"] += tx["amount"]
-        else:
-            monthly_data[key]["income"] += tx["amount"]
+        }},
+        {"$group": {
+            "_id": period_month_expr(salary_day),
+            "income": {"$sum": {"$cond": [IS_EXPENSE_EXPR, 0, "$amount"]}},
+            "expense": {"$sum": {"$cond": [IS_EXPENSE_EXPR, "$amount", 0]}},
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    rows = await db_session.aggregate(pipeline).to_list(None)
     
     # Formater les données pour le graphique
     trend = [
         {
-            "period": key,
-            "income": data["income"],
-            "expense": data["expense"],
-            "balance": data["income"] - data["expense"]
+            "period": f"{row['_id'].year}-{row['_id'].month:02d}",
+            "year": row["_id"].year,
+            "month": row["_id"].month,
+            "income": row["income"],
+            "expense": row["expense"],
+            "balance": row["income"] - row["expense"],
+            "count": row["count"]
         }
-        for key, data in sorted(monthly_data.items())
+        for row in rows
     ]
     
     return {
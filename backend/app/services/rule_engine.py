@@ -0,0 +1,401 @@
+"""
+Évaluation des règles de catégorisation
+
+Une règle s'applique à une transaction si sa date est dans la période de la
+règle (start_date / end_date, bornes incluses), si la description (en
+majuscules) ne contient aucune des exceptions et si elle correspond au motif
+selon match_type (contains, starts_with, ends_with, exact, regex). Les règles
+sont évaluées dans l'ordre : la première qui correspond l'emporte.
+
+Les motifs regex sont recherchés sans tenir compte de la casse dans les
+REGEX_MAX_INPUT_LENGTH premiers caractères de la description. Le moteur re
+de Python procède par retour arrière : compile_regex refuse les constructions
+au coût exponentiel ou non borné (références arrière, assertions,
+quantificateurs imbriqués ou portant sur une alternative, répétition d'un
+corps optionnel). Les autres motifs dont l'estimation du nombre de pas
+dépasse REGEX_STEP_BUDGET (A.*B.*C) restent acceptés mais sont recherchés en
+temps linéaire par LinearRegex plutôt que par re.
+
+rule_matches évalue un document de règle tel quel ; les boucles sur de
+nombreuses transactions utilisent compile_rules, qui prépare une fois pour
+toutes les motifs, exceptions et dates de chaque règle. Les règles actives
+compilées de chaque utilisateur sont conservées par rule_set_cache et
+appliquées à l'écriture des transactions (création, imports, synchronisation
+bancaire).
+"""
+
+import logging
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services.linear_regex import LinearRegex, LinearRegexError
+from app.utils.memory_cache import MemoryBudgetLRU
+
+try:
+    from re import _parser as sre_parse  # Python >= 3.11
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# Surcoût mémoire approximatif d'une règle compilée
+ENTRY_OVERHEAD_BYTES = 400
+
+# Limites des motifs regex
+REGEX_MAX_PATTERN_LENGTH = 200
+REGEX_MAX_INPUT_LENGTH = 256
+REGEX_STEP_BUDGET = 1_000_000
+
+_REPEATS = {
+    sre_parse.MAX_REPEAT,
+    sre_parse.MIN_REPEAT,
+    getattr(sre_parse, "POSSESSIVE_REPEAT", sre_parse.MAX_REPEAT),
+}
+_UNSUPPORTED = {
+    sre_parse.GROUPREF,
+    sre_parse.GROUPREF_EXISTS,
+    sre_parse.ASSERT,
+    sre_parse.ASSERT_NOT,
+}
+
+
+class RegexRuleError(ValueError):
+    """Motif regex invalide ou trop coûteux"""
+
+
+def _regex_steps(items, in_repeat: bool = False) -> int:
+    """
+    Nombre maximal de façons de placer la séquence à une position donnée
+
+    Une répétition multiplie ce nombre par ses longueurs possibles, une
+    alternative l'additionne sur ses branches et un élément optionnel le
+    double. Une répétition dont le corps peut être vide ou de longueur
+    variable ((.?){22}, (a?){25}) peut découper le texte de façon
+    exponentielle : le nombre de pas du corps est alors élevé à la puissance
+    du nombre de répétitions, et le motif refusé au-delà de REGEX_STEP_BUDGET.
+    """
+    steps = 1
+    for op, value in items:
+        if op in _UNSUPPORTED:
+            raise RegexRuleError("Références arrière, assertions et conditions non supportées")
+        if op in _REPEATS:
+            low, high, sub = value
+            if high > 1:
+                if in_repeat:
+                    raise RegexRuleError("Quantificateurs imbriqués non supportés")
+                body_steps = _regex_steps(sub, True)
+                min_width, max_width = sub.getwidth()
+                if min_width == 0 or min_width != max_width:
+                    count = min(high, REGEX_MAX_INPUT_LENGTH)
+                    if body_steps > 1 and body_steps ** count > REGEX_STEP_BUDGET:
+                        raise RegexRuleError("Répétition d'un élément optionnel ou de longueur variable non supportée")
+                    steps *= body_steps ** count
+                else:
+                    width = min(high, REGEX_MAX_INPUT_LENGTH) - min(low, REGEX_MAX_INPUT_LENGTH) + 1
+                    steps *= width * body_steps
+            else:
+                # Élément optionnel (?) : présent ou absent
+                steps *= _regex_steps(sub, in_repeat) * (2 if low == 0 else 1)
+        elif op == sre_parse.BRANCH:
+            if in_repeat:
+                raise RegexRuleError("Quantificateur sur une alternative non supporté")
+            steps *= sum(_regex_steps(branch) for branch in value[1])
+        elif op == sre_parse.SUBPATTERN:
+            steps *= _regex_steps(value[-1], in_repeat)
+        elif op == getattr(sre_parse, "ATOMIC_GROUP", None):
+            steps *= _regex_steps(value, in_repeat)
+        steps = min(steps, REGEX_STEP_BUDGET + 1)
+    return steps
+
+
+def compile_regex(pattern: str):
+    """
+    Valide et compile le motif d'une règle regex (insensible à la casse)
+
+    Returns:
+        re.Pattern, ou LinearRegex si l'estimation du nombre de pas dépasse
+        REGEX_STEP_BUDGET ; les deux exposent search(texte)
+
+    Raises:
+        RegexRuleError: si le motif est invalide ou contient une construction
+        au coût non borné
+    """
+    if len(pattern) > REGEX_MAX_PATTERN_LENGTH:
+        raise RegexRuleError(f"Expression régulière trop longue (maximum {REGEX_MAX_PATTERN_LENGTH} caractères)")
+    try:
+        parsed = sre_parse.parse(pattern, re.IGNORECASE)
+        compiled = re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise RegexRuleError(f"Expression régulière invalide: {e}")
+    if REGEX_MAX_INPUT_LENGTH * _regex_steps(list(parsed)) > REGEX_STEP_BUDGET:
+        try:
+            return LinearRegex(pattern)
+        except LinearRegexError as e:
+            raise RegexRuleError(str(e))
+    return compiled
+
+
+@lru_cache(maxsize=1024)
+def _cached_regex(pattern: str):
+    """
+    compile_regex mémorisé pour les règles enregistrées
+
+    Une règle antérieure aux limites de compile_regex ((a+)+, motif trop long)
+    reste appliquée, en temps linéaire par LinearRegex. Seuls les motifs que
+    LinearRegex ne sait pas exécuter (références arrière, assertions) sont
+    ignorés, avec un avertissement.
+    """
+    try:
+        return compile_regex(pattern)
+    except RegexRuleError as e:
+        try:
+            return LinearRegex(pattern)
+        except LinearRegexError:
+            logger.warning(f"Règle regex ignorée ({pattern!r}): {e}")
+            return None
+
+
+def to_date(value) -> Optional[date]:
+    """Date d'une valeur datetime, date ou chaîne ISO (None si absente ou illisible)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+        except ValueError:
+            return None
+    return None
+
+
+def rule_matches(rule: Dict[str, Any], description: str, transaction_date: Optional[date]) -> bool:
+    """
+    Indique si une règle s'applique
+
+    Args:
+        rule: Document de la collection rules
+        description: Description de la transaction, en majuscules
+        transaction_date: Date de la transaction
+    """
+    start_date = to_date(rule.get("start_date"))
+    if start_date and transaction_date and transaction_date < start_date:
+        return False
+    end_date = to_date(rule.get("end_date"))
+    if end_date and transaction_date and transaction_date > end_date:
+        return False
+
+    for exception_pattern in rule.get("exceptions") or []:
+        if exception_pattern.upper() in description:
+            return False
+
+    match_type = rule["match_type"]
+    if match_type == "regex":
+        regex = _cached_regex(rule["pattern"])
+        return regex is not None and regex.search(description[:REGEX_MAX_INPUT_LENGTH]) is not None
+    pattern = rule["pattern"].upper()
+    if match_type == "contains":
+        return pattern in description
+    if match_type == "starts_with":
+        return description.startswith(pattern)
+    if match_type == "ends_with":
+        return description.endswith(pattern)
+    if match_type == "exact":
+        return description == pattern
+    return False
+
+
+class CompiledRule:
+    """Règle préparée pour l'évaluation (motif et exceptions en majuscules, regex compilée, dates lues)"""
+
+    __slots__ = ("rule", "category_id", "pattern", "regex", "match_type", "exceptions", "start_date", "end_date")
+
+    def __init__(self, rule: Dict[str, Any]):
+        self.rule = rule
+        self.category_id = rule.get("category_id")
+        self.pattern = rule["pattern"].upper()
+        self.match_type = rule["match_type"]
+        self.regex = _cached_regex(rule["pattern"]) if self.match_type == "regex" else None
+        self.exceptions = tuple(exception.upper() for exception in rule.get("exceptions") or [])
+        self.start_date = to_date(rule.get("start_date"))
+        self.end_date = to_date(rule.get("end_date"))
+
+    def matches(self, description: str, transaction_date: Optional[date]) -> bool:
+        """Même résultat que rule_matches(self.rule, description, transaction_date)"""
+        if transaction_date:
+            if self.start_date and transaction_date < self.start_date:
+                return False
+            if self.end_date and transaction_date > self.end_date:
+                return False
+        for exception_pattern in self.exceptions:
+            if exception_pattern in description:
+                return False
+
+        match_type = self.match_type
+        if match_type == "contains":
+            return self.pattern in description
+        if match_type == "starts_with":
+            return description.startswith(self.pattern)
+        if match_type == "ends_with":
+            return description.endswith(self.pattern)
+        if match_type == "exact":
+            return description == self.pattern
+        if match_type == "regex":
+            return self.regex is not None and self.regex.search(description[:REGEX_MAX_INPUT_LENGTH]) is not None
+        return False
+
+
+def rule_prefilter(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Critères MongoDB sélectionnant un sur-ensemble des transactions auxquelles
+    la règle s'applique (période, motif littéral et exceptions, sans tenir
+    compte de la casse). Le résultat exact reste à vérifier avec
+    CompiledRule.matches.
+    """
+    query: Dict[str, Any] = {}
+    date_range = {}
+    start_date = to_date(rule.get("start_date"))
+    if start_date:
+        date_range["$gte"] = datetime.combine(start_date, datetime.min.time())
+    end_date = to_date(rule.get("end_date"))
+    if end_date:
+        date_range["$lt"] = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    if date_range:
+        query["date"] = date_range
+
+    match_type = rule["match_type"]
+    if match_type != "regex":
+        pattern = re.escape(rule["pattern"])
+        if match_type in ("starts_with", "exact"):
+            pattern = "^" + pattern
+        if match_type in ("ends_with", "exact"):
+            pattern += "$"
+        query["description"] = {"$regex": pattern, "$options": "i"}
+    exceptions = [exception for exception in rule.get("exceptions") or [] if exception]
+    if exceptions:
+        query.setdefault("description", {})["$nin"] = [
+            re.compile(re.escape(exception), re.IGNORECASE) for exception in exceptions
+        ]
+    return query
+
+
+def compile_rules(rules: List[Dict[str, Any]]) -> List[CompiledRule]:
+    """Prépare une liste de règles, dans leur ordre d'évaluation"""
+    return [CompiledRule(rule) for rule in rules]
+
+
+def find_matching_rule(
+    rules: List[CompiledRule],
+    description: Optional[str],
+    transaction_date=None
+) -> Optional[CompiledRule]:
+    """Première règle qui s'applique à une transaction, ou None"""
+    description = (description or "").upper()
+    transaction_date = to_date(transaction_date)
+    for rule in rules:
+        if rule.matches(description, transaction_date):
+            return rule
+    return None
+
+
+class CompiledRuleSet:
+    """Règles actives compilées d'un utilisateur, étiquetées par users.rules_version"""
+
+    __slots__ = ("rules", "version")
+
+    def __init__(self, rules: List[Dict[str, Any]], version: int = 0):
+        self.rules = compile_rules(rules)
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @property
+    def nbytes(self) -> int:
+        """Taille approximative en mémoire"""
+        return sum(
+            ENTRY_OVERHEAD_BYTES + 2 * len(rule.pattern) + sum(len(exception) for exception in rule.exceptions)
+            for rule in self.rules
+        )
+
+    def match(self, description: Optional[str], transaction_date=None) -> Optional[CompiledRule]:
+        return find_matching_rule(self.rules, description, transaction_date)
+
+    def categorize(self, document: Dict[str, Any]) -> bool:
+        """
+        Renseigne category_id d'une transaction sans catégorie selon la
+        première règle qui s'applique
+
+        Returns:
+            True si une règle a été appliquée
+        """
+        if document.get("category_id") or not self.rules:
+            return False
+        rule = self.match(document.get("description"), document.get("date"))
+        if rule is None:
+            return False
+        document["category_id"] = ObjectId(rule.category_id)
+        return True
+
+
+class RuleSetCache:
+    """
+    Règles compilées par utilisateur, dans un LRU borné en mémoire
+
+    Un jeu de règles compilé pour une version antérieure de users.rules_version
+    (incrémentée par notify_rules_changed à chaque écriture sur les règles)
+    est recompilé à la demande suivante, y compris dans les autres processus.
+    """
+
+    def __init__(self, max_bytes: int):
+        self._cache = MemoryBudgetLRU(max_bytes)
+
+    async def get(self, db, user_id, version: Optional[int] = None) -> CompiledRuleSet:
+        """
+        Renvoie les règles compilées de l'utilisateur
+
+        Args:
+            db: Instance MongoDB
+            user_id: Identifiant de l'utilisateur
+            version: users.rules_version si déjà connue (current_user), sinon lue en base
+        """
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+        if version is None:
+            users_collection = await db.get_collection("users")
+            user = await users_collection.find_one({"_id": user_id}, {"rules_version": 1})
+            version = (user or {}).get("rules_version", 0)
+
+        key = str(user_id)
+        rule_set = self._cache.get(key)
+        if rule_set is not None and rule_set.version == version:
+            return rule_set
+
+        rule_set = CompiledRuleSet(await load_active_rules(db, user_id), version)
+        self._cache.put(key, rule_set, rule_set.nbytes)
+        return rule_set
+
+    def invalidate(self, user_id) -> None:
+        """Supprime les règles compilées d'un utilisateur de ce processus"""
+        self._cache.pop(str(user_id))
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        self._cache.clear()
+
+
+async def load_active_rules(db, user_id) -> List[Dict[str, Any]]:
+    """Règles actives d'un utilisateur, dans leur ordre d'évaluation"""
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+    rules_collection = await db.get_collection("rules")
+    return await rules_collection.find({"user_id": user_id, "is_active": True}).to_list(length=None)
+
+
+# Instance globale
+rule_set_cache = RuleSetCache(settings.RULES_CACHE_MAX_MB * 1024 * 1024)
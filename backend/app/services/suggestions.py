@@ -0,0 +1,245 @@
+"""
+Suggestions de marchands et de descriptions (autocomplétion)
+
+Pour chaque utilisateur, les marchands et descriptions connus sont chargés
+une seule fois (agrégation $group) dans un vocabulaire trié par texte
+normalisé (sans accents, en majuscules). Une recherche par préfixe est alors
+une recherche dichotomique (bisect) suivie d'un parcours de la plage
+correspondante, sans requête MongoDB ; les résultats sont classés par
+fréquence.
+
+Comme le cache analytique, les vocabulaires sont conservés dans un LRU borné
+en mémoire (SUGGESTIONS_CACHE_MAX_MB) et étiquetés par la version des données
+de l'utilisateur (users.data_version). Les écritures unitaires de ce processus
+mettent le vocabulaire à jour sur place et lui donnent la data_version
+renvoyée par notify_transactions_changed, si elle suit directement la sienne ;
+toute autre écriture (imports, synchronisation bancaire, autres processus)
+se traduit par un écart de version et un rechargement à la requête suivante.
+"""
+
+import asyncio
+import heapq
+import logging
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services.transaction_search import normalize_text
+from app.utils.memory_cache import MemoryBudgetLRU
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_FIELDS = ("merchant", "description")
+
+# Surcoût mémoire approximatif d'une entrée (listes, entier, chaînes)
+ENTRY_OVERHEAD_BYTES = 120
+
+
+class Vocabulary:
+    """Valeurs distinctes d'un champ, triées par clé normalisée, avec leur fréquence"""
+
+    __slots__ = ("keys", "values", "counts")
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.values: List[str] = []
+        self.counts: List[int] = []
+
+    @classmethod
+    def from_counts(cls, counts: Iterable[Tuple[str, int]]) -> "Vocabulary":
+        """
+        Construit le vocabulaire à partir de couples (valeur, nombre)
+
+        Les valeurs de même clé normalisée sont fusionnées ; la graphie la
+        plus fréquente est conservée.
+        """
+        merged: Dict[str, List[Any]] = {}
+        for value, count in counts:
+            key = _key(value)
+            if not key:
+                continue
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [value.strip(), count, count]
+            else:
+                entry[1] += count
+                if count > entry[2]:
+                    entry[0], entry[2] = value.strip(), count
+
+        vocabulary = cls()
+        for key in sorted(merged):
+            value, total, _ = merged[key]
+            vocabulary.keys.append(key)
+            vocabulary.values.append(value)
+            vocabulary.counts.append(total)
+        return vocabulary
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(key) + len(value) for key, value in zip(self.keys, self.values)) + ENTRY_OVERHEAD_BYTES * len(self.keys)
+
+    def add(self, value: Optional[str], delta: int = 1) -> None:
+        """Ajoute (ou retire, delta négatif) des occurrences d'une valeur"""
+        key = _key(value)
+        if not key:
+            return
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            self.counts[index] += delta
+            if self.counts[index] <= 0:
+                del self.keys[index], self.values[index], self.counts[index]
+        elif delta > 0:
+            self.keys.insert(index, key)
+            self.values.insert(index, value.strip())
+            self.counts.insert(index, delta)
+
+    def search(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """Valeurs commençant par le préfixe (normalisé), les plus fréquentes d'abord"""
+        key = normalize_text(prefix).strip()
+        start = bisect_left(self.keys, key)
+        # Fin de la plage : première clé qui ne commence plus par le préfixe
+        end = bisect_left(self.keys, key + "\uffff", lo=start)
+        best = heapq.nsmallest(
+            limit,
+            range(start, end),
+            key=lambda index: (-self.counts[index], self.keys[index])
+        )
+        return [(self.values[index], self.counts[index]) for index in best]
+
+
+def _key(value: Optional[str]) -> str:
+    if not isinstance(value, str):
+        return ""
+    return " ".join(normalize_text(value).split())
+
+
+class SuggestionIndex:
+    """Vocabulaires des marchands et descriptions d'un utilisateur"""
+
+    __slots__ = ("vocabularies", "version")
+
+    def __init__(self, vocabularies: Dict[str, Vocabulary], version: int = 0):
+        self.vocabularies = vocabularies
+        self.version = version
+
+    @property
+    def nbytes(self) -> int:
+        return sum(vocabulary.nbytes for vocabulary in self.vocabularies.values())
+
+    def apply(self, added: Iterable[Dict[str, Any]] = (), removed: Iterable[Dict[str, Any]] = ()) -> None:
+        """Reporte des transactions ajoutées et supprimées (une modification = les deux)"""
+        for document in removed:
+            for field, vocabulary in self.vocabularies.items():
+                vocabulary.add(document.get(field), -1)
+        for document in added:
+            for field, vocabulary in self.vocabularies.items():
+                vocabulary.add(document.get(field), 1)
+
+    def suggest(self, prefix: str, fields: Iterable[str] = SUGGESTION_FIELDS, limit: int = 10) -> List[Dict[str, Any]]:
+        """Suggestions des champs demandés, classées par fréquence"""
+        results = [
+            {"value": value, "field": field, "count": count}
+            for field in fields
+            for value, count in self.vocabularies[field].search(prefix, limit)
+        ]
+        results.sort(key=lambda item: -item["count"])
+        return results[:limit]
+
+
+class SuggestionCache:
+    """Index de suggestions par utilisateur dans un LRU borné en mémoire"""
+
+    def __init__(self, max_bytes: int):
+        self._cache = MemoryBudgetLRU(max_bytes)
+        self._loading: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    async def get_index(self, db, user: Dict[str, Any]) -> SuggestionIndex:
+        """
+        Renvoie l'index de l'utilisateur, rechargé si sa version a changé
+
+        Args:
+            db: Instance MongoDB
+            user: Document utilisateur (current_user), porteur de data_version
+        """
+        key = str(user["_id"])
+        version = user.get("data_version", 0)
+
+        index = self._cache.get(key)
+        if index is not None and index.version == version:
+            return index
+
+        # Un seul chargement par utilisateur et version, partagé entre requêtes simultanées
+        loading_key = (key, version)
+        task = self._loading.get(loading_key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(db, user["_id"], version))
+            self._loading[loading_key] = task
+            task.add_done_callback(lambda _: self._loading.pop(loading_key, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, db, user_id, version: int) -> SuggestionIndex:
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        collection = await db.get_collection("transactions")
+        vocabularies = {}
+        for field in SUGGESTION_FIELDS:
+            pipeline = [
+                {"$match": {"user_id": user_id, field: {"$type": "string", "$ne": ""}}},
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}
+            ]
+            groups = await collection.aggregate(pipeline).to_list(length=None)
+            vocabularies[field] = Vocabulary.from_counts((group["_id"], group["count"]) for group in groups)
+        index = SuggestionIndex(vocabularies, version)
+
+        self._cache.put(str(user_id), index, index.nbytes)
+        logger.debug(
+            f"Suggestions chargées pour {user_id}: "
+            + ", ".join(f"{len(vocabulary)} {field}" for field, vocabulary in vocabularies.items())
+            + f" ({index.nbytes} octets, version {version})"
+        )
+        return index
+
+    def record_write(
+        self,
+        user_id,
+        version: Optional[int],
+        added: Iterable[Dict[str, Any]] = (),
+        removed: Iterable[Dict[str, Any]] = ()
+    ) -> None:
+        """
+        Reporte une écriture unitaire de ce processus sur l'index chargé
+
+        À appeler après notify_transactions_changed, avec la data_version
+        qu'il renvoie. L'index n'adopte cette version que si elle suit
+        directement la sienne : sinon une autre écriture (d'un autre
+        processus) s'est intercalée sans y être reportée, et l'index est
+        supprimé pour être rechargé.
+        """
+        key = str(user_id)
+        index = self._cache.get(key)
+        if index is None:
+            return
+        if version != index.version + 1:
+            self.invalidate(user_id)
+            return
+        index.apply(added, removed)
+        index.version = version
+        self._cache.put(key, index, index.nbytes)
+
+    def invalidate(self, user_id) -> None:
+        """Supprime l'index d'un utilisateur de ce processus"""
+        self._cache.pop(str(user_id))
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        self._cache.clear()
+
+
+# Instance globale
+suggestion_cache = SuggestionCache(settings.SUGGESTIONS_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,284 @@
+"""
+Synchronisation différentielle pour les clients (« changements depuis »)
+
+Les documents des collections synchronisées (transactions, catégories, règles,
+budgets) portent un champ updated_at mis à jour à chaque écriture ; les
+suppressions laissent une pierre tombale dans la collection tombstones
+(supprimée par un index TTL après SYNC_TOMBSTONE_TTL_DAYS jours). Une pierre
+tombale sans document_id signale la purge complète d'une collection.
+
+Une passe de synchronisation couvre l'intervalle [since, until) : until est
+fixé au début de la passe (instant courant moins SYNC_CLOCK_SKEW_SECONDS) et
+devient le since de la passe suivante. Les flux sont lus dans l'ordre
+(pierres tombales d'abord, puis chaque collection) et paginés par clé
+(updated_at, _id). Le jeton renvoyé au client encode tout cet état : il est
+sans état côté serveur et permet de reprendre une passe interrompue.
+"""
+
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Collections synchronisées
+SYNC_COLLECTIONS = ("transactions", "categories", "rules", "budgets")
+TOMBSTONES = "tombstones"
+# Ordre de lecture : suppressions et purges d'abord, pour que le client les
+# applique avant les documents créés ensuite
+STREAMS = (TOMBSTONES,) + SYNC_COLLECTIONS
+
+TOKEN_VERSION = 1
+
+
+class InvalidSyncToken(ValueError):
+    """Jeton de synchronisation illisible ou incohérent"""
+
+
+def _to_millis(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _from_millis(value: int) -> datetime:
+    # Datetime naïve UTC, comme celles lues depuis MongoDB
+    return datetime.fromtimestamp(value / 1000, timezone.utc).replace(tzinfo=None)
+
+
+def encode_token(state: Dict[str, Any]) -> str:
+    """Encode l'état de synchronisation en jeton opaque (base64 url)"""
+    payload = json.dumps({"v": TOKEN_VERSION, **state}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Décode un jeton produit par encode_token
+
+    Raises:
+        InvalidSyncToken: si le jeton est illisible ou incohérent
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        state = json.loads(payload)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidSyncToken("Jeton de synchronisation illisible") from e
+
+    if not isinstance(state, dict) or state.get("v") != TOKEN_VERSION:
+        raise InvalidSyncToken("Version du jeton de synchronisation non prise en charge")
+
+    since = state.get("since")
+    until = state.get("until")
+    stream = state.get("stream", 0)
+    after = state.get("after")
+    if since is not None and not isinstance(since, int):
+        raise InvalidSyncToken("Jeton de synchronisation incohérent")
+    if until is not None and not isinstance(until, int):
+        raise InvalidSyncToken("Jeton de synchronisation incohérent")
+    if not isinstance(stream, int) or not 0 <= stream <= len(STREAMS):
+        raise InvalidSyncToken("Jeton de synchronisation incohérent")
+    if after is not None:
+        if not (isinstance(after, list) and len(after) == 2 and isinstance(after[0], int)):
+            raise InvalidSyncToken("Jeton de synchronisation incohérent")
+        try:
+            ObjectId(after[1])
+        except (InvalidId, TypeError) as e:
+            raise InvalidSyncToken("Jeton de synchronisation incohérent") from e
+    return state
+
+
+def keyset_filter(
+    user_id: ObjectId,
+    field: str,
+    since: Optional[datetime],
+    until: datetime,
+    after: Optional[List[Any]] = None
+) -> Dict[str, Any]:
+    """Filtre des documents de l'intervalle [since, until) situés après la clé (field, _id)"""
+    query: Dict[str, Any] = {"user_id": user_id, field: {"$lt": until}}
+    if since is not None:
+        query[field]["$gte"] = since
+    if after:
+        last_time, last_id = _from_millis(after[0]), ObjectId(after[1])
+        query["$or"] = [
+            {field: {"$gt": last_time}},
+            {field: last_time, "_id": {"$gt": last_id}}
+        ]
+    return query
+
+
+def _client_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Document renvoyé au client : _id devient id (les ObjectId sont encodés par la réponse)"""
+    result = {"id": str(document["_id"])}
+    result.update((key, value) for key, value in document.items() if key != "_id")
+    return result
+
+
+async def get_changes(
+    db,
+    user_id,
+    token: Optional[str] = None,
+    limit: int = 500,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Renvoie une page de changements pour un utilisateur
+
+    Sans jeton (ou avec un jeton plus ancien que la rétention des pierres
+    tombales), une synchronisation complète est renvoyée avec reset=True :
+    le client remplace alors son cache local.
+
+    Args:
+        db: Instance MongoDB
+        user_id: Identifiant de l'utilisateur
+        token: Jeton next_token d'une réponse précédente
+        limit: Nombre maximal d'éléments dans la page
+        now: Instant courant (tests)
+
+    Returns:
+        {"changes": {collection: {"updated": [...], "deleted": [...]}},
+         "purged": [...], "reset": bool, "has_more": bool, "next_token": str}
+
+    Raises:
+        InvalidSyncToken: si le jeton est invalide
+    """
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+    now = now or datetime.now(timezone.utc)
+
+    state = decode_token(token) if token else {"since": None}
+    since_ms = state.get("since")
+    until_ms = state.get("until")
+    stream = state.get("stream", 0)
+    after = state.get("after")
+
+    reset = False
+    if until_ms is None:
+        # Début d'une nouvelle passe
+        until_ms = _to_millis(now - timedelta(seconds=settings.SYNC_CLOCK_SKEW_SECONDS))
+        retention_start = _to_millis(now - timedelta(days=settings.SYNC_TOMBSTONE_TTL_DAYS))
+        if since_ms is not None and since_ms < retention_start:
+            # Des suppressions ont pu être oubliées : resynchronisation complète
+            since_ms = None
+        reset = since_ms is None
+        stream, after = 0, None
+
+    since = _from_millis(since_ms) if since_ms is not None else None
+    until = _from_millis(until_ms)
+
+    changes = {name: {"updated": [], "deleted": []} for name in SYNC_COLLECTIONS}
+    purged: List[str] = []
+    remaining = limit
+
+    while stream < len(STREAMS) and remaining > 0:
+        name = STREAMS[stream]
+        # Synchronisation complète : pas de pierres tombales à transmettre
+        if name == TOMBSTONES and since is None:
+            stream, after = stream + 1, None
+            continue
+
+        field = "deleted_at" if name == TOMBSTONES else "updated_at"
+        collection = await db.get_collection(name)
+        cursor = collection.find(keyset_filter(user_id, field, since, until, after))
+        documents = await cursor.sort([(field, 1), ("_id", 1)]).limit(remaining).to_list(length=remaining)
+
+        for document in documents:
+            if name == TOMBSTONES:
+                target = document.get("collection")
+                if target not in changes:
+                    continue
+                if document.get("document_id") is None:
+                    purged.append(target)
+                else:
+                    changes[target]["deleted"].append(str(document["document_id"]))
+            else:
+                changes[name]["updated"].append(_client_document(document))
+
+        remaining -= len(documents)
+        if remaining == 0 and documents:
+            # Page pleine : reprise après le dernier document lu
+            last = documents[-1]
+            after = [_to_millis(last[field]), str(last["_id"])]
+        else:
+            stream, after = stream + 1, None
+
+    has_more = stream < len(STREAMS)
+    if has_more:
+        next_state = {"since": since_ms, "until": until_ms, "stream": stream, "after": after}
+    else:
+        # Passe terminée : la prochaine commence à until
+        next_state = {"since": until_ms}
+
+    return {
+        "changes": changes,
+        "purged": purged,
+        "reset": reset,
+        "has_more": has_more,
+        "next_token": encode_token(next_state)
+    }
+
+
+async def record_deletions(db, user_id, collection: str, document_ids: Iterable[Any]) -> None:
+    """
+    Enregistre les pierres tombales de documents supprimés
+
+    À appeler après la suppression. Une erreur est journalisée sans être
+    propagée : la suppression elle-même a déjà réussi.
+    """
+    await _insert_tombstones(db, user_id, collection, list(document_ids))
+
+
+async def record_purge(db, user_id, collections: Iterable[str]) -> None:
+    """Enregistre la purge complète de collections d'un utilisateur"""
+    for collection in collections:
+        await _insert_tombstones(db, user_id, collection, [None])
+
+
+async def _insert_tombstones(db, user_id, collection: str, document_ids: List[Any]) -> None:
+    if not document_ids:
+        return
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+
+    deleted_at = datetime.now(timezone.utc)
+    tombstones = [
+        {
+            "user_id": user_id,
+            "collection": collection,
+            "document_id": ObjectId(document_id) if isinstance(document_id, str) else document_id,
+            "deleted_at": deleted_at
+        }
+        for document_id in document_ids
+    ]
+    try:
+        tombstones_collection = await db.get_collection(TOMBSTONES)
+        await tombstones_collection.insert_many(tombstones, ordered=False)
+    except Exception as e:
+        logger.error(f"Impossible d'enregistrer les suppressions ({collection}) de {user_id}: {e}")
+
+
+async def backfill_updated_at(mongodb) -> None:
+    """
+    Renseigne updated_at sur les documents qui n'en ont pas (données antérieures)
+
+    created_at est repris s'il s'agit d'une date, sinon l'instant courant.
+    """
+    for name in SYNC_COLLECTIONS:
+        collection = await mongodb.get_collection(name)
+        result = await collection.update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": {
+                "$cond": [{"$eq": [{"$type": "$created_at"}, "date"]}, "$created_at", "$$NOW"]
+            }}}]
+        )
+        if result.modified_count:
+            logger.info(f"updated_at renseigné sur {result.modified_count} document(s) de {name}")
@@ -0,0 +1,64 @@
+"""
+Planificateur de synchronisation bancaire
+
+Lance chaque jour, à l'heure creuse BANK_SYNC_SCHEDULE_HOUR, la synchronisation
+des connexions actives de tous les utilisateurs, avec le plafond de
+concurrence global BANK_SYNC_GLOBAL_CONCURRENCY. Activé par
+BANK_SYNC_SCHEDULE_ENABLED ; démarré et arrêté par le cycle de vie de l'application.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.services.bank_sync import sync_all_users
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until_hour(hour: int, now: Optional[datetime] = None) -> float:
+    """Nombre de secondes jusqu'à la prochaine occurrence de l'heure donnée"""
+    now = now or datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+class SyncScheduler:
+    """Tâche de fond exécutant la synchronisation globale à heure fixe"""
+
+    def __init__(self, hour: Optional[int] = None, max_concurrency: Optional[int] = None):
+        self.hour = settings.BANK_SYNC_SCHEDULE_HOUR if hour is None else hour
+        self.max_concurrency = max_concurrency or settings.BANK_SYNC_GLOBAL_CONCURRENCY
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db) -> None:
+        """Démarre la boucle de planification"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(db))
+            logger.info(f"Synchronisation bancaire planifiée chaque jour à {self.hour}h")
+
+    async def stop(self) -> None:
+        """Arrête la boucle de planification (une synchronisation en cours est annulée)"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db) -> None:
+        while True:
+            await asyncio.sleep(seconds_until_hour(self.hour))
+            try:
+                await sync_all_users(db, self.max_concurrency)
+            except Exception as e:
+                logger.error(f"Erreur lors de la synchronisation planifiée: {e}")
+
+
+# Instance globale
+sync_scheduler = SyncScheduler()
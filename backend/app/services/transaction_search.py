@@ -0,0 +1,175 @@
+"""
+Recherche indexée dans les transactions
+
+Chaque transaction porte un champ search_tokens : les mots de sa description
+et de son marchand, sans accents et en majuscules (« Café du Marché » donne
+["CAFE", "DU", "MARCHE"]). Il est calculé à l'écriture et indexé avec
+user_id (index multiclé), ce qui permet :
+
+- text : recherche par mots sur l'index texte (description, merchant), triée
+  par pertinence (textScore) ;
+- prefix : chaque terme est le début d'un mot (regex ancrée, servie par les
+  bornes de l'index) ;
+- fuzzy : chaque terme est à une faute de frappe près d'un mot (suppression,
+  insertion, substitution ou inversion). Les variantes du terme sont générées
+  côté application et recherchées par égalité dans l'index : le coût dépend
+  de la longueur du terme, pas de l'historique ;
+- regex : comportement historique et mode par défaut de l'API (sous-chaîne
+  ou regex libre insensible à la casse, parcours complet des transactions de
+  l'utilisateur).
+
+Les modes indexés (text, prefix, fuzzy) sont à demander explicitement par
+search_mode : ils ne trouvent pas une sous-chaîne au milieu d'un mot.
+
+En prefix et fuzzy, les transactions contenant exactement les termes
+recherchés sont classées en premier, puis par date décroissante.
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("text", "prefix", "fuzzy", "regex")
+SEARCHABLE_FIELDS = ("description", "merchant")
+
+# Longueur minimale d'un terme pour la tolérance aux fautes (en dessous, les
+# variantes correspondraient à trop de mots courts)
+FUZZY_MIN_LENGTH = 4
+FUZZY_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+BACKFILL_BATCH_SIZE = 1000
+
+_TOKEN_SEPARATOR = re.compile(r"[^A-Z0-9]+")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Texte sans accents et en majuscules"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).upper()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Mots normalisés d'un texte, dédoublonnés dans l'ordre d'apparition"""
+    return list(dict.fromkeys(token for token in _TOKEN_SEPARATOR.split(normalize_text(text)) if token))
+
+
+def search_tokens(document: Dict[str, Any]) -> List[str]:
+    """Valeur du champ search_tokens d'une transaction"""
+    tokens: List[str] = []
+    for field in SEARCHABLE_FIELDS:
+        tokens.extend(tokenize(document.get(field)))
+    return list(dict.fromkeys(tokens))
+
+
+def with_search_tokens(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Renseigne search_tokens sur un document de transaction avant insertion"""
+    document["search_tokens"] = search_tokens(document)
+    return document
+
+
+def fuzzy_variants(term: str) -> List[str]:
+    """Le terme et tous les mots à une modification près (distance de Damerau-Levenshtein 1)"""
+    splits = [(term[:i], term[i:]) for i in range(len(term) + 1)]
+    variants = {term}
+    for left, right in splits:
+        if right:
+            variants.add(left + right[1:])
+            for char in FUZZY_ALPHABET:
+                variants.add(left + char + right[1:])
+        if len(right) > 1:
+            variants.add(left + right[1] + right[0] + right[2:])
+        for char in FUZZY_ALPHABET:
+            variants.add(left + char + right)
+    variants.discard("")
+    return sorted(variants)
+
+
+def build_search_filter(search: str, mode: str) -> Dict[str, Any]:
+    """
+    Filtre MongoDB d'une recherche
+
+    Returns:
+        Conditions à ajouter au filtre de la requête (vide si la recherche ne
+        contient aucun mot en prefix ou fuzzy)
+    """
+    if mode == "text":
+        return {"$text": {"$search": search}}
+    if mode == "regex":
+        return {"$or": [{field: {"$regex": search, "$options": "i"}} for field in SEARCHABLE_FIELDS]}
+
+    terms = tokenize(search)
+    if not terms:
+        return {}
+    if mode == "prefix":
+        return {"search_tokens": {"$all": [re.compile("^" + re.escape(term)) for term in terms]}}
+
+    conditions = []
+    for term in terms:
+        if len(term) < FUZZY_MIN_LENGTH:
+            conditions.append({"search_tokens": term})
+        else:
+            conditions.append({"search_tokens": {"$in": fuzzy_variants(term)}})
+    return {"$and": conditions}
+
+
+def ranked_search_pipeline(
+    filter_query: Dict[str, Any],
+    search: str,
+    skip: int,
+    limit: int,
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Pipeline d'agrégation des modes prefix et fuzzy : les transactions dont
+    les mots contiennent exactement le plus de termes recherchés d'abord,
+    puis par date décroissante
+    """
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": filter_query},
+        {"$addFields": {"_search_rank": {"$size": {"$setIntersection": [
+            {"$ifNull": ["$search_tokens", []]}, tokenize(search)
+        ]}}}},
+        {"$sort": {"_search_rank": -1, "date": -1, "_id": -1}},
+        {"$skip": skip},
+        {"$limit": limit}
+    ]
+    if projection:
+        pipeline.append({"$project": projection})
+    else:
+        pipeline.append({"$unset": "_search_rank"})
+    return pipeline
+
+
+async def backfill_search_tokens(mongodb) -> None:
+    """Calcule search_tokens sur les transactions qui n'en ont pas (données antérieures)"""
+    collection = await mongodb.get_collection("transactions")
+    cursor = collection.find(
+        {"search_tokens": {"$exists": False}},
+        {field: 1 for field in SEARCHABLE_FIELDS}
+    )
+    updated = 0
+    operations: List[UpdateOne] = []
+    async for document in cursor:
+        operations.append(UpdateOne(
+            {"_id": document["_id"]},
+            {"$set": {"search_tokens": search_tokens(document)}}
+        ))
+        if len(operations) >= BACKFILL_BATCH_SIZE:
+            updated += await _apply(collection, operations)
+            operations = []
+    if operations:
+        updated += await _apply(collection, operations)
+    if updated:
+        logger.info(f"search_tokens renseigné sur {updated} transaction(s)")
+
+
+async def _apply(collection, operations: Iterable[UpdateOne]) -> int:
+    result = await collection.bulk_write(list(operations), ordered=False)
+    return result.modified_count
@@ -0,0 +1,135 @@
+"""
+Tests unitaires pour app/services/analytics_cache.py
+
+Ces tests vérifient les regroupements vectorisés de l'instantané analytique
+et son invalidation par la version des données de l'utilisateur.
+"""
+
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from unittest.mock import Mock, AsyncMock
+
+from app.services.analytics_cache import AnalyticsCache, TransactionSnapshot
+from app.utils.memory_cache import MemoryBudgetLRU
+
+
+FOOD = ObjectId()
+RENT = ObjectId()
+
+DOCUMENTS = [
+    {"date": datetime(2025, 12, 3), "amount": 40.0, "category_id": FOOD, "is_expense": True},
+    {"date": datetime(2025, 11, 28), "amount": 2500.0, "category_id": None, "type": "income"},
+    {"date": datetime(2025, 12, 1), "amount": 900.0, "category_id": str(RENT), "type": "expense"},
+    {"date": datetime(2025, 12, 15), "amount": 60.0, "category_id": FOOD, "is_expense": True},
+    {"date": datetime(2026, 1, 2), "amount": 35.0, "category_id": FOOD, "is_expense": True},
+    {"date": "2025-12-10", "amount": 999.0, "is_expense": True},  # date non datetime : ignorée
+]
+
+
+def make_db(documents):
+    """Base simulée dont la collection transactions renvoie les documents fournis"""
+    cursor = Mock()
+    cursor.to_list = AsyncMock(return_value=documents)
+    collection = Mock()
+    collection.find = Mock(return_value=cursor)
+    db = Mock()
+    db.get_collection = AsyncMock(return_value=collection)
+    return db, collection
+
+
+class TestTransactionSnapshot:
+    """Tests pour TransactionSnapshot"""
+
+    def test_columns_sorted_by_date(self):
+        """Les colonnes sont triées par date et les documents invalides ignorés"""
+        snapshot = TransactionSnapshot.from_documents(DOCUMENTS)
+        assert len(snapshot) == 5
+        assert snapshot.dates[0] == datetime(2025, 11, 28)
+        assert snapshot.amounts.dtype.name == "float64"
+        assert snapshot.category_codes.dtype.name == "int32"
+
+    def test_totals(self):
+        """Les totaux respectent la borne de fin exclusive et le repli sur type"""
+        snapshot = TransactionSnapshot.from_documents(DOCUMENTS)
+        totals = snapshot.totals(datetime(2025, 12, 1), datetime(2026, 1, 1))
+        assert totals == {
+            "total_income": 0.0,
+            "total_expenses": 1000.0,
+            "income_count": 0,
+            "expense_count": 3
+        }
+
+    def test_by_category(self):
+        """Les catégories string et ObjectId sont regroupées et triées par total"""
+        snapshot = TransactionSnapshot.from_documents(DOCUMENTS)
+        expenses = snapshot.by_category(datetime(2025, 11, 1), datetime(2026, 2, 1), is_expense=True)
+        assert expenses == [
+            {"category_id": str(RENT), "total": 900.0, "count": 1},
+            {"category_id": str(FOOD), "total": 135.0, "count": 3}
+        ]
+        income = snapshot.by_category(datetime(2025, 11, 1), datetime(2026, 2, 1), is_expense=False)
+        assert income == [{"category_id": None, "total": 2500.0, "count": 1}]
+
+    def test_empty_range(self):
+        """Une plage sans transaction renvoie des totaux nuls"""
+        snapshot = TransactionSnapshot.from_documents(DOCUMENTS)
+        assert snapshot.by_category(datetime(2020, 1, 1), datetime(2020, 2, 1), True) == []
+        assert snapshot.totals(datetime(2020, 1, 1), datetime(2020, 2, 1))["expense_count"] == 0
+
+
+class TestAnalyticsCache:
+    """Tests pour AnalyticsCache"""
+
+    @pytest.mark.asyncio
+    async def test_reload_on_data_version_change(self):
+        """L'instantané est réutilisé tant que data_version ne change pas"""
+        cache = AnalyticsCache(max_bytes=10 * 1024 * 1024)
+        db, collection = make_db(DOCUMENTS)
+        user = {"_id": ObjectId(), "data_version": 3}
+
+        first = await cache.get_snapshot(db, user)
+        second = await cache.get_snapshot(db, user)
+        assert first is second
+        assert collection.find.call_count == 1
+
+        user["data_version"] = 4
+        third = await cache.get_snapshot(db, user)
+        assert third is not first
+        assert third.version == 4
+        assert collection.find.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self):
+        """invalidate() force le rechargement dans le processus courant"""
+        cache = AnalyticsCache(max_bytes=10 * 1024 * 1024)
+        db, collection = make_db(DOCUMENTS)
+        user = {"_id": ObjectId()}
+
+        await cache.get_snapshot(db, user)
+        cache.invalidate(user["_id"])
+        await cache.get_snapshot(db, user)
+        assert collection.find.call_count == 2
+
+
+class TestMemoryBudgetLRU:
+    """Tests pour MemoryBudgetLRU"""
+
+    def test_eviction_by_size(self):
+        """Les entrées les moins récemment utilisées sont évincées au-delà du budget"""
+        cache = MemoryBudgetLRU(max_bytes=100)
+        cache.put("a", 1, 40)
+        cache.put("b", 2, 40)
+        cache.get("a")
+        cache.put("c", 3, 40)
+
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.current_bytes == 80
+
+    def test_entry_larger_than_budget(self):
+        """Une entrée plus grande que le budget n'est pas conservée"""
+        cache = MemoryBudgetLRU(max_bytes=100)
+        cache.put("a", 1, 200)
+        assert len(cache) == 0
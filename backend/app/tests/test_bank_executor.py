@@ -0,0 +1,156 @@
+"""
+Tests unitaires pour app/services/bank_executor.py
+
+Ces tests vérifient que les sessions de connecteurs s'exécutent hors de la
+boucle d'événements, avec un nombre borné de sessions simultanées, un délai
+maximal et une fermeture systématique du connecteur.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.bank_executor import (
+    BankConnectorExecutor,
+    ConnectorTimeoutError,
+    create_connector
+)
+from app.services.boursobank import BoursobankMockConnector
+from app.services.cic import CICMockConnector
+
+
+class BlockingConnector:
+    """Connecteur factice qui bloque comme un appel Selenium"""
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.closed = False
+
+    async def login(self, username: str, password: str) -> bool:
+        with BlockingConnector.lock:
+            BlockingConnector.active += 1
+            BlockingConnector.max_active = max(BlockingConnector.max_active, BlockingConnector.active)
+        try:
+            time.sleep(self.delay)  # Appel bloquant volontaire
+        finally:
+            with BlockingConnector.lock:
+                BlockingConnector.active -= 1
+        return True
+
+    async def get_accounts(self):
+        return [{"id": "ACC1", "name": "Compte", "type": "checking", "balance": 10.0}]
+
+    async def get_transactions(self, account_id, start_date=None, end_date=None):
+        return [{"date": "2025-12-01T00:00:00", "description": "TEST", "amount": -1.0}]
+
+    def close(self):
+        self.closed = True
+
+
+class TestCreateConnector:
+    """Tests pour la fonction create_connector"""
+
+    def test_mock_connectors(self):
+        """Les connexions mock utilisent les connecteurs mock"""
+        assert isinstance(create_connector("cic", "mock"), CICMockConnector)
+        assert isinstance(create_connector("boursobank", "mock"), BoursobankMockConnector)
+
+    def test_unsupported_bank(self):
+        """Une banque inconnue lève une ValueError"""
+        with pytest.raises(ValueError):
+            create_connector("unknown", "mock")
+
+
+class TestBankConnectorExecutor:
+    """Tests pour BankConnectorExecutor"""
+
+    @pytest.mark.asyncio
+    async def test_mock_connector_session(self):
+        """Un connecteur mock passe par le pool et renvoie comptes et transactions"""
+        executor = BankConnectorExecutor(max_sessions=1, timeout=10)
+        try:
+            result = await executor.run_session(
+                BoursobankMockConnector(),
+                {"username": "user", "password": "secret"}
+            )
+        finally:
+            executor.shutdown()
+
+        assert result["login_success"] is True
+        assert len(result["accounts"]) == 2
+        for account in result["accounts"]:
+            assert account["id"] in result["transactions"]
+            assert len(result["transactions"][account["id"]]) > 0
+
+    @pytest.mark.asyncio
+    async def test_login_failure_closes_connector(self):
+        """Un échec de connexion renvoie login_success=False et ferme le connecteur"""
+        connector = BoursobankMockConnector()
+        closed = []
+        connector.close = lambda: closed.append(True)
+
+        executor = BankConnectorExecutor(max_sessions=1, timeout=10)
+        try:
+            result = await executor.run_session(connector, {"username": "u", "password": "invalid"})
+        finally:
+            executor.shutdown()
+
+        assert result == {"login_success": False, "accounts": [], "transactions": {}}
+        assert closed
+
+    @pytest.mark.asyncio
+    async def test_event_loop_not_blocked(self):
+        """La boucle d'événements reste disponible pendant une session bloquante"""
+        executor = BankConnectorExecutor(max_sessions=1, timeout=10)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        try:
+            await asyncio.gather(
+                executor.run_session(BlockingConnector(delay=0.3), {}),
+                ticker()
+            )
+        finally:
+            executor.shutdown()
+
+        assert ticks == 5
+
+    @pytest.mark.asyncio
+    async def test_max_concurrent_sessions(self):
+        """Le nombre de sessions simultanées est borné par max_sessions"""
+        BlockingConnector.max_active = 0
+        executor = BankConnectorExecutor(max_sessions=2, timeout=10)
+        try:
+            results = await asyncio.gather(*[
+                executor.run_session(BlockingConnector(delay=0.1), {})
+                for _ in range(5)
+            ])
+        finally:
+            executor.shutdown()
+
+        assert all(result["login_success"] for result in results)
+        assert BlockingConnector.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_timeout_closes_connector(self):
+        """Une session trop longue lève ConnectorTimeoutError et ferme le connecteur"""
+        connector = BlockingConnector(delay=0.5)
+        executor = BankConnectorExecutor(max_sessions=1, timeout=0.1)
+        try:
+            with pytest.raises(ConnectorTimeoutError):
+                await executor.run_session(connector, {})
+        finally:
+            executor.shutdown()
+
+        assert connector.closed
@@ -0,0 +1,291 @@
+"""
+Tests unitaires pour app/services/bank_sync.py
+
+Ces tests vérifient le calcul des filigranes de synchronisation et le
+regroupement des écritures (un bulk_write par compte, un pour les comptes).
+"""
+
+import asyncio
+import pytest
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.services.bank_executor import ConnectorTimeoutError
+from app.services.bank_sync import (
+    build_transaction_operations,
+    compute_start_dates,
+    sync_connection,
+    sync_connections
+)
+from app.core.config import settings
+from app.services.boursobank import BoursobankMockConnector
+from app.services.rule_engine import CompiledRuleSet
+from app.services.sync_changes import _from_millis, _to_millis, keyset_filter
+from app.services.mock_bank import ScalableMockConnector
+from app.schemas.bank_connection import SyncResult
+
+
+class AsyncCursor:
+    """Curseur asynchrone minimal pour simuler collection.find()"""
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+
+    def __aiter__(self):
+        self._iter = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def make_db(existing_accounts):
+    """Construit une base simulée avec les comptes existants fournis"""
+    collections = {
+        "bank_accounts": Mock(),
+        "transactions": Mock(),
+        "bank_connections": Mock(),
+        "users": Mock(),
+        "rules": Mock()
+    }
+    collections["bank_accounts"].find = Mock(return_value=AsyncCursor(existing_accounts))
+    collections["bank_accounts"].bulk_write = AsyncMock()
+    collections["transactions"].bulk_write = AsyncMock(
+        side_effect=lambda operations, ordered: Mock(upserted_count=len(operations))
+    )
+    collections["bank_connections"].update_one = AsyncMock()
+    collections["users"].find_one = AsyncMock(return_value={"rules_version": 0})
+    collections["rules"].find = Mock(return_value=Mock(to_list=AsyncMock(return_value=[])))
+
+    db = Mock()
+    db.get_collection = AsyncMock(side_effect=lambda name: collections[name])
+    return db, collections
+
+
+class TestComputeStartDates:
+    """Tests pour la fonction compute_start_dates"""
+
+    def test_watermark_minus_overlap(self):
+        """La date de début est le filigrane moins la fenêtre de recouvrement"""
+        watermark = datetime(2025, 12, 10)
+        start_dates = compute_start_dates({"ACC1": {"sync_watermark": watermark}}, 3)
+        assert start_dates == {"ACC1": datetime(2025, 12, 7)}
+
+    def test_account_without_watermark(self):
+        """Un compte jamais synchronisé utilise la période par défaut du connecteur"""
+        assert compute_start_dates({"ACC1": {"sync_watermark": None}}, 3) == {}
+
+
+class TestBuildTransactionOperations:
+    """Tests pour la fonction build_transaction_operations"""
+
+    def test_deduplicates_and_returns_latest_date(self):
+        """Les doublons d'un même lot sont éliminés et la date la plus récente est renvoyée"""
+        transactions = [
+            {"date": "2025-12-01T10:00:00", "description": "CB FNAC", "amount": -10.0},
+            {"date": "2025-12-01T18:00:00", "description": "CB FNAC", "amount": -10.0},
+            {"date": "2025-12-03T00:00:00", "description": "SALAIRE", "amount": 2000.0}
+        ]
+        operations, latest_date = build_transaction_operations(
+            transactions, "ACC1", ObjectId(), ObjectId(), ObjectId(), datetime.now()
+        )
+
+        assert len(operations) == 2
+        assert latest_date == datetime(2025, 12, 3)
+        document = operations[0]._doc["$setOnInsert"]
+        assert document["amount"] == 10.0
+        assert document["type"] == "expense"
+        assert operations[0]._upsert is True
+
+    def test_categorizes_with_rule_set(self):
+        """Les transactions sont catégorisées par les règles actives avant l'écriture"""
+        category_id = ObjectId()
+        rule_set = CompiledRuleSet([{"pattern": "fnac", "match_type": "contains", "category_id": str(category_id)}])
+        operations, _ = build_transaction_operations(
+            [{"date": "2025-12-01T10:00:00", "description": "CB FNAC", "amount": -10.0}],
+            "ACC1", ObjectId(), ObjectId(), ObjectId(), datetime.now(), rule_set
+        )
+
+        assert operations[0]._doc["$setOnInsert"]["category_id"] == category_id
+
+
+class TestSyncConnection:
+    """Tests pour la fonction sync_connection"""
+
+    @pytest.mark.asyncio
+    async def test_incremental_sync(self):
+        """Le connecteur reçoit les dates de début et les écritures sont groupées"""
+        connection_id = ObjectId()
+        account_id = ObjectId()
+        watermark = datetime.now() - timedelta(days=4)
+        db, collections = make_db([
+            {"_id": account_id, "external_id": "FR7612345678901234567890123", "sync_watermark": watermark}
+        ])
+
+        connector = BoursobankMockConnector()
+        session = {
+            "login_success": True,
+            "accounts": await connector.get_accounts(),
+            "transactions": {
+                "FR7612345678901234567890123": await connector.get_transactions(
+                    "FR7612345678901234567890123", start_date=watermark - timedelta(days=3)
+                ),
+                "FR7698765432109876543210987": await connector.get_transactions(
+                    "FR7698765432109876543210987"
+                )
+            }
+        }
+        executor = Mock()
+        executor.run_session = AsyncMock(return_value=session)
+
+        with patch("app.services.bank_sync.decrypt_credentials", return_value={}):
+            result = await sync_connection(
+                db,
+                {"_id": connection_id, "user_id": ObjectId(), "bank": "boursobank", "connection_type": "mock"},
+                executor=executor
+            )
+
+        assert result.success is True
+        assert result.updated_accounts == 2
+        # Seules les transactions postérieures à la date de début sont récupérées
+        assert result.new_transactions == 5 + 3
+
+        start_dates = executor.run_session.call_args.kwargs["start_dates"]
+        assert start_dates == {"FR7612345678901234567890123": watermark - timedelta(days=3)}
+
+        # Un bulk_write de transactions par compte, un seul pour les comptes
+        assert collections["transactions"].bulk_write.await_count == 2
+        assert collections["bank_accounts"].bulk_write.await_count == 1
+        account_operations = collections["bank_accounts"].bulk_write.call_args.args[0]
+        assert account_operations[0]._filter == {"_id": account_id}
+        assert account_operations[0]._doc["$set"]["sync_watermark"] > watermark
+
+    @pytest.mark.asyncio
+    async def test_synced_transactions_in_next_delta(self, monkeypatch):
+        """updated_at est en UTC : la transaction synchronisée entre dans la fenêtre du delta suivant"""
+        # Hôte hors UTC : une heure locale naïve sortirait de la fenêtre [since, until[
+        monkeypatch.setenv("TZ", "America/New_York")
+        time.tzset()
+        try:
+            db, collections = make_db([])
+            connector = BoursobankMockConnector()
+            executor = Mock()
+            executor.run_session = AsyncMock(return_value={
+                "login_success": True,
+                "accounts": [(await connector.get_accounts())[0]],
+                "transactions": {
+                    "FR7612345678901234567890123": await connector.get_transactions("FR7612345678901234567890123")
+                }
+            })
+            since = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+            with patch("app.services.bank_sync.decrypt_credentials", return_value={}):
+                await sync_connection(
+                    db,
+                    {"_id": ObjectId(), "user_id": ObjectId(), "bank": "boursobank", "connection_type": "mock"},
+                    executor=executor
+                )
+            until = datetime.now(timezone.utc) + timedelta(seconds=settings.SYNC_CLOCK_SKEW_SECONDS + 1)
+        finally:
+            monkeypatch.delenv("TZ")
+            time.tzset()
+
+        operations = collections["transactions"].bulk_write.call_args.args[0]
+        updated_at = operations[0]._doc["$setOnInsert"]["updated_at"]
+        query = keyset_filter(ObjectId(), "updated_at", _from_millis(_to_millis(since)), _from_millis(_to_millis(until)), None)
+        assert query["updated_at"]["$gte"] <= updated_at < query["updated_at"]["$lt"]
+
+    @pytest.mark.asyncio
+    async def test_login_failure(self):
+        """Un échec de connexion n'écrit rien"""
+        db, collections = make_db([])
+        executor = Mock()
+        executor.run_session = AsyncMock(
+            return_value={"login_success": False, "accounts": [], "transactions": {}}
+        )
+
+        with patch("app.services.bank_sync.decrypt_credentials", return_value={}):
+            result = await sync_connection(
+                db,
+                {"_id": ObjectId(), "user_id": ObjectId(), "bank": "cic", "connection_type": "mock"},
+                executor=executor
+            )
+
+        assert result.success is False
+        collections["transactions"].bulk_write.assert_not_awaited()
+        collections["bank_accounts"].bulk_write.assert_not_awaited()
+
+
+class TestSyncConnections:
+    """Tests pour la fonction sync_connections"""
+
+    @pytest.mark.asyncio
+    async def test_failure_isolation(self):
+        """Une connexion en échec n'interrompt pas les autres"""
+        connections = [{"_id": ObjectId(), "bank": name} for name in ("cic", "boursobank", "cic")]
+
+        async def fake_sync(db, connection, executor, connector_factory):
+            if connection is connections[1]:
+                raise ConnectorTimeoutError("300s")
+            if connection is connections[2]:
+                raise RuntimeError("panne")
+            return SyncResult(success=True, new_transactions=4, updated_accounts=2)
+
+        with patch("app.services.bank_sync.sync_connection", side_effect=fake_sync):
+            result = await sync_connections(Mock(), connections, max_concurrency=2)
+
+        assert result.success is False
+        assert result.succeeded == 1
+        assert result.failed == 2
+        assert result.new_transactions == 4
+        assert [c.connection_id for c in result.connections] == [str(c["_id"]) for c in connections]
+        assert "Délai" in result.connections[1].error
+        assert "panne" in result.connections[2].error
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """Le nombre de synchronisations simultanées est borné par le sémaphore"""
+        active = 0
+        max_active = 0
+
+        async def fake_sync(db, connection, executor, connector_factory):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return SyncResult(success=True)
+
+        with patch("app.services.bank_sync.sync_connection", side_effect=fake_sync):
+            result = await sync_connections(
+                Mock(), [{"_id": ObjectId()} for _ in range(6)], max_concurrency=2
+            )
+
+        assert result.succeeded == 6
+        assert max_active == 2
+
+
+class TestScalableMockConnector:
+    """Tests pour ScalableMockConnector"""
+
+    @pytest.mark.asyncio
+    async def test_volume_and_start_date(self):
+        """Le connecteur produit N comptes × M transactions et respecte la date de début"""
+        connector = ScalableMockConnector(accounts=3, transactions_per_account=50, days=50)
+        accounts = await connector.get_accounts()
+        assert len(accounts) == 3
+
+        transactions = await connector.get_transactions(accounts[0]["id"])
+        assert len(transactions) == 50
+        # Données identiques d'une session à l'autre
+        assert transactions == await connector.get_transactions(accounts[0]["id"])
+
+        start_date = datetime.now() - timedelta(days=10)
+        recent = await connector.get_transactions(accounts[0]["id"], start_date=start_date)
+        assert 0 < len(recent) < 50
+        assert all(datetime.fromisoformat(t["date"]) >= start_date for t in recent)
@@ -0,0 +1,194 @@
+"""
+Tests unitaires pour app/services/budget_alerts.py
+
+Ces tests vérifient les seuils atteints, la déduplication des alertes par
+budget, période et seuil, l'événement publié à leur création et la
+suppression des alertes dont le seuil n'est plus atteint.
+"""
+
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.routers.dashboard import get_budget_alerts
+from app.services.budget_alerts import reached_thresholds, update_alerts
+from app.services.events import BUDGET_THRESHOLD
+
+
+USER_ID = ObjectId()
+BUDGET_ID = ObjectId()
+CATEGORY_ID = ObjectId()
+PERIOD = {
+    "user_id": USER_ID,
+    "budget_id": BUDGET_ID,
+    "category_ids": [CATEGORY_ID],
+    "period_start": datetime(2025, 11, 27),
+    "period_end": datetime(2025, 12, 27),
+    "amount": 200.0,
+    "spent": 210.0,
+}
+
+
+def make_db(existing=None):
+    alerts_collection = Mock()
+    alerts_collection.find_one_and_update = AsyncMock(return_value=existing)
+    alerts_collection.delete_many = AsyncMock()
+    alerts_collection.update_many = AsyncMock()
+    db = Mock()
+    db.get_collection = AsyncMock(return_value=alerts_collection)
+    return db, alerts_collection
+
+
+class TestReachedThresholds:
+    """Tests pour reached_thresholds"""
+
+    def test_thresholds(self):
+        with patch("app.services.budget_alerts.settings") as settings:
+            settings.BUDGET_ALERT_THRESHOLDS = [80, 100]
+            assert reached_thresholds(200.0, 150.0) == []
+            assert reached_thresholds(200.0, 160.0) == [80]
+            assert reached_thresholds(200.0, 200.0) == [80, 100]
+            assert reached_thresholds(0, 50.0) == []
+
+
+class TestRecordAlerts:
+    """Tests pour update_alerts"""
+
+    @pytest.mark.asyncio
+    async def test_new_alerts_publish_events(self):
+        db, alerts = make_db(existing=None)
+
+        with patch("app.services.budget_alerts.settings") as settings, \
+                patch("app.services.budget_alerts.event_bus") as event_bus:
+            settings.BUDGET_ALERT_THRESHOLDS = [80, 100]
+            created = await update_alerts(db, PERIOD)
+
+        assert [alert["threshold"] for alert in created] == [80, 100]
+        query, update = alerts.find_one_and_update.await_args_list[0].args
+        assert query == {"budget_id": BUDGET_ID, "period_start": PERIOD["period_start"], "threshold": 80}
+        assert update["$setOnInsert"]["category_id"] == CATEGORY_ID
+        assert alerts.find_one_and_update.await_args_list[0].kwargs["upsert"] is True
+        assert event_bus.publish.call_count == 2
+        user_id, event = event_bus.publish.call_args_list[1].args
+        assert user_id == USER_ID
+        assert event["type"] == BUDGET_THRESHOLD
+        assert event["threshold"] == 100
+        assert event["budget_id"] == str(BUDGET_ID)
+
+    @pytest.mark.asyncio
+    async def test_existing_alert_is_not_repeated(self):
+        db, alerts = make_db(existing={"_id": ObjectId()})
+
+        with patch("app.services.budget_alerts.settings") as settings, \
+                patch("app.services.budget_alerts.event_bus") as event_bus:
+            settings.BUDGET_ALERT_THRESHOLDS = [100]
+            created = await update_alerts(db, PERIOD)
+
+        assert created == []
+        event_bus.publish.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_only_crossed_thresholds(self):
+        db, alerts = make_db(existing=None)
+
+        with patch("app.services.budget_alerts.settings") as settings, \
+                patch("app.services.budget_alerts.event_bus"):
+            settings.BUDGET_ALERT_THRESHOLDS = [80, 100]
+            # 80 % déjà atteint avant l'écriture : seul 100 % est évalué
+            created = await update_alerts(db, PERIOD, previous_spent=170.0)
+            # Aucun seuil franchi : aucune alerte créée ni supprimée
+            none_crossed = await update_alerts(db, {**PERIOD, "spent": 215.0}, previous_spent=210.0)
+
+        assert [alert["threshold"] for alert in created] == [100]
+        assert none_crossed == []
+        assert alerts.find_one_and_update.await_count == 1
+        alerts.delete_many.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_existing_alerts_follow_spent(self):
+        """Les alertes existantes reflètent le montant dépensé de la dernière écriture"""
+        db, alerts = make_db(existing={"_id": ObjectId()})
+
+        with patch("app.services.budget_alerts.settings") as settings, \
+                patch("app.services.budget_alerts.event_bus"):
+            settings.BUDGET_ALERT_THRESHOLDS = [80, 100]
+            await update_alerts(db, {**PERIOD, "spent": 190.0}, previous_spent=164.0)
+
+        alerts.update_many.assert_awaited_once_with(
+            {"budget_id": BUDGET_ID, "period_start": PERIOD["period_start"], "threshold": {"$in": [80]}},
+            {"$set": {"amount": 200.0, "spent": 190.0, "percentage": 95.0}}
+        )
+        alerts.find_one_and_update.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_no_threshold_reached_without_database(self):
+        db, alerts = make_db(existing=None)
+
+        with patch("app.services.budget_alerts.settings") as settings:
+            settings.BUDGET_ALERT_THRESHOLDS = [80, 100]
+            await update_alerts(db, {**PERIOD, "spent": 100.0}, previous_spent=90.0)
+
+        db.get_collection.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_decrease_resolves_alerts(self):
+        """Dépense réduite sous 100 % : l'alerte 100 % est supprimée, celle de 80 % reste"""
+        db, alerts = make_db(existing=None)
+
+        with patch("app.services.budget_alerts.settings") as settings, \
+                patch("app.services.budget_alerts.event_bus") as event_bus:
+            settings.BUDGET_ALERT_THRESHOLDS = [80, 100]
+            created = await update_alerts(db, {**PERIOD, "spent": 170.0}, previous_spent=210.0)
+
+        assert created == []
+        alerts.delete_many.assert_awaited_once_with({
+            "budget_id": BUDGET_ID, "period_start": PERIOD["period_start"], "threshold": {"$nin": [80]}
+        })
+        alerts.find_one_and_update.assert_not_awaited()
+        event_bus.publish.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_raised_amount_resolves_alerts(self):
+        """Période recalculée après un budget relevé : plus aucun seuil atteint"""
+        db, alerts = make_db(existing=None)
+
+        with patch("app.services.budget_alerts.settings") as settings, \
+                patch("app.services.budget_alerts.event_bus"):
+            settings.BUDGET_ALERT_THRESHOLDS = [80, 100]
+            created = await update_alerts(db, {**PERIOD, "amount": 400.0})
+
+        assert created == []
+        assert alerts.delete_many.await_args.args[0]["threshold"] == {"$nin": []}
+
+
+class TestGetBudgetAlerts:
+    """Tests pour GET /api/dashboard/alerts"""
+
+    @pytest.mark.asyncio
+    async def test_current_alerts(self):
+        alert = {
+            "_id": ObjectId(), "budget_id": BUDGET_ID, "category_id": CATEGORY_ID, "threshold": 100,
+            "amount": 200.0, "spent": 210.0, "percentage": 105.0, "period_start": PERIOD["period_start"],
+            "period_end": PERIOD["period_end"], "created_at": datetime(2025, 12, 3)
+        }
+        alerts_collection = Mock()
+        alerts_collection.find = Mock(return_value=Mock(sort=Mock(return_value=Mock(to_list=AsyncMock(return_value=[alert])))))
+        categories_collection = Mock()
+        categories_collection.find = Mock(return_value=Mock(sort=Mock(return_value=Mock(to_list=AsyncMock(return_value=[
+            {"_id": CATEGORY_ID, "name": "Loisirs"}
+        ])))))
+        db = Mock()
+        db.get_collection = AsyncMock(side_effect=lambda name: {
+            "budget_alerts": alerts_collection,
+            "categories": categories_collection
+        }[name])
+
+        result = await get_budget_alerts(current_user={"_id": USER_ID}, db=db)
+
+        query = alerts_collection.find.call_args.args[0]
+        assert query["user_id"] == USER_ID
+        assert "$gt" in query["period_end"]
+        assert result["alerts"][0]["category_name"] == "Loisirs"
+        assert result["alerts"][0]["budget_id"] == str(BUDGET_ID)
+        assert result["alerts"][0]["threshold"] == 100
@@ -0,0 +1,86 @@
+"""
+Tests unitaires pour GET /api/budgets/history
+
+Ces tests vérifient le découpage des périodes selon billing_cycle_day,
+l'agrégation unique et le cumul des sous-catégories dans la matrice renvoyée.
+"""
+
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.routers.budgets import get_budgets_history, history_periods
+from app.services.budget_periods import EXPENSE_FILTER
+
+
+USER_ID = ObjectId()
+FOOD = ObjectId()
+GROCERIES = ObjectId()
+
+
+def make_db(budgets, rows):
+    budgets_collection = Mock()
+    budgets_collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=budgets)))
+    transactions_collection = Mock()
+    transactions_collection.aggregate = Mock(return_value=Mock(to_list=AsyncMock(return_value=rows)))
+    categories_collection = Mock()
+    categories_collection.find = Mock(return_value=Mock(sort=Mock(return_value=Mock(to_list=AsyncMock(return_value=[
+        {"_id": FOOD, "name": "Alimentation", "color": "#10b981"},
+        {"_id": GROCERIES, "name": "Courses", "color": "#10b981", "parent_id": str(FOOD)},
+    ])))))
+
+    db = Mock()
+    db.get_collection = AsyncMock(side_effect=lambda name: {
+        "budgets": budgets_collection,
+        "transactions": transactions_collection,
+        "categories": categories_collection
+    }[name])
+    return db, transactions_collection
+
+
+def frozen_now():
+    mock_datetime = patch("app.routers.budgets.datetime").start()
+    mock_datetime.utcnow.return_value = datetime(2025, 12, 2)
+    mock_datetime.side_effect = lambda *args, **kwargs: datetime(*args, **kwargs)
+    return mock_datetime
+
+
+class TestBudgetHistory:
+    """Tests pour history_periods et get_budgets_history"""
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def test_periods_follow_billing_cycle(self):
+        frozen_now()
+        periods = history_periods("monthly", 27, 3)
+        assert [(period["key"], period["start"], period["end"]) for period in periods] == [
+            ("2025-09", datetime(2025, 9, 27), datetime(2025, 10, 27)),
+            ("2025-10", datetime(2025, 10, 27), datetime(2025, 11, 27)),
+            ("2025-11", datetime(2025, 11, 27), datetime(2025, 12, 27)),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_single_aggregation_with_rollup(self):
+        frozen_now()
+        budget = {"_id": ObjectId(), "category_id": FOOD, "amount": 400.0, "period_type": "monthly", "is_recurring": True}
+        db, transactions = make_db([budget], [
+            {"_id": {"category_id": FOOD, "period": "2025-10"}, "total": 100.0},
+            {"_id": {"category_id": GROCERIES, "period": "2025-10"}, "total": 250.5},
+            {"_id": {"category_id": GROCERIES, "period": "2025-11"}, "total": 80.0},
+        ])
+
+        result = await get_budgets_history(3, "monthly", db, {"_id": USER_ID, "billing_cycle_day": 27})
+
+        assert transactions.aggregate.call_count == 1
+        pipeline = transactions.aggregate.call_args.args[0]
+        assert pipeline[0]["$match"]["date"] == {"$gte": datetime(2025, 9, 27), "$lt": datetime(2025, 12, 27)}
+        # Mêmes dépenses que les périodes matérialisées (type seul compris)
+        assert pipeline[0]["$match"]["$or"] == EXPENSE_FILTER["$or"]
+        assert pipeline[1]["$group"]["_id"]["period"]["$dateToString"]["date"] == {"$subtract": ["$date", 26 * 24 * 3600 * 1000]}
+
+        assert [period["label"] for period in result["periods"]] == ["09/2025", "10/2025", "11/2025"]
+        assert result["budgets"][0]["spent"] == [0.0, 350.5, 80.0]
+        assert result["budgets"][0]["amount"] == [400.0, 400.0, 400.0]
+        assert result["totals"] == {"budget": [400.0, 400.0, 400.0], "spent": [0.0, 350.5, 80.0]}
@@ -0,0 +1,225 @@
+"""
+Tests unitaires pour app/services/budget_periods.py
+
+Ces tests vérifient la lecture des périodes à jour sans agrégation, leur
+recalcul (sous-catégories comprises) et les ajustements $inc à l'écriture,
+ainsi que l'évaluation des alertes qui en découle.
+"""
+
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.services.budget_periods import (
+    EXPENSE_FILTER,
+    apply_transaction_changes,
+    reconcile_current_periods,
+    reconcile_periods
+)
+from app.services.category_tree import CategoryTree
+from app.services.change_tracking import notify_transactions_changed
+
+
+USER_ID = ObjectId()
+FOOD = ObjectId()
+GROCERIES = ObjectId()
+LEISURE = ObjectId()
+START = datetime(2025, 11, 27)
+END = datetime(2025, 12, 27)
+
+TREE = CategoryTree([
+    {"_id": FOOD, "name": "Alimentation"},
+    {"_id": GROCERIES, "name": "Courses", "parent_id": str(FOOD)},
+    {"_id": LEISURE, "name": "Loisirs"},
+])
+BUDGETS = [
+    {"_id": ObjectId(), "category_id": FOOD, "amount": 500.0, "period_type": "monthly"},
+    {"_id": ObjectId(), "category_id": LEISURE, "amount": 100.0, "period_type": "monthly"},
+]
+
+
+def make_db(periods, totals=(), budgets=()):
+    periods_collection = Mock()
+    periods_collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=periods)))
+    periods_collection.bulk_write = AsyncMock(
+        side_effect=lambda operations, ordered: Mock(matched_count=len(operations), upserted_count=0)
+    )
+    periods_collection.update_many = AsyncMock()
+    transactions_collection = Mock()
+    transactions_collection.aggregate = Mock(return_value=Mock(to_list=AsyncMock(return_value=list(totals))))
+    alerts_collection = Mock(delete_many=AsyncMock(), update_many=AsyncMock(), find_one_and_update=AsyncMock())
+    budgets_collection = Mock()
+    budgets_collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=list(budgets))))
+    users_collection = Mock(find_one=AsyncMock(return_value={"billing_cycle_day": 27}))
+
+    db = Mock()
+    db.get_collection = AsyncMock(side_effect=lambda name: {
+        "budget_periods": periods_collection,
+        "transactions": transactions_collection,
+        "budget_alerts": alerts_collection,
+        "budgets": budgets_collection,
+        "users": users_collection
+    }[name])
+    return db, periods_collection, transactions_collection
+
+
+class TestReconcilePeriods:
+    """Tests pour reconcile_periods"""
+
+    @pytest.mark.asyncio
+    async def test_fresh_periods_without_aggregation(self):
+        db, periods, transactions = make_db([
+            {"budget_id": BUDGETS[0]["_id"], "category_ids": [FOOD, GROCERIES], "amount": 500.0, "spent": 120.0, "stale": False},
+            {"budget_id": BUDGETS[1]["_id"], "category_ids": [LEISURE], "amount": 100.0, "spent": 30.0, "stale": False},
+        ])
+
+        spent = await reconcile_periods(db, USER_ID, BUDGETS, START, END, TREE)
+
+        assert spent == {str(BUDGETS[0]["_id"]): 120.0, str(BUDGETS[1]["_id"]): 30.0}
+        transactions.aggregate.assert_not_called()
+        periods.bulk_write.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_stale_and_missing(self):
+        db, periods, transactions = make_db(
+            [{"budget_id": BUDGETS[0]["_id"], "category_ids": [FOOD, GROCERIES], "amount": 500.0, "spent": 1.0, "stale": True}],
+            totals=[{"_id": FOOD, "total": 40.0}, {"_id": GROCERIES, "total": 60.0}, {"_id": LEISURE, "total": 15.0}]
+        )
+
+        spent = await reconcile_periods(db, USER_ID, BUDGETS, START, END, TREE)
+
+        # Une seule agrégation pour les deux budgets, sous-catégories comprises
+        assert transactions.aggregate.call_count == 1
+        # Dépenses : is_expense ou, à défaut, type == "expense" (transactions synchronisées)
+        match = transactions.aggregate.call_args.args[0][0]["$match"]
+        assert match["$or"] == EXPENSE_FILTER["$or"]
+        assert spent == {str(BUDGETS[0]["_id"]): 100.0, str(BUDGETS[1]["_id"]): 15.0}
+        operations = periods.bulk_write.await_args.args[0]
+        assert [operation._doc["$set"]["spent"] for operation in operations] == [100.0, 15.0]
+        # Écriture conditionnée à la version lue (absente ici)
+        assert operations[0]._filter["version"] is None
+        assert operations[0]._doc["$inc"] == {"version": 1}
+        assert operations[0]._upsert is False
+        assert operations[1]._upsert is True
+
+    @pytest.mark.asyncio
+    async def test_concurrent_increment_retries(self):
+        """Un $inc entre l'agrégation et l'écriture : la période est relue et recalculée"""
+        stale = {"budget_id": BUDGETS[1]["_id"], "category_ids": [LEISURE], "amount": 100.0, "spent": 1.0, "stale": True}
+        db, periods, transactions = make_db([], totals=[{"_id": LEISURE, "total": 15.0}])
+        periods.find = Mock(side_effect=[
+            Mock(to_list=AsyncMock(return_value=[{**stale, "version": 4}])),
+            Mock(to_list=AsyncMock(return_value=[{**stale, "version": 5}])),
+        ])
+        periods.bulk_write = AsyncMock(side_effect=[
+            Mock(matched_count=0, upserted_count=0),
+            Mock(matched_count=1, upserted_count=0),
+        ])
+
+        spent = await reconcile_periods(db, USER_ID, BUDGETS[1:], START, END, TREE)
+
+        assert spent == {str(BUDGETS[1]["_id"]): 15.0}
+        assert transactions.aggregate.call_count == 2
+        assert [call.args[0][0]._filter["version"] for call in periods.bulk_write.await_args_list] == [4, 5]
+        periods.update_many.assert_not_awaited()
+
+
+class TestApplyTransactionChanges:
+    """Tests pour apply_transaction_changes"""
+
+    @pytest.mark.asyncio
+    async def test_recategorized_expense(self):
+        food_period, leisure_period = ObjectId(), ObjectId()
+        db, periods, _ = make_db([])
+        periods.find = Mock(side_effect=lambda query, projection: Mock(to_list=AsyncMock(return_value=[
+            {"_id": food_period if query["category_ids"] == FOOD else leisure_period}
+        ])))
+        periods.find_one_and_update = AsyncMock(return_value={"stale": True})
+        day = datetime(2025, 12, 2)
+        before = {"category_id": FOOD, "date": day, "amount": 25.0, "is_expense": True}
+        after = {**before, "category_id": LEISURE}
+
+        await apply_transaction_changes(db, USER_ID, [(before, after), (None, {**before, "is_expense": False})])
+
+        assert [call.args[0]["category_ids"] for call in periods.find.call_args_list] == [FOOD, LEISURE]
+        assert periods.find.call_args_list[0].args[0]["period_start"] == {"$lte": day}
+        assert [(call.args[0]["_id"], call.args[1]) for call in periods.find_one_and_update.await_args_list] == [
+            (food_period, {"$inc": {"spent": -25.0, "version": 1}}),
+            (leisure_period, {"$inc": {"spent": 25.0, "version": 1}}),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_changes_update_alerts(self):
+        period = {"_id": ObjectId(), "spent": 95.0, "amount": 100.0, "stale": False}
+        db, periods, _ = make_db([period])
+        periods.find_one_and_update = AsyncMock(return_value=period)
+        expense = {"category_id": LEISURE, "date": datetime(2025, 12, 2), "amount": 20.0, "is_expense": True}
+
+        with patch("app.services.budget_periods.update_alerts", new=AsyncMock()) as update_alerts:
+            await apply_transaction_changes(db, USER_ID, [(None, expense)])
+            await apply_transaction_changes(db, USER_ID, [(expense, None)])
+
+        # Hausse comme baisse des dépenses : seuils comparés depuis le montant précédent
+        assert [call.kwargs["previous_spent"] for call in update_alerts.await_args_list] == [75.0, 115.0]
+
+    @pytest.mark.asyncio
+    async def test_synced_expense_with_type_only(self):
+        """Une transaction synchronisée (type sans is_expense) compte comme dépense"""
+        db, periods, _ = make_db([{"_id": ObjectId()}])
+        periods.find_one_and_update = AsyncMock(return_value={"stale": True})
+        synced = {"category_id": LEISURE, "date": datetime(2025, 12, 2), "amount": 12.0, "type": "expense"}
+        income = {**synced, "type": "income"}
+
+        await apply_transaction_changes(db, USER_ID, [(None, synced), (None, income)])
+
+        assert [call.args[1] for call in periods.find_one_and_update.await_args_list] == [{"$inc": {"spent": 12.0, "version": 1}}]
+
+    @pytest.mark.asyncio
+    async def test_first_write_of_period_reconciles(self):
+        """Sans période pour la date écrite, les périodes en cours sont recalculées aussitôt"""
+        db, periods, _ = make_db([])
+        periods.find_one_and_update = AsyncMock()
+        expense = {"category_id": GROCERIES, "date": datetime(2025, 12, 2), "amount": 20.0, "is_expense": True}
+
+        with patch("app.services.budget_periods.reconcile_current_periods", new=AsyncMock()) as reconcile:
+            await apply_transaction_changes(db, USER_ID, [(None, expense)])
+
+        periods.find_one_and_update.assert_not_awaited()
+        reconcile.assert_awaited_once_with(db, USER_ID, {GROCERIES})
+
+
+class TestReconcileCurrentPeriods:
+    """Tests pour reconcile_current_periods"""
+
+    @pytest.mark.asyncio
+    async def test_only_budgets_covering_categories(self):
+        db, _, _ = make_db([], budgets=BUDGETS)
+        with patch("app.services.budget_periods.CategoryTree.load", new=AsyncMock(return_value=TREE)), \
+                patch("app.services.budget_periods.reconcile_periods", new=AsyncMock()) as reconcile, \
+                patch("app.routers.budgets.get_period_dates", return_value=(START, END)) as period_dates:
+            await reconcile_current_periods(db, USER_ID, {GROCERIES})
+            await reconcile_current_periods(db, USER_ID)
+
+        # Courses est sous Alimentation : seul le budget Alimentation est concerné
+        period_dates.assert_called_with("monthly", 27)
+        assert [call.args[2] for call in reconcile.await_args_list] == [[BUDGETS[0]], BUDGETS]
+        assert reconcile.await_args_list[0].args[3:5] == (START, END)
+
+    @pytest.mark.asyncio
+    async def test_notify_marks_stale_without_changes(self):
+        db = Mock()
+        db.get_collection = AsyncMock(return_value=Mock(find_one_and_update=AsyncMock(return_value={"data_version": 8})))
+        with patch("app.services.change_tracking.mark_stale", new=AsyncMock()) as mark_stale, \
+                patch("app.services.change_tracking.reconcile_current_periods", new=AsyncMock()) as reconcile, \
+                patch("app.services.change_tracking.apply_transaction_changes", new=AsyncMock()) as apply_changes:
+            await notify_transactions_changed(db, USER_ID, "imported", 10)
+            version = await notify_transactions_changed(db, USER_ID, "deleted", 1, changes=[({"amount": 1}, None)])
+
+        # data_version après l'incrément, pour suggestion_cache.record_write
+        assert version == 8
+
+        # Écriture en masse : périodes en cours recalculées (et alertes évaluées) aussitôt
+        mark_stale.assert_awaited_once_with(db, USER_ID)
+        reconcile.assert_awaited_once_with(db, USER_ID)
+        apply_changes.assert_awaited_once_with(db, USER_ID, [({"amount": 1}, None)])
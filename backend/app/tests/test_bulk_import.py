@@ -0,0 +1,157 @@
+"""
+Tests unitaires pour l'import en masse (app/services/bulk_import.py,
+app/utils/json_stream.py et POST /api/transactions/bulk)
+"""
+
+import json
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.core.database import get_db
+from app.main import app
+from app.services.auth import get_current_user
+from app.services.bulk_import import BulkImporter
+from app.services.rule_engine import CompiledRuleSet, compile_rules
+from app.utils.json_stream import JSONStreamError, iter_json_array, iter_ndjson
+
+
+USER_ID = ObjectId()
+FOOD = ObjectId()
+RULES = compile_rules([{"pattern": "carrefour", "match_type": "contains", "category_id": str(FOOD), "exceptions": []}])
+
+
+class AsyncCursor:
+    """Curseur Motor simulé (itération asynchrone)"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        self._iterator = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def make_collection(existing_external_ids=()):
+    collection = Mock()
+    collection.find = Mock(side_effect=lambda *args: AsyncCursor(
+        [{"external_id": external_id} for external_id in existing_external_ids]
+    ))
+    collection.insert_many = AsyncMock(side_effect=lambda documents, ordered: Mock(inserted_ids=[None] * len(documents)))
+    return collection
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+class TestJSONStream:
+    """Tests pour iter_json_array et iter_ndjson"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("size", [1, 7, 4096])
+    async def test_array_any_chunking(self, size):
+        items = [{"description": f"Café n°{index}", "amount": index * 1.5} for index in range(50)] + [12345]
+        data = json.dumps(items, ensure_ascii=False).encode()
+        assert await collect(iter_json_array(chunked(data, size))) == items
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("data", [b"{}", b"[1,", b"[1 2]", b"[1] x", b"[1,]"])
+    async def test_array_invalid(self, data):
+        with pytest.raises(JSONStreamError):
+            await collect(iter_json_array(chunked(data, 1)))
+
+    @pytest.mark.asyncio
+    async def test_ndjson(self):
+        data = b'{"a": 1}\n\n{"a": 2}\r\n{"a": 3}'
+        assert await collect(iter_ndjson(chunked(data, 3))) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+class TestBulkImporter:
+    """Tests pour BulkImporter"""
+
+    @pytest.mark.asyncio
+    async def test_batches_duplicates_rules_and_errors(self):
+        collection = make_collection(existing_external_ids=["x1"])
+        importer = BulkImporter(collection, USER_ID, RULES, batch_size=2)
+        rows = [
+            {"date": "2025-01-02", "description": "CB Carrefour", "amount": "12.5", "external_id": "x1"},
+            {"date": "2025-01-03", "description": "CB Carrefour", "amount": 8, "external_id": "x2"},
+            {"date": "03/01/2025", "description": "Date invalide", "amount": 1},
+            {"date": "2025-01-04", "description": "Loyer", "amount": 900, "external_id": "x2"},
+            {"date": "2025-01-05", "description": "Loyer", "amount": 900},
+        ]
+        for row in rows:
+            await importer.add(row)
+        await importer.flush()
+
+        report = importer.report()
+        assert report["imported"] == 2
+        assert report["skipped"] == 2
+        assert report["categorized"] == 1
+        assert report["duplicates"] == [{"row": 1, "external_id": "x1"}, {"row": 4, "external_id": "x2"}]
+        assert report["errors"] == [{"row": 3, "error": "Date invalide: 03/01/2025"}]
+        # Une requête de dédoublonnage et un insert_many par lot
+        assert collection.find.call_count == 2
+        assert collection.insert_many.await_count == 2
+        inserted = collection.insert_many.await_args_list[0].args[0][0]
+        assert inserted["category_id"] == FOOD
+        assert inserted["search_tokens"] == ["CB", "CARREFOUR"]
+
+
+class TestBulkEndpoint:
+    """Tests pour POST /api/transactions/bulk (formats du corps)"""
+
+    def setup_method(self):
+        self.collection = make_collection()
+        db = Mock()
+        db.get_collection = AsyncMock(return_value=self.collection)
+        app.dependency_overrides[get_current_user] = lambda: {"_id": USER_ID}
+        app.dependency_overrides[get_db] = lambda: db
+        self.client = TestClient(app)
+
+    def teardown_method(self):
+        app.dependency_overrides.clear()
+
+    def post(self, content, content_type, params=None):
+        with patch("app.routers.transactions.rule_set_cache.get", new=AsyncMock(return_value=CompiledRuleSet([]))), \
+                patch("app.routers.transactions.notify_transactions_changed", new=AsyncMock()):
+            return self.client.post(
+                "/api/transactions/bulk",
+                content=content,
+                params=params,
+                headers={"Content-Type": content_type}
+            )
+
+    def test_legacy_envelope(self):
+        account_id = str(ObjectId())
+        body = json.dumps({"transactions": [{"date": "2025-01-02", "description": "A"}], "bank_account_id": account_id})
+        response = self.post(body, "application/json")
+        assert response.status_code == 200
+        assert response.json()["imported"] == 1
+        document = self.collection.insert_many.await_args.args[0][0]
+        assert document["bank_account_id"] == ObjectId(account_id)
+
+    def test_array_and_ndjson(self):
+        rows = [{"date": "2025-01-02", "description": "A"}, {"date": "2025-01-03", "description": "B"}]
+        assert self.post(json.dumps(rows), "application/json").json()["imported"] == 2
+        ndjson = "\n".join(json.dumps(row) for row in rows)
+        assert self.post(ndjson, "application/x-ndjson").json()["imported"] == 2
+
+    def test_empty_and_invalid(self):
+        assert self.post("[]", "application/json").status_code == 400
+        assert self.post("[{", "application/json").status_code == 400
+        assert self.post("[]", "application/json", {"category_id": "abc"}).status_code == 400
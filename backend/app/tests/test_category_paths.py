@@ -0,0 +1,153 @@
+"""
+Tests unitaires pour app/services/category_paths.py
+
+Ces tests vérifient le calcul des chemins matérialisés (ancestors,
+path_label), leur recalcul sur le sous-arbre d'une catégorie renommée ou
+déplacée et leur sérialisation dans les réponses.
+"""
+
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, AsyncMock
+
+from app.core.config import settings
+from app.routers.categories import prepare_mongodb_document_for_response
+from app.routers.transactions import _build_transaction_response
+from app.schemas import Category, TransactionWithCategory
+from app.services.category_paths import category_path, compute_paths, refresh_subtree_paths, subtree_query
+from app.services.sync_changes import _from_millis, _to_millis, keyset_filter
+
+
+USER_ID = ObjectId()
+HOME = ObjectId()
+RENT = ObjectId()
+ENERGY = ObjectId()
+POWER = ObjectId()
+
+
+class TestComputePaths:
+    """Tests pour category_path et compute_paths"""
+
+    def test_category_path(self):
+        assert category_path("Logement") == {"ancestors": [], "path_label": "Logement"}
+        parent = {"_id": HOME, "name": "Logement", "ancestors": [], "path_label": "Logement"}
+        assert category_path("Loyer", parent) == {"ancestors": [HOME], "path_label": "Logement › Loyer"}
+
+    def test_paths_from_mixed_parent_ids(self):
+        paths = compute_paths([
+            {"_id": POWER, "name": "Électricité", "parent_id": ENERGY},
+            {"_id": ENERGY, "name": "Énergie", "parent_id": str(HOME)},
+            {"_id": HOME, "name": "Logement", "parent_id": None},
+        ])
+
+        assert paths[str(POWER)] == {"ancestors": [HOME, ENERGY], "path_label": "Logement › Énergie › Électricité"}
+        assert paths[str(HOME)]["ancestors"] == []
+
+    def test_cycle_and_missing_parent(self):
+        paths = compute_paths([
+            {"_id": RENT, "name": "Loyer", "parent_id": ObjectId()},
+            {"_id": ENERGY, "name": "Énergie", "parent_id": POWER},
+            {"_id": POWER, "name": "Électricité", "parent_id": ENERGY},
+        ])
+
+        assert paths[str(RENT)] == {"ancestors": [], "path_label": "Loyer"}
+        # Le cycle est rompu : aucune catégorie n'est sa propre ancêtre
+        assert paths[str(ENERGY)]["ancestors"] == [POWER]
+        assert paths[str(POWER)]["ancestors"] == []
+
+    def test_subtree_query(self):
+        assert subtree_query(str(HOME)) == {"$or": [{"_id": HOME}, {"ancestors": HOME}]}
+
+
+class TestRefreshSubtreePaths:
+    """Tests pour refresh_subtree_paths"""
+
+    @pytest.mark.asyncio
+    async def test_moved_category_updates_descendants(self):
+        """Énergie déplacée sous Logement : elle et Électricité sont réécrites"""
+        energy = {"_id": ENERGY, "name": "Énergie", "parent_id": str(HOME), "ancestors": [], "path_label": "Énergie"}
+        home = {"_id": HOME, "name": "Logement", "ancestors": [], "path_label": "Logement"}
+        power = {"_id": POWER, "name": "Électricité", "parent_id": ENERGY,
+                 "ancestors": [ENERGY], "path_label": "Énergie › Électricité"}
+        collection = Mock()
+        collection.find_one = AsyncMock(side_effect=[energy, home])
+        collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=[power])))
+        collection.bulk_write = AsyncMock()
+        db = Mock()
+        db.get_collection = AsyncMock(return_value=collection)
+
+        updated = await refresh_subtree_paths(db, USER_ID, ENERGY)
+
+        assert updated == 2
+        # Descendantes lues par l'index ancestors
+        assert collection.find.call_args.args[0] == {"user_id": USER_ID, "ancestors": ENERGY}
+        operations = collection.bulk_write.await_args.args[0]
+        assert [
+            {key: value for key, value in operation._doc["$set"].items() if key != "updated_at"}
+            for operation in operations
+        ] == [
+            {"ancestors": [HOME], "path_label": "Logement › Énergie"},
+            {"ancestors": [HOME, ENERGY], "path_label": "Logement › Énergie › Électricité"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_renamed_parent_child_in_next_delta(self):
+        """Parent renommé : la sous-catégorie entre dans la fenêtre du delta suivant"""
+        home = {"_id": HOME, "name": "Foyer", "ancestors": [], "path_label": "Logement"}
+        rent = {"_id": RENT, "name": "Loyer", "parent_id": HOME, "ancestors": [HOME], "path_label": "Logement › Loyer"}
+        collection = Mock()
+        collection.find_one = AsyncMock(return_value=home)
+        collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=[rent])))
+        collection.bulk_write = AsyncMock()
+        db = Mock()
+        db.get_collection = AsyncMock(return_value=collection)
+        since = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+        await refresh_subtree_paths(db, USER_ID, HOME)
+
+        until = datetime.now(timezone.utc) + timedelta(seconds=settings.SYNC_CLOCK_SKEW_SECONDS + 1)
+        query = keyset_filter(USER_ID, "updated_at", _from_millis(_to_millis(since)), _from_millis(_to_millis(until)), None)
+        child = collection.bulk_write.await_args.args[0][1]
+        assert child._filter == {"_id": RENT}
+        assert child._doc["$set"]["path_label"] == "Foyer › Loyer"
+        assert query["updated_at"]["$gte"] <= child._doc["$set"]["updated_at"] < query["updated_at"]["$lt"]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_paths_are_not_written(self):
+        home = {"_id": HOME, "name": "Logement", "ancestors": [], "path_label": "Logement"}
+        collection = Mock()
+        collection.find_one = AsyncMock(return_value=home)
+        collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=[])))
+        collection.bulk_write = AsyncMock()
+        db = Mock()
+        db.get_collection = AsyncMock(return_value=collection)
+
+        assert await refresh_subtree_paths(db, USER_ID, HOME) == 0
+        collection.bulk_write.assert_not_awaited()
+
+
+class TestSerialization:
+    """Les ancestors (ObjectId) sont renvoyés en chaînes"""
+
+    SUBCATEGORY = {
+        "_id": RENT, "name": "Loyer", "parent_id": str(HOME), "user_id": USER_ID,
+        "ancestors": [HOME], "path_label": "Logement › Loyer", "created_at": datetime(2025, 1, 1)
+    }
+
+    def test_transaction_with_subcategory(self):
+        transaction = {
+            "_id": ObjectId(), "user_id": USER_ID, "date": datetime(2025, 3, 1), "amount": 800.0,
+            "description": "LOYER MARS", "category_id": RENT, "is_expense": True
+        }
+
+        response = TransactionWithCategory.model_validate(
+            _build_transaction_response(transaction, self.SUBCATEGORY, None, None)
+        )
+
+        assert response.category.ancestors == [str(HOME)]
+        assert response.category.path_label == "Logement › Loyer"
+
+    def test_category_response(self):
+        category = Category.model_validate(prepare_mongodb_document_for_response(self.SUBCATEGORY))
+        assert category.ancestors == [str(HOME)]
@@ -0,0 +1,59 @@
+"""
+Tests unitaires pour app/services/category_tree.py
+
+Ces tests vérifient l'indexation des catégories par identifiant et par
+parent, quel que soit le type de parent_id stocké.
+"""
+
+from bson import ObjectId
+
+from app.services.category_tree import CategoryTree
+
+
+def make_tree():
+    parent_id, child_id, legacy_child_id = ObjectId(), ObjectId(), ObjectId()
+    categories = [
+        {"_id": parent_id, "name": "Alimentation", "parent_id": None},
+        {"_id": child_id, "name": "Courses", "parent_id": parent_id},
+        {"_id": legacy_child_id, "name": "Restaurant", "parent_id": str(parent_id)}
+    ]
+    return CategoryTree(categories), parent_id, child_id
+
+
+class TestCategoryTree:
+    """Tests pour la classe CategoryTree"""
+
+    def test_children_with_mixed_parent_ids(self):
+        """Les sous-catégories sont trouvées que parent_id soit un ObjectId ou une string"""
+        tree, parent_id, _ = make_tree()
+        assert [category["name"] for category in tree.children(parent_id)] == ["Courses", "Restaurant"]
+        assert tree.children(str(parent_id)) == tree.children(parent_id)
+
+    def test_labels(self):
+        """Le libellé d'une sous-catégorie inclut son parent"""
+        tree, parent_id, child_id = make_tree()
+        assert tree.label(child_id) == "Alimentation › Courses"
+        assert tree.label(str(parent_id)) == "Alimentation"
+        assert tree.label(ObjectId()) is None
+        assert tree.get(None) is None
+
+    def test_stored_paths(self):
+        """ancestors et path_label enregistrés sont utilisés pour les sous-arbres et libellés"""
+        home, energy, power = ObjectId(), ObjectId(), ObjectId()
+        tree = CategoryTree([
+            {"_id": home, "name": "Logement", "ancestors": [], "path_label": "Logement"},
+            {"_id": energy, "name": "Énergie", "parent_id": str(home), "ancestors": [home], "path_label": "Logement › Énergie"},
+            {"_id": power, "name": "Électricité", "parent_id": energy,
+             "ancestors": [home, energy], "path_label": "Logement › Énergie › Électricité"},
+        ])
+        assert tree.subtree_ids(home) == [home, energy, power]
+        assert tree.subtree_ids(str(energy)) == [energy, power]
+        assert tree.ancestors(power) == [home, energy]
+        assert tree.label(power) == "Logement › Énergie › Électricité"
+        assert tree.subtree_ids(ObjectId()) == []
+
+    def test_paths_computed_without_stored_fields(self):
+        """Catégories antérieures (sans ancestors) : chemins déduits de parent_id"""
+        tree, parent_id, child_id = make_tree()
+        assert tree.ancestors(child_id) == [parent_id]
+        assert len(tree.subtree_ids(parent_id)) == 3
@@ -0,0 +1,108 @@
+"""
+Tests unitaires pour app/interceptors/compression.py
+
+Ces tests vérifient la négociation de l'encodage, la compression des
+réponses complètes et en flux par le middleware et les en-têtes de cache
+(Vary, ETag).
+"""
+
+import gzip
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.interceptors.compression import CompressionMiddleware, negotiate_encoding
+
+LARGE_BODY = b'{"description":"Courses"}' * 200
+
+
+def make_client(thread_threshold: int = 256 * 1024) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, thread_threshold=thread_threshold)
+
+    @app.get("/large")
+    async def large():
+        return Response(LARGE_BODY, media_type="application/json")
+
+    @app.get("/small")
+    async def small():
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    @app.get("/etag")
+    async def etag():
+        return Response(LARGE_BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(LARGE_BODY), headers={"Content-Encoding": "gzip"})
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for index in range(3):
+                yield f'{{"line":{index}}}\n'.encode()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+
+class TestNegotiateEncoding:
+    """Tests pour la fonction negotiate_encoding"""
+
+    def test_server_preference_and_refusal(self):
+        """L'ordre du serveur s'applique, q=0 refuse un encodage"""
+        assert negotiate_encoding("gzip, br", ["br", "gzip"]) == "br"
+        assert negotiate_encoding("gzip;q=0.5, br;q=0", ["br", "gzip"]) == "gzip"
+        assert negotiate_encoding("*", ["gzip"]) == "gzip"
+        assert negotiate_encoding("identity", ["gzip"]) is None
+        assert negotiate_encoding("", ["gzip"]) is None
+
+
+class TestCompressionMiddleware:
+    """Tests pour le middleware CompressionMiddleware"""
+
+    def test_large_body_compressed(self):
+        """Un corps au-delà du seuil est compressé, y compris dans un thread"""
+        for threshold in (256 * 1024, 0):
+            response = make_client(threshold).get("/large", headers={"Accept-Encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert "Accept-Encoding" in response.headers["vary"]
+            assert int(response.headers["content-length"]) < len(LARGE_BODY)
+            assert response.content == LARGE_BODY
+
+    def test_small_or_encoded_body_untouched(self):
+        """Les petits corps et les réponses déjà encodées ne sont pas recompressés"""
+        client = make_client()
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+
+        encoded = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+        assert encoded.content == LARGE_BODY  # une seule décompression
+
+        plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+
+    def test_vary_and_weak_etag(self):
+        """Vary sur toute réponse compressible, ETag faible une fois recompressé"""
+        client = make_client()
+        for path, accept_encoding in (("/small", "gzip"), ("/large", "identity"), ("/etag", "gzip")):
+            response = client.get(path, headers={"Accept-Encoding": accept_encoding})
+            assert "Accept-Encoding" in response.headers["vary"], path
+
+        assert client.get("/etag", headers={"Accept-Encoding": "gzip"}).headers["etag"] == 'W/"v1"'
+        assert client.get("/etag", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"v1"'
+        assert "vary" not in client.get("/encoded", headers={"Accept-Encoding": "gzip"}).headers
+
+    def test_streaming_response(self):
+        """Les réponses en flux sont compressées morceau par morceau"""
+        chunks = []
+        with make_client().stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert "content-length" not in response.headers
+            chunks = list(response.iter_raw())
+
+        # Le premier morceau est décodable dès sa réception (vidage synchrone)
+        assert zlib.decompressobj(31).decompress(chunks[0]).startswith(b'{"line":0}')
+        assert gzip.decompress(b"".join(chunks)) == b'{"line":0}\n{"line":1}\n{"line":2}\n'
@@ -0,0 +1,59 @@
+"""
+Tests unitaires pour app/services/events.py
+
+Ces tests vérifient la diffusion des événements aux abonnés d'un
+utilisateur et le comportement face à un client trop lent.
+"""
+
+import pytest
+from bson import ObjectId
+
+from app.routers.events import format_event
+from app.services.events import RESYNC, TRANSACTIONS_CHANGED, EventBus
+
+
+class TestEventBus:
+    """Tests pour la classe EventBus"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_per_user(self):
+        """Un événement est reçu par toutes les connexions de l'utilisateur, et seulement elles"""
+        bus = EventBus(queue_size=10)
+        user_id, other_id = ObjectId(), ObjectId()
+        first, second = bus.subscribe(user_id), bus.subscribe(str(user_id))
+        other = bus.subscribe(other_id)
+
+        bus.publish(user_id, {"type": TRANSACTIONS_CHANGED, "reason": "created", "count": 1})
+
+        assert (await first.get())["reason"] == "created"
+        assert (await second.get())["count"] == 1
+        assert other.queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_slow_client_gets_resync(self):
+        """Une file pleine est remplacée par un unique événement resync"""
+        bus = EventBus(queue_size=2)
+        subscription = bus.subscribe("u1")
+
+        for index in range(3):
+            bus.publish("u1", {"type": TRANSACTIONS_CHANGED, "count": index})
+
+        assert await subscription.get() == {"type": RESYNC}
+        assert subscription.queue.empty()
+
+    def test_unsubscribe(self):
+        """Une connexion fermée ne coûte plus rien au bus"""
+        bus = EventBus(queue_size=2)
+        subscription = bus.subscribe("u1")
+        bus.unsubscribe(subscription)
+
+        bus.publish("u1", {"type": TRANSACTIONS_CHANGED})
+
+        assert bus.subscriber_count() == 0
+
+
+def test_format_event():
+    """Les événements sont formatés en Server-Sent Events"""
+    assert format_event({"type": "import.progress", "processed": 100}) == (
+        'event: import.progress\ndata: {"type":"import.progress","processed":100}\n\n'
+    )
@@ -0,0 +1,70 @@
+"""
+Tests unitaires pour app/utils/fast_json.py
+
+Ces tests vérifient que le chemin rapide (mise en forme directe + orjson)
+produit exactement le JSON du chemin standard (validation Pydantic +
+JSONResponse).
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas import Category, TransactionWithCategory
+from app.utils.fast_json import dumps, projection_for, shape_document
+
+
+def standard_json(model, items) -> bytes:
+    """JSON produit par FastAPI pour un response_model List[model]"""
+    adapter = TypeAdapter(List[model])
+    content = jsonable_encoder(adapter.dump_python(adapter.validate_python(items), mode="json"))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class TestShapeDocument:
+    """Tests pour shape_document et dumps"""
+
+    def test_same_json_as_standard_path(self):
+        """Transactions avec catégorie, tags, banque et dates naïves ou UTC"""
+        category = {
+            "id": str(ObjectId()), "name": "Épicerie", "type": "expense", "user_id": str(ObjectId()),
+            "created_at": datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc), "icon": "🛒"
+        }
+        items = [
+            {
+                "id": str(ObjectId()), "user_id": str(ObjectId()), "date": datetime(2025, 12, 24, 10, 30),
+                "amount": 42, "description": "Marché de Noël", "is_expense": True,
+                "created_at": datetime(2025, 12, 24, tzinfo=timezone.utc), "category_id": category["id"],
+                "category": shape_document(Category, category), "tags": ["fêtes"],
+                "bank": {"id": "b1", "name": "cic", "nickname": None, "connection_type": "mock"},
+                "extra_field": "ignoré"
+            },
+            {
+                "id": str(ObjectId()), "user_id": str(ObjectId()), "date": datetime(2025, 12, 1),
+                "amount": 2500.5, "description": "Salaire", "type": "income", "is_expense": False,
+                "created_at": datetime(2025, 12, 1, 8, 0, 0, 1)
+            }
+        ]
+
+        fast = dumps([shape_document(TransactionWithCategory, item) for item in items])
+
+        assert fast == standard_json(TransactionWithCategory, items)
+
+    def test_object_id_serialized_as_string(self):
+        """Les ObjectId restants sont encodés en chaîne"""
+        object_id = ObjectId()
+        assert dumps({"id": object_id}) == f'{{"id":"{object_id}"}}'.encode()
+
+
+class TestProjectionFor:
+    """Tests pour projection_for"""
+
+    def test_model_fields_without_id_and_excluded(self):
+        """La projection reprend les champs du modèle sauf id et les champs joints"""
+        projection = projection_for(TransactionWithCategory, exclude=("category", "bank", "account"))
+        assert projection["amount"] == 1 and projection["tags"] == 1
+        assert not {"id", "category", "bank", "account"} & set(projection)
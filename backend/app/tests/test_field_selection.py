@@ -0,0 +1,59 @@
+"""
+Tests unitaires pour app/utils/field_selection.py
+"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.schemas import Category, TransactionWithCategory
+from app.utils.field_selection import parse_fields, projection_for_fields, select_fields
+
+
+class TestParseFields:
+    """Tests pour parse_fields"""
+
+    def test_absent(self):
+        assert parse_fields(None, Category) is None
+
+    def test_order_and_duplicates(self):
+        assert parse_fields(" name, id,name ,color", Category) == ["name", "id", "color"]
+
+    def test_unknown_field(self):
+        with pytest.raises(HTTPException) as exc_info:
+            parse_fields("name,password", Category)
+        assert exc_info.value.status_code == 400
+        assert "password" in exc_info.value.detail
+
+    def test_empty(self):
+        with pytest.raises(HTTPException) as exc_info:
+            parse_fields(" , ", Category)
+        assert exc_info.value.status_code == 400
+
+
+class TestProjection:
+    """Tests pour projection_for_fields et select_fields"""
+
+    def test_without_id_excludes_object_id(self):
+        assert projection_for_fields(["date", "amount"]) == {"date": 1, "amount": 1, "_id": 0}
+
+    def test_with_id_and_dependencies(self):
+        projection = projection_for_fields(
+            ["id", "category", "is_expense"],
+            {"category": ("category_id",), "is_expense": ("is_expense", "type")}
+        )
+        assert projection == {"category_id": 1, "is_expense": 1, "type": 1}
+
+    def test_select_fields(self):
+        document = {
+            "_id": ObjectId(),
+            "date": datetime(2024, 5, 2),
+            "amount": 12.5,
+            "description": "Boulangerie",
+            "category_id": ObjectId(),
+            "type": "expense"
+        }
+        result = select_fields(TransactionWithCategory, document, ["amount", "description"])
+        assert result == {"amount": 12.5, "description": "Boulangerie"}
@@ -0,0 +1,37 @@
+"""
+Tests unitaires pour app/db/models.py
+
+Ces tests vérifient que les reprises de données ne sont exécutées qu'une
+seule fois, d'un démarrage à l'autre.
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.db.models import run_migrations
+
+
+class TestRunMigrations:
+    """Tests pour run_migrations"""
+
+    @pytest.mark.asyncio
+    async def test_applied_migrations_are_skipped(self):
+        applied = {"updated_at"}
+        migrations_collection = Mock()
+        migrations_collection.find_one = AsyncMock(
+            side_effect=lambda query: {"_id": query["_id"]} if query["_id"] in applied else None
+        )
+        migrations_collection.update_one = AsyncMock(side_effect=lambda query, *args, **kwargs: applied.add(query["_id"]))
+        db = Mock()
+        db.get_collection = AsyncMock(return_value=migrations_collection)
+        first, second, third = AsyncMock(), AsyncMock(), AsyncMock()
+
+        with patch("app.db.models.MIGRATIONS", (("updated_at", first), ("search_tokens", second), ("category_paths", third))):
+            await run_migrations(db)
+            await run_migrations(db)
+
+        # Déjà appliquée : jamais relancée ; les autres une seule fois
+        first.assert_not_awaited()
+        second.assert_awaited_once_with(db)
+        third.assert_awaited_once_with(db)
+        assert applied == {"updated_at", "search_tokens", "category_paths"}
@@ -0,0 +1,130 @@
+"""
+Tests unitaires pour app/services/reports.py
+
+Ces tests vérifient la construction des pipelines d'agrégation des rapports
+et la mise en forme des lignes agrégées renvoyées par MongoDB.
+"""
+
+import pytest
+from datetime import date, datetime
+from bson import ObjectId
+from unittest.mock import Mock, AsyncMock
+
+from app.services.reports import (
+    generate_monthly_report,
+    generate_salary_based_monthly_report,
+    get_trend_data,
+    get_trend_start,
+    period_month_expr
+)
+
+
+def make_collection(rows):
+    """Collection simulée dont aggregate() renvoie les lignes fournies"""
+    collection = Mock()
+    cursor = Mock()
+    cursor.to_list = AsyncMock(return_value=rows)
+    collection.aggregate = Mock(return_value=cursor)
+    return collection
+
+
+class TestPeriodMonthExpr:
+    """Tests pour la fonction period_month_expr"""
+
+    def test_calendar_month(self):
+        """Sans jour de salaire, le regroupement est le mois calendaire"""
+        assert period_month_expr() == {"$dateTrunc": {"date": "$date", "unit": "month"}}
+        assert period_month_expr(1) == period_month_expr()
+
+    def test_salary_day_offset(self):
+        """Avec un jour de salaire, la date est décalée de salary_day - 1 jours"""
+        expr = period_month_expr(25)
+        shifted = expr["$dateAdd"]["startDate"]["$dateTrunc"]["date"]
+        assert shifted == {"$dateSubtract": {"startDate": "$date", "unit": "day", "amount": 24}}
+        assert expr["$dateAdd"]["amount"] == 1
+
+
+class TestGetTrendStart:
+    """Tests pour la fonction get_trend_start"""
+
+    def test_months_across_year(self):
+        """Le début recule d'autant de mois que demandé, y compris au-delà de janvier"""
+        assert get_trend_start(6, today=date(2026, 2, 10)) == date(2025, 9, 1)
+        assert get_trend_start(1, today=date(2026, 2, 10)) == date(2026, 2, 1)
+        assert get_trend_start(60, today=date(2026, 2, 10)) == date(2021, 3, 1)
+
+    def test_salary_periods(self):
+        """Avec un jour de salaire, le début est celui de la période de salaire"""
+        # Avant le jour de paie : période courante = février (25 janv → 24 févr)
+        assert get_trend_start(1, salary_day=25, today=date(2026, 2, 10)) == date(2026, 1, 25)
+        # Après le jour de paie : période courante = mars (25 févr → 24 mars)
+        assert get_trend_start(1, salary_day=25, today=date(2026, 2, 26)) == date(2026, 2, 25)
+        assert get_trend_start(3, salary_day=25, today=date(2026, 2, 26)) == date(2025, 12, 25)
+
+
+class TestGetTrendData:
+    """Tests pour la fonction get_trend_data"""
+
+    @pytest.mark.asyncio
+    async def test_one_row_per_month(self):
+        """Les lignes agrégées par mois sont mises en forme sans relecture des transactions"""
+        user_id = ObjectId()
+        collection = make_collection([
+            {"_id": datetime(2025, 11, 1), "income": 3000.0, "expense": 1200.0, "count": 40},
+            {"_id": datetime(2025, 12, 1), "income": 3000.0, "expense": 1800.0, "count": 52}
+        ])
+
+        result = await get_trend_data(collection, str(user_id), months=2)
+
+        pipeline = collection.aggregate.call_args.args[0]
+        assert pipeline[0]["$match"]["user_id"] == user_id
+        assert "$dateTrunc" in pipeline[1]["$group"]["_id"]
+
+        assert [item["period"] for item in result["trend"]] == ["2025-11", "2025-12"]
+        assert result["trend"][1]["balance"] == 1200.0
+        assert result["summary"]["total_expense"] == 3000.0
+        assert result["summary"]["average_income"] == 3000.0
+
+
+class TestMonthlyReports:
+    """Tests pour generate_monthly_report et generate_salary_based_monthly_report"""
+
+    ROWS = [
+        {"category_id": ObjectId("5f0000000000000000000001"), "category_name": "Alimentation",
+         "is_expense": True, "amount": 300.0, "count": 10},
+        {"category_id": ObjectId("5f0000000000000000000001"), "category_name": "Alimentation",
+         "is_expense": False, "amount": 20.0, "count": 1},
+        {"category_id": "5f0000000000000000000002", "category_name": "Logement",
+         "is_expense": True, "amount": 900.0, "count": 1},
+        {"category_id": None, "is_expense": False, "amount": 2500.0, "count": 1}
+    ]
+
+    @pytest.mark.asyncio
+    async def test_monthly_report(self):
+        """Le rapport mensuel est construit à partir des lignes agrégées"""
+        collection = make_collection(self.ROWS)
+
+        report = await generate_monthly_report(collection, ObjectId(), 2025, 12)
+
+        pipeline = collection.aggregate.call_args.args[0]
+        date_filter = pipeline[0]["$match"]["date"]
+        assert date_filter["$gte"] == datetime(2025, 12, 1)
+        assert date_filter["$lte"].date() == date(2025, 12, 31)
+
+        assert report["summary"] == {"total_income": 2520.0, "total_expense": 1200.0, "balance": 1320.0}
+        assert [c["category_name"] for c in report["categories"]] == ["Logement", "Alimentation"]
+        assert report["categories"][1]["amount"] == 280.0
+        assert "transactions" not in report
+
+    @pytest.mark.asyncio
+    async def test_salary_based_report(self):
+        """Le rapport basé sur le salaire utilise la période de paie"""
+        collection = make_collection(self.ROWS)
+
+        report = await generate_salary_based_monthly_report(collection, ObjectId(), 2026, 1, salary_day=25)
+
+        date_filter = collection.aggregate.call_args.args[0][0]["$match"]["date"]
+        assert date_filter["$gte"] == datetime(2025, 12, 25)
+        assert date_filter["$lte"].date() == date(2026, 1, 24)
+        assert report["period"]["salary_day"] == 25
+        assert report["summary"]["balance"] == 1320.0
@@ -0,0 +1,216 @@
+"""
+Tests unitaires pour app/services/rule_engine.py
+
+Ces tests vérifient les règles regex, la catégorisation à l'écriture et la
+recompilation des règles mises en cache lorsque users.rules_version change.
+"""
+
+import random
+import re
+import time
+from datetime import date, timedelta
+
+import pytest
+from bson import ObjectId
+from unittest.mock import Mock, AsyncMock
+
+from app.services.linear_regex import LinearRegex
+from app.services.rule_engine import (
+    CompiledRuleSet,
+    RegexRuleError,
+    RuleSetCache,
+    compile_regex,
+    find_matching_rule,
+    rule_matches,
+    to_date
+)
+
+
+USER_ID = ObjectId()
+FOOD = ObjectId()
+RULES = [
+    {"pattern": "carrefour", "match_type": "contains", "category_id": str(FOOD), "exceptions": ["drive"]},
+    {"pattern": "carrefour", "match_type": "contains", "category_id": str(ObjectId()), "exceptions": []},
+]
+
+
+def make_db(rules, rules_version=0):
+    rules_collection = Mock()
+    rules_collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=rules)))
+    users_collection = Mock()
+    users_collection.find_one = AsyncMock(return_value={"rules_version": rules_version})
+
+    db = Mock()
+    db.get_collection = AsyncMock(side_effect=lambda name: {"rules": rules_collection, "users": users_collection}[name])
+    return db, rules_collection
+
+
+WORDS = ["CB", "PRLV", "SEPA", "CARREFOUR", "LIDL", "EDF", "SALAIRE", "LOYER", "TOTAL", "12/2025"]
+
+
+def random_rule(rng):
+    match_type = rng.choice(["contains", "starts_with", "ends_with", "exact", "regex"])
+    pattern = " ".join(rng.sample(WORDS, rng.randint(1, 2)))
+    if match_type == "regex":
+        pattern = rng.choice([f"^{pattern}", f"{pattern}$", f"{pattern} .{{0,10}}" + rng.choice(WORDS), r"\d{2}/\d{4}"])
+    elif rng.random() < 0.5:
+        pattern = pattern.lower()
+    rule = {
+        "pattern": pattern,
+        "match_type": match_type,
+        "category_id": str(ObjectId()),
+        "exceptions": [rng.choice(WORDS).lower()] if rng.random() < 0.2 else [],
+    }
+    if rng.random() < 0.3:
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(200))
+        rule["start_date"] = start.isoformat()
+        rule["end_date"] = (start + timedelta(days=rng.randrange(60))).isoformat() if rng.random() < 0.5 else None
+    return rule
+
+
+class TestDifferential:
+    """Règles compilées et implémentation linéaire de référence (rule_matches) donnent la même règle"""
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_same_first_match(self, seed):
+        rng = random.Random(seed)
+        rules = [random_rule(rng) for _ in range(rng.choice([10, 100]))]
+        compiled = CompiledRuleSet(rules).rules
+
+        for _ in range(300):
+            description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+            if rng.random() < 0.5:
+                description = description.lower()
+            transaction_date = rng.choice([None, date(2025, 1, 1) + timedelta(days=rng.randrange(365))])
+
+            expected = next(
+                (rule for rule in rules if rule_matches(rule, description.upper(), to_date(transaction_date))),
+                None
+            )
+            actual = find_matching_rule(compiled, description, transaction_date)
+            assert (actual.rule if actual else None) is expected
+
+
+class TestRegexRules:
+    """Tests pour le type de correspondance regex"""
+
+    @pytest.mark.parametrize("pattern", [r"^PRLV SEPA .*EDF", r"(CB|PRLV) .{0,20}EDF", r"\d{2}/\d{2}", r"CARREFOUR|LIDL",
+        r"(?:CB )?CARREFOUR", r"(?:CB )?\d{2}/\d{2} EDF"
+    ])
+    def test_accepted(self, pattern):
+        compile_regex(pattern)
+
+    @pytest.mark.parametrize("pattern, description, expected", [
+        (r"A.*B.*C", "xa1b2c", True),
+        (r"A.*B.*C", "CBA", False),
+        (r"[a-z]+@[a-z]+\.com", "VIR JEAN@EXEMPLE.COM", True),
+        (r"[a-z]+@[a-z]+\.com", "VIR JEAN@EXEMPLE.FR", False),
+        (r"CARTE .* PAYPAL .* AMAZON", "CARTE 12/03 PAYPAL *EU AMAZON", True),
+        (r".*B.*X", "ABAX", True),
+    ])
+    def test_costly_pattern_matched_in_linear_time(self, pattern, description, expected):
+        # Estimation au-delà du budget : motif accepté, recherché hors de re
+        regex = compile_regex(pattern)
+        assert not isinstance(regex, re.Pattern)
+        assert (regex.search(description) is not None) is expected
+        rule = {"pattern": pattern, "match_type": "regex", "category_id": str(FOOD)}
+        assert rule_matches(rule, description, None) is expected
+
+    def test_polynomial_backtracking_is_bounded(self):
+        # re met plusieurs secondes sur ce texte (retour arrière en n^4)
+        regex = compile_regex(r"A.*A.*A.*X")
+        start = time.perf_counter()
+        assert regex.search("A" * 256) is None
+        assert regex.search("A" * 255 + "X") is not None
+        assert time.perf_counter() - start < 1
+
+    @pytest.mark.parametrize("pattern", [r"^A.*B$", r"\bEDF\b.*\d+", r"[^0-9]+ [a-c]{2,3}.*(?:X|YZ)", r"CB.*?(?:LIDL|ALDI)",
+        r"\AA.*\w\s\W.*\Z", r"A.*\BB", r"(?s)A.*B", r"A.*B$", r"[\D\S]+.*Z"
+    ])
+    def test_linear_engine_agrees_with_re(self, pattern):
+        rng = random.Random(pattern)
+        regex = LinearRegex(pattern)
+        for _ in range(300):
+            text = "".join(rng.choice("abAB09 _-xXyYzZ\n\u00e9") for _ in range(rng.randint(0, 12)))
+            expected = re.search(pattern, text, re.IGNORECASE) is not None
+            assert (regex.search(text) is not None) is expected, text
+
+    @pytest.mark.parametrize("pattern", [r"(a+)+b", r"(?:CB|PRLV)+", r"(\w)\1", r"(?=A)B", r"[", "A" * 201,
+        # Corps vide ou de longueur variable répété : retour arrière exponentiel
+        r"(.?){22}.{22}#", r"(x?){26}x{26}", r"(a?){25}a{25}", r"(a?)*"
+    ])
+    def test_rejected(self, pattern):
+        with pytest.raises(RegexRuleError):
+            compile_regex(pattern)
+
+    def test_first_match_and_case(self):
+        rules = [
+            {"pattern": r"^prlv .*edf$", "match_type": "regex", "category_id": str(FOOD)},
+            RULES[1],
+        ]
+        rule_set = CompiledRuleSet(rules)
+        assert rule_set.match("Prlv Sepa EDF", None).rule is rules[0]
+        assert rule_set.match("PRLV SEPA EDF CARREFOUR", None).rule is rules[1]
+        assert rule_matches(rules[0], "PRLV SEPA EDF", None) is True
+
+    def test_stored_catastrophic_pattern_still_matches(self):
+        # Refusé à la création, mais une règle déjà enregistrée reste appliquée
+        rule = {"pattern": r"(a+)+$", "match_type": "regex", "category_id": str(FOOD)}
+        assert CompiledRuleSet([rule]).match("AAAA", None).rule is rule
+        start = time.perf_counter()
+        assert rule_matches(rule, "A" * 255 + "!", None) is False
+        assert time.perf_counter() - start < 1
+
+    def test_unsupported_stored_pattern_never_matches(self):
+        rule = {"pattern": r"(\w)\1", "match_type": "regex", "category_id": str(FOOD)}
+        assert CompiledRuleSet([rule]).match("AA", None) is None
+        assert rule_matches(rule, "AA", None) is False
+
+
+class TestCompiledRuleSet:
+    """Tests pour CompiledRuleSet.categorize"""
+
+    def test_first_matching_rule(self):
+        rule_set = CompiledRuleSet(RULES)
+        document = {"description": "CB Carrefour Market", "date": "2025-01-02"}
+        assert rule_set.categorize(document) is True
+        assert document["category_id"] == FOOD
+
+        document = {"description": "Carrefour Drive", "date": "2025-01-02"}
+        rule_set.categorize(document)
+        assert document["category_id"] == ObjectId(RULES[1]["category_id"])
+
+    def test_keeps_existing_category(self):
+        existing = ObjectId()
+        document = {"description": "CB Carrefour", "category_id": existing}
+        assert CompiledRuleSet(RULES).categorize(document) is False
+        assert document["category_id"] == existing
+
+
+class TestRuleSetCache:
+    """Tests pour RuleSetCache"""
+
+    @pytest.mark.asyncio
+    async def test_recompiles_on_new_version(self):
+        cache = RuleSetCache(1024 * 1024)
+        db, rules_collection = make_db(RULES)
+
+        first = await cache.get(db, USER_ID, 3)
+        assert len(first) == 2
+        assert await cache.get(db, USER_ID, 3) is first
+        assert rules_collection.find.call_count == 1
+
+        second = await cache.get(db, USER_ID, 4)
+        assert second is not first
+        assert second.version == 4
+        assert rules_collection.find.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_reads_version_and_invalidates(self):
+        cache = RuleSetCache(1024 * 1024)
+        db, rules_collection = make_db(RULES, rules_version=7)
+
+        assert (await cache.get(db, str(USER_ID))).version == 7
+        cache.invalidate(USER_ID)
+        await cache.get(db, USER_ID)
+        assert rules_collection.find.call_count == 2
@@ -0,0 +1,100 @@
+"""
+Tests unitaires pour POST /api/rules/preview
+
+Ces tests vérifient le préfiltre envoyé à MongoDB, la projection, les
+décomptes par catégorie actuelle et l'absence d'écriture.
+"""
+
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from fastapi import HTTPException
+from unittest.mock import Mock, AsyncMock
+
+from app.routers.rules import preview_rule
+from app.schemas.rule import RulePreview
+
+
+USER_ID = ObjectId()
+FOOD = ObjectId()
+SHOPPING = ObjectId()
+
+
+class AsyncCursor:
+    """Curseur Motor simulé (itération asynchrone)"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        self._iterator = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def make_db(transactions):
+    transactions_collection = Mock()
+    transactions_collection.find = Mock(return_value=AsyncCursor(transactions))
+    categories_collection = Mock()
+    categories_collection.find = Mock(return_value=Mock(to_list=AsyncMock(return_value=[
+        {"_id": FOOD, "name": "Courses", "path_label": "Alimentation › Courses"},
+        {"_id": SHOPPING, "name": "Shopping"},
+    ])))
+
+    db = Mock()
+    db.get_collection = AsyncMock(side_effect=lambda name: {
+        "transactions": transactions_collection,
+        "categories": categories_collection
+    }[name])
+    return db, transactions_collection
+
+
+class TestPreviewRule:
+    """Tests pour preview_rule"""
+
+    @pytest.mark.asyncio
+    async def test_counts_by_current_category(self):
+        db, transactions = make_db([
+            {"_id": ObjectId(), "description": "CB CARREFOUR", "date": datetime(2025, 3, 1), "category_id": FOOD},
+            {"_id": ObjectId(), "description": "CB CARREFOUR", "date": datetime(2025, 3, 2), "category_id": None},
+            {"_id": ObjectId(), "description": "CB CARREFOUR", "date": datetime(2025, 3, 3), "category_id": SHOPPING},
+            {"_id": ObjectId(), "description": "CB CARREFOUR", "date": datetime(2025, 3, 4), "category_id": SHOPPING},
+            # Candidat du préfiltre écarté par le moteur de règles (exception)
+            {"_id": ObjectId(), "description": "CARREFOUR DRIVE", "date": datetime(2025, 3, 5), "category_id": None},
+        ])
+        rule = RulePreview(
+            pattern="carrefour",
+            match_type="contains",
+            category_id=str(FOOD),
+            exceptions=["drive"],
+            start_date="2025-01-01"
+        )
+
+        result = await preview_rule(rule, {"_id": USER_ID}, db)
+
+        query, projection = transactions.find.call_args.args
+        assert query["user_id"] == USER_ID
+        assert query["description"]["$regex"] == "carrefour"
+        assert query["date"] == {"$gte": datetime(2025, 1, 1)}
+        assert projection == {"description": 1, "date": 1, "category_id": 1}
+        assert not [name for name, _, _ in transactions.mock_calls if name != "find"]
+
+        assert result["matched"] == 4
+        assert result["changed"] == 3
+        assert result["by_category"][0] == {"category_id": str(SHOPPING), "category_name": "Shopping", "count": 2}
+        assert {entry["category_name"] for entry in result["by_category"]} == {
+            "Shopping", "Alimentation › Courses", "Sans catégorie"
+        }
+        assert len(result["sample"]) == 4
+
+    @pytest.mark.asyncio
+    async def test_rejects_unbounded_regex(self):
+        db, _ = make_db([])
+        with pytest.raises(HTTPException) as exc_info:
+            await preview_rule(RulePreview(pattern="(a+)+$", match_type="regex"), {"_id": USER_ID}, db)
+        assert exc_info.value.status_code == 400
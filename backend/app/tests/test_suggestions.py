@@ -0,0 +1,109 @@
+"""
+Tests unitaires pour app/services/suggestions.py
+
+Ces tests vérifient la recherche par préfixe du vocabulaire, sa mise à jour
+sur place et la cohérence de la version de l'index avec data_version.
+"""
+
+import pytest
+from bson import ObjectId
+from unittest.mock import Mock, AsyncMock
+
+from app.services.suggestions import SuggestionCache, Vocabulary
+
+
+GROUPS = {
+    "$merchant": [
+        {"_id": "Carrefour", "count": 12},
+        {"_id": "CARREFOUR ", "count": 3},
+        {"_id": "Café du Marché", "count": 5},
+        {"_id": "Boulangerie Paul", "count": 8},
+    ],
+    "$description": [
+        {"_id": "CB CARREFOUR MARKET", "count": 2},
+        {"_id": "PRLV EDF", "count": 6},
+    ],
+}
+
+
+def make_db():
+    """Base simulée dont l'agrégation renvoie les groupes du champ demandé"""
+    def aggregate(pipeline):
+        cursor = Mock()
+        cursor.to_list = AsyncMock(return_value=GROUPS[pipeline[1]["$group"]["_id"]])
+        return cursor
+
+    collection = Mock()
+    collection.aggregate = Mock(side_effect=aggregate)
+    db = Mock()
+    db.get_collection = AsyncMock(return_value=collection)
+    return db, collection
+
+
+class TestVocabulary:
+    """Tests pour Vocabulary"""
+
+    def test_merges_spellings_and_ranks_by_frequency(self):
+        vocabulary = Vocabulary.from_counts((group["_id"], group["count"]) for group in GROUPS["$merchant"])
+        assert vocabulary.search("ca", 10) == [("Carrefour", 15), ("Café du Marché", 5)]
+
+    def test_prefix_ignores_accents_and_case(self):
+        vocabulary = Vocabulary.from_counts([("Café du Marché", 5)])
+        assert vocabulary.search("CAFE D", 10) == [("Café du Marché", 5)]
+        assert vocabulary.search("cafés", 10) == []
+
+    def test_add_and_remove(self):
+        vocabulary = Vocabulary.from_counts([("Carrefour", 1)])
+        vocabulary.add("Auchan")
+        vocabulary.add("carrefour", -1)
+        assert vocabulary.keys == ["AUCHAN"]
+        assert vocabulary.search("a", 10) == [("Auchan", 1)]
+
+
+class TestSuggestionCache:
+    """Tests pour SuggestionCache"""
+
+    @pytest.mark.asyncio
+    async def test_suggest_both_fields(self):
+        cache = SuggestionCache(max_bytes=1024 * 1024)
+        db, _ = make_db()
+        index = await cache.get_index(db, {"_id": ObjectId()})
+        assert index.suggest("c", limit=3) == [
+            {"value": "Carrefour", "field": "merchant", "count": 15},
+            {"value": "Café du Marché", "field": "merchant", "count": 5},
+            {"value": "CB CARREFOUR MARKET", "field": "description", "count": 2},
+        ]
+        assert [item["value"] for item in index.suggest("p")] == ["PRLV EDF"]
+
+    @pytest.mark.asyncio
+    async def test_local_write_keeps_index_current(self):
+        """Une écriture unitaire met l'index à jour sans rechargement"""
+        cache = SuggestionCache(max_bytes=1024 * 1024)
+        db, collection = make_db()
+        user = {"_id": ObjectId(), "data_version": 3}
+
+        await cache.get_index(db, user)
+        cache.record_write(user["_id"], 4, added=[{"merchant": "Picard", "description": "CB PICARD"}])
+        user["data_version"] = 4
+        index = await cache.get_index(db, user)
+        assert index.suggest("pic", ("merchant",)) == [{"value": "Picard", "field": "merchant", "count": 1}]
+        assert collection.aggregate.call_count == 2
+
+        # Écriture d'un autre processus : rechargement
+        user["data_version"] = 6
+        await cache.get_index(db, user)
+        assert collection.aggregate.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_concurrent_write_invalidates_index(self):
+        """Version renvoyée non consécutive : une écriture d'un autre processus manque à l'index"""
+        cache = SuggestionCache(max_bytes=1024 * 1024)
+        db, collection = make_db()
+        user = {"_id": ObjectId(), "data_version": 3}
+
+        await cache.get_index(db, user)
+        # data_version 4 vient d'un autre processus, l'écriture locale a obtenu 5
+        cache.record_write(user["_id"], 5, added=[{"merchant": "Picard", "description": "CB PICARD"}])
+        user["data_version"] = 5
+        await cache.get_index(db, user)
+        assert collection.aggregate.call_count == 4
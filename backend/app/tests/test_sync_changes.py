@@ -0,0 +1,130 @@
+"""
+Tests unitaires pour app/services/sync_changes.py
+
+Ces tests vérifient le jeton de synchronisation, la construction des filtres
+par clé et la pagination des changements entre les différents flux.
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from unittest.mock import Mock, AsyncMock
+
+from app.services.sync_changes import (
+    InvalidSyncToken,
+    decode_token,
+    encode_token,
+    get_changes,
+    keyset_filter
+)
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_db(documents_by_collection):
+    """Base simulée : find() renvoie les documents fournis, bornés par limit()"""
+    queries = []
+
+    def get_collection(name):
+        documents = documents_by_collection.get(name, [])
+        collection = Mock()
+
+        def find(query):
+            queries.append((name, query))
+            cursor = Mock()
+            cursor.sort = Mock(return_value=cursor)
+            cursor.limit = Mock(side_effect=lambda n: setattr(cursor, "n", n) or cursor)
+            cursor.to_list = AsyncMock(side_effect=lambda length: documents[:cursor.n])
+            return cursor
+
+        collection.find = Mock(side_effect=find)
+        return collection
+
+    db = Mock()
+    db.get_collection = AsyncMock(side_effect=get_collection)
+    db.queries = queries
+    return db
+
+
+class TestToken:
+    """Tests pour encode_token / decode_token"""
+
+    def test_roundtrip(self):
+        """Le jeton encode l'état de reprise"""
+        state = {"since": 1, "until": 2, "stream": 1, "after": [2, str(ObjectId())]}
+        assert decode_token(encode_token(state)) == {"v": 1, **state}
+
+    def test_invalid_tokens(self):
+        """Un jeton illisible ou incohérent est refusé"""
+        for token in ("pas-un-jeton", encode_token({"since": "hier"}), encode_token({"stream": 99})):
+            with pytest.raises(InvalidSyncToken):
+                decode_token(token)
+
+
+class TestKeysetFilter:
+    """Tests pour keyset_filter"""
+
+    def test_resume_after_key(self):
+        """La reprise se fait strictement après la clé (updated_at, _id)"""
+        user_id, last_id = ObjectId(), ObjectId()
+        since, until = datetime(2026, 1, 1), datetime(2026, 2, 1)
+        query = keyset_filter(user_id, "updated_at", since, until, [1767225600000, str(last_id)])
+
+        assert query["updated_at"] == {"$lt": until, "$gte": since}
+        assert query["$or"][1] == {"updated_at": datetime(2026, 1, 1), "_id": {"$gt": last_id}}
+
+
+class TestGetChanges:
+    """Tests pour la fonction get_changes"""
+
+    @pytest.mark.asyncio
+    async def test_full_sync_paginated_across_streams(self):
+        """Sans jeton : synchronisation complète, paginée et reprise d'un flux à l'autre"""
+        updated = datetime(2026, 2, 1)
+        db = make_db({
+            "transactions": [{"_id": ObjectId(), "updated_at": updated, "amount": 10.0} for _ in range(3)],
+            "rules": [{"_id": ObjectId(), "updated_at": updated, "pattern": "SNCF"}]
+        })
+
+        first = await get_changes(db, ObjectId(), limit=2, now=NOW)
+        assert first["reset"] is True and first["has_more"] is True
+        assert len(first["changes"]["transactions"]["updated"]) == 2
+        assert "id" in first["changes"]["transactions"]["updated"][0]
+        # Pas de pierres tombales lues pour une synchronisation complète
+        assert all(name != "tombstones" for name, _ in db.queries)
+
+        second = await get_changes(db, ObjectId(), first["next_token"], limit=10, now=NOW)
+        assert second["reset"] is False and second["has_more"] is False
+        assert second["changes"]["rules"]["updated"][0]["pattern"] == "SNCF"
+
+        # La passe suivante commence à l'instant de fin de la passe complète
+        assert decode_token(second["next_token"])["since"] == decode_token(first["next_token"])["until"]
+
+    @pytest.mark.asyncio
+    async def test_delta_with_deletions_and_purge(self):
+        """Les suppressions et purges sont renvoyées avec les changements"""
+        deleted_id = ObjectId()
+        db = make_db({
+            "tombstones": [
+                {"_id": ObjectId(), "collection": "budgets", "document_id": deleted_id, "deleted_at": datetime(2026, 2, 27)},
+                {"_id": ObjectId(), "collection": "transactions", "document_id": None, "deleted_at": datetime(2026, 2, 28)}
+            ]
+        })
+        token = encode_token({"since": int((NOW - timedelta(days=2)).timestamp() * 1000)})
+
+        result = await get_changes(db, ObjectId(), token, now=NOW)
+
+        assert result["reset"] is False
+        assert result["changes"]["budgets"]["deleted"] == [str(deleted_id)]
+        assert result["purged"] == ["transactions"]
+        assert db.queries[0][0] == "tombstones"
+
+    @pytest.mark.asyncio
+    async def test_expired_checkpoint_forces_full_sync(self):
+        """Un point de synchronisation plus ancien que la rétention impose une resynchronisation"""
+        token = encode_token({"since": int((NOW - timedelta(days=365)).timestamp() * 1000)})
+
+        result = await get_changes(make_db({}), ObjectId(), token, now=NOW)
+
+        assert result["reset"] is True
+
@@ -0,0 +1,110 @@
+"""
+Tests unitaires pour PATCH /api/transactions/batch
+
+Ces tests vérifient la vérification d'appartenance en une requête, l'écriture
+par un seul bulk_write et les statuts renvoyés par élément.
+"""
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.routers.transactions import batch_update_transactions
+from app.schemas import TransactionBatchUpdate
+
+
+USER_ID = ObjectId()
+CATEGORY_ID = ObjectId()
+OWNED = [ObjectId(), ObjectId()]
+
+
+class AsyncCursor:
+    """Curseur Motor simulé (itération asynchrone)"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        self._iterator = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def make_db(matched=2, modified=2):
+    transactions = Mock()
+    transactions.find = Mock(return_value=AsyncCursor([
+        {"_id": OWNED[0], "description": "CB CARREFOUR", "merchant": None},
+        {"_id": OWNED[1], "description": "PRLV EDF", "merchant": None},
+    ]))
+    transactions.bulk_write = AsyncMock(return_value=Mock(matched_count=matched, modified_count=modified))
+    categories = Mock()
+    categories.find = Mock(return_value=AsyncCursor([{"_id": CATEGORY_ID}]))
+
+    db = Mock()
+    db.get_collection = AsyncMock(side_effect=lambda name: {"transactions": transactions, "categories": categories}[name])
+    return db, transactions
+
+
+class TestBatchUpdate:
+    """Tests pour batch_update_transactions"""
+
+    @pytest.mark.asyncio
+    async def test_items_single_bulk_write(self):
+        db, transactions = make_db()
+        missing = ObjectId()
+        batch = TransactionBatchUpdate(items=[
+            {"id": str(OWNED[0]), "update": {"category_id": str(CATEGORY_ID)}},
+            {"id": str(OWNED[1]), "update": {"description": "Prélèvement EDF"}},
+            {"id": str(missing), "update": {"category_id": str(CATEGORY_ID)}},
+            {"id": "invalide", "update": {"category_id": str(CATEGORY_ID)}},
+        ])
+
+        with patch("app.routers.transactions.notify_transactions_changed", new=AsyncMock()) as notify:
+            result = await batch_update_transactions(batch, {"_id": USER_ID}, db)
+
+        assert transactions.find.call_count == 1
+        assert transactions.bulk_write.await_count == 1
+        operations = transactions.bulk_write.await_args.args[0]
+        assert len(operations) == 2
+        assert operations[0]._doc["$set"]["category_id"] == CATEGORY_ID
+        assert operations[1]._doc["$set"]["search_tokens"] == ["PRELEVEMENT", "EDF"]
+        notify.assert_awaited_once_with(db, USER_ID, "updated", 2)
+
+        statuses = {item["id"]: item["status"] for item in result["results"]}
+        assert statuses == {
+            str(OWNED[0]): "updated",
+            str(OWNED[1]): "updated",
+            str(missing): "not_found",
+            "invalide": "error",
+        }
+
+    @pytest.mark.asyncio
+    async def test_filter_update_many(self):
+        db, transactions = make_db(matched=40, modified=38)
+        batch = TransactionBatchUpdate(
+            filter={"category_id": "none", "search": "carrefour"},
+            update={"category_id": str(CATEGORY_ID)}
+        )
+
+        with patch("app.routers.transactions.notify_transactions_changed", new=AsyncMock()):
+            result = await batch_update_transactions(batch, {"_id": USER_ID}, db)
+
+        operation = transactions.bulk_write.await_args.args[0][0]
+        assert operation._filter["category_id"] is None
+        # Recherche par sous-chaîne par défaut, comme GET /api/transactions
+        assert operation._filter["$or"][0] == {"description": {"$regex": "carrefour", "$options": "i"}}
+        assert result == {"matched": 40, "modified": 38, "results": []}
+
+    @pytest.mark.asyncio
+    async def test_filter_rejects_description(self):
+        db, _ = make_db()
+        batch = TransactionBatchUpdate(filter={}, update={"description": "X"})
+        with pytest.raises(HTTPException) as exc_info:
+            await batch_update_transactions(batch, {"_id": USER_ID}, db)
+        assert exc_info.value.status_code == 400
@@ -0,0 +1,86 @@
+"""
+Tests unitaires pour app/services/transaction_search.py
+"""
+
+import inspect
+import re
+
+from app.routers.transactions import get_transactions
+from app.services.transaction_search import (
+    build_search_filter,
+    fuzzy_variants,
+    ranked_search_pipeline,
+    search_tokens,
+    tokenize
+)
+
+
+class TestTokens:
+    """Tests de la normalisation des mots"""
+
+    def test_tokenize_folds_accents_and_case(self):
+        assert tokenize("Café du Marché - café") == ["CAFE", "DU", "MARCHE"]
+
+    def test_search_tokens_description_and_merchant(self):
+        document = {"description": "CB 12/05 Boulangerie", "merchant": "Paul Élysée"}
+        assert search_tokens(document) == ["CB", "12", "05", "BOULANGERIE", "PAUL", "ELYSEE"]
+
+    def test_search_tokens_missing_fields(self):
+        assert search_tokens({"description": None}) == []
+
+
+class TestFuzzyVariants:
+    """Tests des variantes à une faute de frappe"""
+
+    def test_covers_each_edit(self):
+        variants = set(fuzzy_variants("CAFE"))
+        assert "CAFE" in variants
+        assert "CAE" in variants      # suppression
+        assert "CAFFE" in variants    # insertion
+        assert "CAPE" in variants     # substitution
+        assert "ACFE" in variants     # inversion
+        assert "CARE" in variants
+        assert "CAFES" in variants
+
+    def test_excludes_two_edits(self):
+        assert "COPE" not in fuzzy_variants("CAFE")
+
+
+class TestSearchFilter:
+    """Tests des filtres MongoDB par mode"""
+
+    def test_text(self):
+        assert build_search_filter("loyer", "text") == {"$text": {"$search": "loyer"}}
+
+    def test_prefix_is_anchored(self):
+        query = build_search_filter("carre Mar", "prefix")
+        patterns = query["search_tokens"]["$all"]
+        assert [pattern.pattern for pattern in patterns] == ["^CARRE", "^MAR"]
+        assert all(isinstance(pattern, re.Pattern) for pattern in patterns)
+
+    def test_prefix_without_words(self):
+        assert build_search_filter(" - ", "prefix") == {}
+
+    def test_fuzzy_short_terms_are_exact(self):
+        query = build_search_filter("edf paris", "fuzzy")
+        assert query["$and"][0] == {"search_tokens": "EDF"}
+        assert "PARSI" in query["$and"][1]["search_tokens"]["$in"]
+
+    def test_regex_keeps_previous_behavior(self):
+        query = build_search_filter("carre", "regex")
+        assert {"description": {"$regex": "carre", "$options": "i"}} in query["$or"]
+
+    def test_ranked_pipeline_removes_rank(self):
+        pipeline = ranked_search_pipeline({"user_id": 1}, "Café", 0, 10)
+        assert pipeline[1]["$addFields"]["_search_rank"]["$size"]["$setIntersection"][1] == ["CAFE"]
+        assert pipeline[-1] == {"$unset": "_search_rank"}
+
+
+class TestDefaultMode:
+    """Le mode par défaut de GET /api/transactions reste la recherche par sous-chaîne"""
+
+    def test_default_is_substring(self):
+        default = inspect.signature(get_transactions).parameters["search_mode"].default.default
+        assert default == "regex"
+        query = build_search_filter("four", default)
+        assert query["$or"][0] == {"description": {"$regex": "four", "$options": "i"}}
@@ -0,0 +1,73 @@
+"""
+Chemin de sérialisation rapide pour les grosses réponses de liste.
+
+Les documents issus de MongoDB sont mis directement à la forme du schéma de
+réponse (champs du modèle, dans l'ordre, avec leurs valeurs par défaut) puis
+encodés par orjson, sans validation Pydantic ni encodeur json de la
+bibliothèque standard. Le JSON produit est identique à celui du chemin
+standard (response_model + JSONResponse) :
+- séparateurs compacts, caractères non ASCII non échappés
+- datetime naïves sans suffixe, datetime UTC suffixées par « Z »
+- ObjectId sérialisés en chaîne
+"""
+
+from typing import Any, Dict, Iterable, Type
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+
+def _default(value: Any) -> Any:
+    """Types non gérés nativement par orjson"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode en JSON (mêmes conventions que le chemin standard de FastAPI)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON encodée par orjson (contenu de confiance, non validé)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def shape_document(model: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Met un dictionnaire à la forme de sortie d'un modèle Pydantic, sans validation.
+
+    Seuls les champs du modèle sont conservés, dans l'ordre du modèle ; les
+    champs absents prennent leur valeur par défaut et les entiers des champs
+    float sont convertis, comme le ferait la sérialisation du modèle.
+    """
+    shaped = {}
+    for name, field in model.model_fields.items():
+        if name in data:
+            value = data[name]
+            if field.annotation is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+        elif field.default_factory is not None:
+            value = field.default_factory()
+        elif field.default is PydanticUndefined:
+            value = None
+        else:
+            value = field.default
+        shaped[name] = value
+    return shaped
+
+
+def projection_for(model: Type[BaseModel], exclude: Iterable[str] = ()) -> Dict[str, int]:
+    """
+    Projection MongoDB limitée aux champs d'un modèle de réponse.
+
+    Le champ « id » du modèle correspond à « _id », toujours renvoyé par MongoDB.
+    """
+    excluded = set(exclude) | {"id"}
+    return {name: 1 for name in model.model_fields if name not in excluded}
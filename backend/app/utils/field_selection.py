@@ -0,0 +1,73 @@
+"""
+Sélection de champs des endpoints de liste (paramètre fields=).
+
+Le paramètre est une liste de champs du modèle de réponse séparés par des
+virgules (ex. fields=date,amount,description,category_id). Seuls ces champs
+sont renvoyés ; les routeurs en déduisent la projection MongoDB et évitent
+les jointures et calculs qui ne sont pas demandés.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+from app.utils.fast_json import shape_document
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """
+    Valide le paramètre fields= par rapport aux champs d'un modèle de réponse
+
+    Returns:
+        Liste ordonnée et dédoublonnée des champs, ou None si fields est absent
+
+    Raises:
+        HTTPException 400: si un champ est inconnu ou si la liste est vide
+    """
+    if fields is None:
+        return None
+
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le paramètre fields ne contient aucun champ"
+        )
+
+    unknown = [name for name in requested if name not in model.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Champs inconnus: {', '.join(unknown)}. Champs disponibles: {', '.join(model.model_fields)}"
+        )
+    return requested
+
+
+def projection_for_fields(
+    fields: Iterable[str],
+    dependencies: Optional[Mapping[str, Iterable[str]]] = None
+) -> Dict[str, int]:
+    """
+    Projection MongoDB des champs demandés
+
+    Le champ « id » correspond à « _id », exclu s'il n'est pas demandé (ce qui
+    permet à MongoDB de répondre depuis un index couvrant). dependencies
+    associe aux champs calculés ou joints les champs stockés dont ils dépendent.
+    """
+    dependencies = dependencies or {}
+    projection: Dict[str, int] = {}
+    for name in fields:
+        if name == "id":
+            continue
+        for stored in dependencies.get(name, (name,)):
+            projection[stored] = 1
+    if "id" not in fields:
+        projection["_id"] = 0
+    return projection
+
+
+def select_fields(model: Type[BaseModel], data: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Met un document à la forme du modèle (sans validation) et ne garde que les champs demandés"""
+    shaped = shape_document(model, data)
+    return {name: shaped[name] for name in fields}
@@ -0,0 +1,143 @@
+"""
+Lecture incrémentale de corps JSON volumineux
+
+Les éléments d'un tableau JSON ([{...}, {...}]) ou d'un flux NDJSON (un
+document par ligne) sont produits au fil de la réception des morceaux du
+corps de la requête, sans charger le corps entier en mémoire.
+"""
+
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, List, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+# Taille consommée au-delà de laquelle le tampon est raccourci
+_COMPACT_THRESHOLD = 65536
+
+
+class JSONStreamError(ValueError):
+    """Corps JSON ou NDJSON invalide"""
+
+
+def _skip_whitespace(buffer: str, index: int) -> int:
+    while index < len(buffer) and buffer[index] in _WHITESPACE:
+        index += 1
+    return index
+
+
+async def peek_first_character(chunks: AsyncIterable[bytes]) -> Tuple[str, AsyncIterator[bytes]]:
+    """
+    Premier caractère non blanc d'un corps reçu par morceaux
+
+    Returns:
+        (caractère, ou "" si le corps est vide ; morceaux complets, y compris ceux déjà lus)
+    """
+    iterator = chunks.__aiter__()
+    head: List[bytes] = []
+    first = ""
+    async for chunk in iterator:
+        head.append(chunk)
+        stripped = chunk.lstrip(_WHITESPACE.encode())
+        if stripped:
+            first = chr(stripped[0])
+            break
+
+    async def replay() -> AsyncIterator[bytes]:
+        for chunk in head:
+            yield chunk
+        async for chunk in iterator:
+            yield chunk
+
+    return first, replay()
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Éléments d'un tableau JSON reçu par morceaux
+
+    Raises:
+        JSONStreamError: si le corps n'est pas un tableau JSON valide
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    iterator = chunks.__aiter__()
+    buffer = ""
+    index = 0
+    eof = False
+    state = "start"  # start, first, value, separator, end
+
+    while True:
+        index = _skip_whitespace(buffer, index)
+        if index < len(buffer):
+            char = buffer[index]
+            if state == "end":
+                raise JSONStreamError("Données après la fin du tableau JSON")
+            if state == "start":
+                if char != "[":
+                    raise JSONStreamError("Le corps doit être un tableau JSON")
+                state = "first"
+                index += 1
+                continue
+            if char == "]" and state in ("first", "separator"):
+                state = "end"
+                index += 1
+                continue
+            if state == "separator":
+                if char != ",":
+                    raise JSONStreamError("Séparateur attendu entre les éléments du tableau JSON")
+                state = "value"
+                index += 1
+                continue
+            try:
+                value, end = _decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise JSONStreamError(f"JSON invalide: {e.msg}") from e
+            else:
+                # Une valeur en fin de tampon (nombre) peut encore se prolonger
+                if end < len(buffer) or eof:
+                    index = end
+                    state = "separator"
+                    yield value
+                    continue
+
+        # Élément incomplet : il est redécodé après réception du morceau suivant
+        if eof:
+            if state == "end":
+                return
+            raise JSONStreamError("Tableau JSON incomplet")
+        if index > _COMPACT_THRESHOLD:
+            buffer, index = buffer[index:], 0
+        try:
+            buffer += utf8.decode(await iterator.__anext__())
+        except StopAsyncIteration:
+            buffer += utf8.decode(b"", final=True)
+            eof = True
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Documents d'un flux NDJSON reçu par morceaux (lignes vides ignorées)
+
+    Raises:
+        JSONStreamError: si une ligne n'est pas un document JSON valide
+    """
+    pending = b""
+    line_number = 0
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_line(line, line_number)
+    if pending.strip():
+        yield _parse_line(pending, line_number + 1)
+
+
+def _parse_line(line: bytes, line_number: int) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise JSONStreamError(f"Ligne {line_number} : JSON invalide") from e
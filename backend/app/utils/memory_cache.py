@@ -0,0 +1,83 @@
+"""
+Cache LRU borné par un budget mémoire.
+
+Contrairement à functools.lru_cache (borné en nombre d'entrées), chaque entrée
+déclare sa taille en octets et les entrées les moins récemment utilisées sont
+évincées dès que le total dépasse le budget.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class MemoryBudgetLRU:
+    """
+    Cache LRU dont la capacité est exprimée en octets.
+
+    Examples:
+        >>> cache = MemoryBudgetLRU(max_bytes=1024)
+        >>> cache.put("a", b"x" * 600, 600)
+        >>> cache.put("b", b"y" * 600, 600)  # évince "a"
+        >>> cache.get("a") is None
+        True
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: Budget mémoire total du cache
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Renvoie la valeur associée à la clé (et la marque comme récente), ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """
+        Ajoute ou remplace une entrée puis évince les plus anciennes si nécessaire.
+
+        Une entrée plus grande que le budget total n'est pas conservée.
+        """
+        with self._lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Supprime une entrée et renvoie sa valeur (ou None)"""
+        with self._lock:
+            return self._pop(key)
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.current_bytes -= entry[1]
+        return entry[0]
@@ -21,7 +21,7 @@ export default function RulesScreen() {
   const [formData, setFormData] = useState({
     name: '',
     pattern: '',
-    match_type: 'contains', // contains, starts_with, ends_with, exact
+    match_type: 'contains', // contains, starts_with, ends_with, exact, regex
     category_id: '',
     is_active: true,
     exceptions: [],
@@ -235,7 +235,8 @@ export default function RulesScreen() {
       contains: 'Contient',
       starts_with: 'Commence par',
       ends_with: 'Finit par',
-      exact: 'Exactement'  
+      exact: 'Exactement',
+      regex: 'Expression régulière'
     };
     return labels[type] || type;
   };
@@ -471,6 +472,7 @@ export default function RulesScreen() {
                   <option value="starts_with">Commence par</option>
                   <option value="ends_with">Finit par</option>
                   <option value="exact">Exactement</option>
+                  <option value="regex">Expression régulière</option>
                 </select>
               </div>
 
@@ -1002,6 +1002,7 @@ export default function TransactionsScreen() {
                   <option value="starts_with">Commence par</option>
                   <option value="ends_with">Se termine par</option>
                   <option value="exact">Correspondance exacte</option>
+                  <option value="regex">Expression régulière</option>
                 </select>
               </div>
 
@@ -47,3 +47,13 @@ export const deleteBudget = async (budgetId) => {
     throw error;
   }
 };
+
+// Historique des budgets sur les dernières périodes (matrice périodes × budgets)
+export const getBudgetHistory = async (periods = 12, periodType = 'monthly') => {
+  try {
+    return await apiCall(`/api/budgets/history?periods=${periods}&period_type=${periodType}`);
+  } catch (error) {
+    console.error("Erreur lors de la récupération de l'historique des budgets:", error);
+    throw error;
+  }
+};
@@ -48,3 +48,11 @@ export const applyAllActiveRules = async () => {
   });
   return response;
 };
+
+export const previewRule = async (ruleData) => {
+  const response = await apiCall('/api/rules/preview', {
+    method: 'POST',
+    body: JSON.stringify(ruleData)
+  });
+  return response;
+};
@@ -21,6 +21,18 @@ export const getTransactions = async (filters = {}) => {
   }
 };
 
+// Suggestions de marchands et descriptions connus (autocomplétion)
+export const suggestTransactions = async (prefix, field = null, limit = 10) => {
+  try {
+    const queryParams = new URLSearchParams({ prefix, limit });
+    if (field) queryParams.append('field', field);
+    return await apiCall(`/api/transactions/suggest?${queryParams.toString()}`);
+  } catch (error) {
+    console.error('Erreur lors de la récupération des suggestions:', error);
+    throw error;
+  }
+};
+
 // Récupérer une transaction par ID
 export const getTransaction = async (id) => {
   try {
@@ -57,6 +69,21 @@ export const updateTransaction = async (id, transactionData) => {
   }
 };
 
+// Modifier plusieurs transactions en une requête
+// items : [{ id, update }] ou { filter, update }
+export const batchUpdateTransactions = async (payload) => {
+  try {
+    const body = Array.isArray(payload) ? { items: payload } : payload;
+    return await apiCall('/api/transactions/batch', {
+      method: 'PATCH',
+      body: JSON.stringify(body),
+    });
+  } catch (error) {
+    console.error('Erreur lors de la modification groupée des transactions:', error);
+    throw error;
+  }
+};
+
 // Supprimer une transaction
 export const deleteTransaction = async (id) => {
   try {
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark du logging des requêtes HTTP (LoggingMiddleware)
+
+Envoie R requêtes à une application minimale équipée du middleware, dont le
+handler de destination simule une écriture lente (--write-latency), et mesure
+le temps par requête :
+- sans log (référence)
+- log synchrone (handlers appelés sur la boucle d'événements)
+- pipeline asynchrone (file bornée + thread d'écriture) pour plusieurs taux
+  d'échantillonnage des succès
+
+Usage: cd scripts && python3 benchmark_logging.py --requests 2000 --write-latency 0.0005
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+# Ajouter le répertoire backend au path pour les imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.interceptors.logging import AsyncLogPipeline, LoggingMiddleware, access_logger
+
+
+class SlowHandler(logging.Handler):
+    """Handler qui formate l'enregistrement puis simule une écriture lente"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.count = 0
+
+    def emit(self, record):
+        self.format(record)
+        if self.latency:
+            time.sleep(self.latency)
+        self.count += 1
+
+
+def build_app(sample_rate: float) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware, sample_rate=sample_rate)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def send_requests(app: FastAPI, count: int, concurrency: int) -> float:
+    """Temps moyen par requête (ms)"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                await client.get("/ping", params={"q": "x" * 100})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(count)))
+        return (time.perf_counter() - start) * 1000 / count
+
+
+async def run_benchmark(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    handler = SlowHandler(args.write_latency)
+    access_logger.propagate = False
+    access_logger.setLevel(logging.INFO)
+
+    print(f"📊 {args.requests} requêtes, concurrence {args.concurrency}, "
+          f"écriture simulée {args.write_latency * 1000:.2f} ms par log, file de {args.queue_size}\n")
+
+    # Référence sans log : tous les succès sont écartés par l'échantillonnage
+    baseline = await send_requests(build_app(0.0), args.requests, args.concurrency)
+    print(f"  {'sans log':<28} {baseline:7.3f} ms/requête")
+
+    # Log synchrone
+    access_logger.addHandler(handler)
+    handler.count = 0
+    elapsed = await send_requests(build_app(1.0), args.requests, args.concurrency)
+    access_logger.removeHandler(handler)
+    print(f"  {'synchrone':<28} {elapsed:7.3f} ms/requête  ({elapsed - baseline:+.3f})  {handler.count} logs")
+
+    # Pipeline asynchrone
+    for sample_rate in args.sample_rates:
+        pipeline = AsyncLogPipeline(access_logger, args.queue_size)
+        handler.count = 0
+        pipeline.start(handler)
+        elapsed = await send_requests(build_app(sample_rate), args.requests, args.concurrency)
+        dropped = pipeline.dropped
+        pipeline.stop()
+        label = f"asynchrone, succès {sample_rate:.0%}"
+        print(
+            f"  {label:<28} {elapsed:7.3f} ms/requête  ({elapsed - baseline:+.3f})  "
+            f"{handler.count} logs, {dropped} abandonnés"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du logging des requêtes")
+    parser.add_argument("--requests", type=int, default=2000, help="Nombre de requêtes")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requêtes simultanées")
+    parser.add_argument("--write-latency", type=float, default=0.0005, help="Durée simulée d'une écriture (s)")
+    parser.add_argument("--queue-size", type=int, default=10000, help="Taille de la file de logs")
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[1.0, 0.1], help="Taux d'échantillonnage")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark du moteur de règles de catégorisation (app/services/rule_engine.py)
+
+Génère des jeux de règles synthétiques (types de correspondance mélangés,
+exceptions, périodes d'application) et des descriptions réalistes tirées des
+CSV de test_data/ (complétées jusqu'aux longueurs demandées), puis mesure pour
+chaque taille de jeu :
+- le temps de compilation et la mémoire des règles compilées
+- le débit de catégorisation (descriptions/s) de l'implémentation linéaire de
+  référence (rule_matches sur chaque document de règle) et des règles compilées
+  (find_matching_rule), en vérifiant que leurs résultats sont identiques
+
+Sans MongoDB.
+
+Usage: cd scripts && python3 benchmark_rules.py --rules 10 100 1000 10000 --lengths 20 80 200
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# Ajouter le répertoire backend au path pour les imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.services.rule_engine import CompiledRuleSet, _cached_regex, find_matching_rule, rule_matches, to_date
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(__file__), 'test_data')
+
+# Colonnes de description des fichiers CSV (CIC, import générique)
+DESCRIPTION_COLUMNS = ("Libellé", "description")
+
+# Compléments ajoutés aux descriptions pour atteindre la longueur voulue
+SUFFIXES = ("CARTE 4974XXXX1234", "PARIS 15", "FACT 0123", "REF 88231", "SEPA", "EUR", "LYON", "12/2025")
+
+REGEX_PATTERNS = (r"^PAIEMENT CB .*{word}", r"(CB|PRLV) .{{0,20}}{word}", r"{word} \d{{2}}/\d{{2}}", r"^{word}")
+
+
+def load_descriptions() -> list:
+    """Descriptions des fichiers CSV de test_data/"""
+    descriptions = []
+    for name in sorted(os.listdir(TEST_DATA_DIR)):
+        if not name.endswith('.csv'):
+            continue
+        with open(os.path.join(TEST_DATA_DIR, name), encoding='utf-8') as f:
+            sample = f.readline()
+            f.seek(0)
+            reader = csv.DictReader(f, delimiter=';' if ';' in sample else ',')
+            for row in reader:
+                for column in DESCRIPTION_COLUMNS:
+                    if row.get(column):
+                        descriptions.append(row[column].strip())
+    return descriptions
+
+
+def build_descriptions(base: list, count: int, length: int, rng: random.Random) -> list:
+    """count descriptions d'environ length caractères, avec leur date"""
+    result = []
+    start = date(2025, 1, 1)
+    for _ in range(count):
+        description = rng.choice(base)
+        while len(description) < length:
+            description += " " + rng.choice(SUFFIXES)
+        result.append((description[:max(length, 1)], start + timedelta(days=rng.randrange(365))))
+    return result
+
+
+def build_rules(count: int, words: list, rng: random.Random) -> list:
+    """count règles synthétiques : types mélangés, exceptions et périodes pour une partie d'entre elles"""
+    rules = []
+    for index in range(count):
+        word = rng.choice(words)
+        match_type = rng.choice(("contains", "contains", "starts_with", "ends_with", "exact", "regex"))
+        # Les règles les plus nombreuses ne correspondent pas : motif rendu unique
+        unique = f"{word}{index}" if rng.random() < 0.9 else word
+        if match_type == "regex":
+            pattern = rng.choice(REGEX_PATTERNS).format(word=unique)
+        else:
+            pattern = unique.lower() if rng.random() < 0.5 else unique
+        rule = {
+            "name": f"Règle {index}",
+            "pattern": pattern,
+            "match_type": match_type,
+            "category_id": f"{index:024x}",
+            "exceptions": [rng.choice(words)] if rng.random() < 0.2 else [],
+            "start_date": None,
+            "end_date": None,
+        }
+        if rng.random() < 0.2:
+            start = date(2025, 1, 1) + timedelta(days=rng.randrange(300))
+            rule["start_date"] = start.isoformat()
+            rule["end_date"] = (start + timedelta(days=rng.randrange(30, 120))).isoformat()
+        rules.append(rule)
+    return rules
+
+
+def linear_match(rules: list, description: str, transaction_date):
+    """Implémentation de référence : évaluation de chaque document de règle"""
+    description = description.upper()
+    transaction_date = to_date(transaction_date)
+    for rule in rules:
+        if rule_matches(rule, description, transaction_date):
+            return rule
+    return None
+
+
+def run_benchmark(args):
+    rng = random.Random(args.seed)
+    base = load_descriptions()
+    words = sorted({word for description in base for word in description.upper().split() if len(word) > 2})
+    print(f"📊 {len(base)} descriptions de référence, {len(words)} mots, {args.descriptions} descriptions par mesure\n")
+    print(
+        f"  {'règles':>7} {'long.':>5} {'compil. (ms)':>12} {'mémoire (Ko)':>12} "
+        f"{'linéaire (/s)':>14} {'compilé (/s)':>13} {'catégorisées':>12}"
+    )
+
+    for rule_count in args.rules:
+        rules = build_rules(rule_count, words, rng)
+
+        # Compilation à froid (regex comprises), puis mémoire conservée par le jeu compilé
+        _cached_regex.cache_clear()
+        start = time.perf_counter()
+        CompiledRuleSet(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        _cached_regex.cache_clear()
+        tracemalloc.start()
+        rule_set = CompiledRuleSet(rules)
+        memory_kb = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+
+        for length in args.lengths:
+            descriptions = build_descriptions(base, args.descriptions, length, rng)
+
+            start = time.perf_counter()
+            expected = [linear_match(rules, description, day) for description, day in descriptions]
+            linear_rate = len(descriptions) / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            actual = [find_matching_rule(rule_set.rules, description, day) for description, day in descriptions]
+            compiled_rate = len(descriptions) / (time.perf_counter() - start)
+
+            actual_rules = [compiled.rule if compiled else None for compiled in actual]
+            if any(a is not b for a, b in zip(actual_rules, expected)):
+                raise SystemExit(f"❌ Résultats différents pour {rule_count} règles, longueur {length}")
+            categorized = sum(1 for rule in actual_rules if rule is not None)
+
+            print(
+                f"  {rule_count:>7} {length:>5} {compile_ms:>12.2f} {memory_kb:>12.1f} "
+                f"{linear_rate:>14,.0f} {compiled_rate:>13,.0f} {categorized:>12}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du moteur de règles de catégorisation")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000, 10000], help="Tailles des jeux de règles")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 80, 200], help="Longueurs des descriptions")
+    parser.add_argument("--descriptions", type=int, default=2000, help="Descriptions catégorisées par mesure")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du générateur aléatoire")
+    run_benchmark(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark du chemin de synchronisation bancaire (exécuteur, upserts groupés, filigranes)
+
+Crée K connexions mock pour un utilisateur fictif dans une base dédiée, puis mesure :
+- la synchronisation initiale (N comptes × M transactions par connexion)
+- une resynchronisation incrémentale (seule la fenêtre de recouvrement est relue)
+pour plusieurs niveaux de concurrence.
+
+Usage: cd scripts && python3 benchmark_sync.py --connections 4 --accounts 3 --transactions 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from bson import ObjectId
+
+# Ajouter le répertoire backend au path pour les imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.db.mongodb import MongoDB
+from app.services.bank_executor import BankConnectorExecutor
+from app.services.bank_sync import sync_user_connections
+from app.services.mock_bank import ScalableMockConnector
+
+
+async def run_benchmark(args):
+    db = MongoDB()
+    await db.connect_to_database(args.db_name)
+    await db.client.drop_database(args.db_name)
+
+    executor = BankConnectorExecutor(max_sessions=args.sessions, timeout=600)
+    factory = lambda connection: ScalableMockConnector(
+        accounts=args.accounts,
+        transactions_per_account=args.transactions,
+        latency=args.latency,
+        seed=int(str(connection["_id"])[-6:], 16)
+    )
+
+    print(f"📊 {args.connections} connexions × {args.accounts} comptes × {args.transactions} transactions")
+    print(f"   Pool de {args.sessions} sessions, latence simulée {args.latency}s par appel\n")
+
+    try:
+        for concurrency in args.concurrency:
+            # Base vide pour chaque niveau de concurrence
+            for name in ("bank_connections", "bank_accounts", "transactions"):
+                await (await db.get_collection(name)).delete_many({})
+
+            user_id = ObjectId()
+            connections = await db.get_collection("bank_connections")
+            await connections.insert_many([
+                {"user_id": user_id, "bank": "mock", "connection_type": "mock", "is_active": True}
+                for _ in range(args.connections)
+            ])
+
+            for label in ("initiale", "incrémentale"):
+                start = time.perf_counter()
+                result = await sync_user_connections(
+                    db, user_id, concurrency, executor=executor, connector_factory=factory
+                )
+                elapsed = time.perf_counter() - start
+                print(
+                    f"  concurrence={concurrency:<3} sync {label:<13} {elapsed:8.2f}s  "
+                    f"{result.new_transactions:>8} nouvelles transactions  "
+                    f"({result.succeeded} ok / {result.failed} échecs)"
+                )
+    finally:
+        executor.shutdown()
+        if not args.keep:
+            await db.client.drop_database(args.db_name)
+        await db.close_database_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la synchronisation bancaire")
+    parser.add_argument("--db-name", default="budget_benchmark_sync", help="Base MongoDB dédiée (supprimée)")
+    parser.add_argument("--connections", type=int, default=4, help="Nombre de connexions")
+    parser.add_argument("--accounts", type=int, default=3, help="Comptes par connexion (N)")
+    parser.add_argument("--transactions", type=int, default=1000, help="Transactions par compte (M)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence simulée par appel (s)")
+    parser.add_argument("--sessions", type=int, default=2, help="Taille du pool de sessions")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Niveaux de concurrence")
+    parser.add_argument("--keep", action="store_true", help="Conserver la base après le benchmark")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
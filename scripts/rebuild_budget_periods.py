@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Recalcule les dépenses matérialisées des budgets (collection budget_periods)
+
+Pour chaque utilisateur (ou celui indiqué par --email), recalcule par une
+agrégation la période en cours de tous ses budgets, mensuels et annuels. À
+lancer après une intervention directe sur les transactions en base ; les
+écritures de l'application tiennent ces périodes à jour d'elles-mêmes.
+
+Usage: cd scripts && python3 rebuild_budget_periods.py [--email test@example.com] [--purge]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Ajouter le répertoire backend au path pour les imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.db.mongodb import MongoDB
+from app.routers.budgets import get_period_dates
+from app.services.budget_periods import reconcile_periods
+from app.services.category_tree import CategoryTree
+
+PERIOD_TYPES = ("monthly", "yearly")
+
+
+async def rebuild(args):
+    db = MongoDB()
+    await db.connect_to_database(args.db_name)
+
+    try:
+        users_collection = await db.get_collection("users")
+        budgets_collection = await db.get_collection("budgets")
+        periods_collection = await db.get_collection("budget_periods")
+
+        user_filter = {"email": args.email} if args.email else {}
+        users = await users_collection.find(user_filter, {"email": 1, "billing_cycle_day": 1}).to_list(length=None)
+        if not users:
+            print("❌ Aucun utilisateur trouvé")
+            return
+
+        for user in users:
+            if args.purge:
+                await periods_collection.delete_many({"user_id": user["_id"]})
+
+            category_tree = await CategoryTree.load(db, user["_id"])
+            rebuilt = 0
+            for period_type in PERIOD_TYPES:
+                budgets = await budgets_collection.find(
+                    {"user_id": user["_id"], "period_type": period_type}
+                ).to_list(length=None)
+                budgets = [budget for budget in budgets if category_tree.get(budget["category_id"])]
+                start_date, end_date = get_period_dates(period_type, user.get("billing_cycle_day", 1))
+                spent = await reconcile_periods(
+                    db, user["_id"], budgets, start_date, end_date, category_tree, force=True
+                )
+                rebuilt += len(spent)
+            print(f"✅ {user.get('email', user['_id'])}: {rebuilt} période(s) recalculée(s)")
+    finally:
+        await db.close_database_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcul des dépenses matérialisées des budgets")
+    parser.add_argument("--db-name", default=None, help="Base MongoDB (MONGODB_DB_NAME par défaut)")
+    parser.add_argument("--email", default=None, help="Limiter à un utilisateur")
+    parser.add_argument("--purge", action="store_true", help="Supprimer d'abord toutes les périodes (y compris passées)")
+    asyncio.run(rebuild(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()